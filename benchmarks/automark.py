@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+__doc__ = """Time the marking of the bare uses as the glossary grows
+
+The same document of plain words with a bare short or long form every
+few words is marked (see :mod:`pandocacro.automark`) with glossaries of
+increasing size.  The time to build the trie is reported separately
+from the time per word to mark the JSON of the content which should not
+grow with the number of acronyms.
+"""
+
+import argparse
+import copy
+import json
+import random
+import timeit
+
+from typing import Any, Dict, List
+
+import panflute
+
+from pandocacro import PandocAcro, automark, raw
+
+
+def glossary(size: int) -> PandocAcro:
+    """The acronyms ``key0`` to ``key{size - 1}``"""
+    return PandocAcro({
+        f"key{i}": {"short": f"K{i}", "long": f"kind of thing number {i}"}
+        for i in range(size)
+    })
+
+
+def blocks(words: int, uses: int, density: float,
+           seed: int) -> List[Dict[str, Any]]:
+    """The JSON of paragraphs using the first ``uses`` acronyms"""
+    generator = random.Random(seed)
+    inlines: List[Dict[str, Any]] = []
+    while len(inlines) < 2 * words:
+        if generator.random() < density:
+            number = generator.randrange(uses)
+            text = generator.choice((f"K{number}",
+                                     f"kind of thing number {number},"))
+        else:
+            text = f"word{generator.randrange(1000)}"
+
+        for word in text.split():
+            inlines.append({"t": "Str", "c": word})
+            inlines.append({"t": "Space"})
+
+    return [{"t": "Para", "c": inlines[i:i + 200]}
+            for i in range(0, len(inlines), 200)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1000, 10000],
+                        help="The number of acronyms in each glossary")
+    parser.add_argument("--words", type=int, default=100_000,
+                        help="The number of words in the document")
+    parser.add_argument("--density", type=float, default=0.05,
+                        help="The fraction of the words that are uses")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="The seed of the random numbers")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="The number of repetitions to take the best")
+    args = parser.parse_args()
+
+    content = blocks(args.words, min(args.sizes), args.density, args.seed)
+    results: Dict[str, Dict[str, float]] = {}
+    for size in args.sizes:
+        acronyms = glossary(size)
+        doc = panflute.Doc()
+        doc.acronyms = acronyms
+        build = min(timeit.repeat(lambda: automark.build(acronyms),
+                                  number=1, repeat=args.repeat))
+        automark.trie(acronyms)
+        copies = [copy.deepcopy(content) for _ in range(args.repeat)]
+        mark = min(timeit.repeat(lambda: raw.mark(doc, copies.pop()),
+                                 number=1, repeat=args.repeat))
+        results[str(size)] = {
+            "build_seconds": build,
+            "mark_ns_per_word": 1e9 * mark / args.words,
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+__doc__ = """Generate synthetic documents for the benchmarks
+
+The documents are built directly as the JSON from Pandoc so large
+documents do not need Pandoc to parse them.  The size of the glossary,
+the density of the keys, the mix of bare keys and spans with classes,
+the nesting of the keys in quotes, and the number of lists of acronyms
+are all parameters.  The same seed gives the same document.  Running
+the module writes a document to standard output e.g.
+
+.. code-block:: bash
+
+    python benchmarks/corpus.py --acronyms 1000 > corpus.json
+    pandoc -f json -F pandoc-acro corpus.json -o corpus.pdf
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from typing import Any, Dict, List, Optional
+
+import panflute
+
+CLASSES = ("short", "long", "full", "caps", "plural")
+"""The classes given to the spans"""
+
+PUNCTUATION = ("", "", "", ".", ",", "'s")
+"""The trailing punctuation of the bare keys"""
+
+
+class Parameters:
+    """The parameters of a synthetic document
+
+    Attributes
+    ----------
+
+    acronyms: int
+        The number of acronyms in the glossary.
+    paragraphs: int
+        The number of paragraphs.
+    words: int
+        The number of words per paragraph.
+    density: float
+        The fraction of the words that are keys.
+    spans: float
+        The fraction of the keys in a span with classes.
+    quoted: float
+        The fraction of the keys within quotes.
+    nesting: int
+        The largest depth of the nested quotes.
+    lists: int
+        The number of lists of acronyms.
+    seed: int
+        The seed of the random numbers.
+
+    """
+
+    def __init__(self, acronyms: int = 100,
+                 paragraphs: int = 100,
+                 words: int = 100,
+                 density: float = 0.01,
+                 spans: float = 0.2,
+                 quoted: float = 0.1,
+                 nesting: int = 2,
+                 lists: int = 1,
+                 seed: int = 0):
+        self.acronyms = acronyms
+        self.paragraphs = paragraphs
+        self.words = words
+        self.density = density
+        self.spans = spans
+        self.quoted = quoted
+        self.nesting = nesting
+        self.lists = lists
+        self.seed = seed
+
+    def to_json(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser) -> None:
+        """Add the parameters to the command line options"""
+        defaults = Parameters()
+        for name, value in vars(defaults).items():
+            parser.add_argument("--" + name, type=type(value), default=value,
+                                help=f"The {name} of the document [{value}]")
+
+    @classmethod
+    def from_arguments(cls, args: argparse.Namespace) -> "Parameters":
+        """Create the parameters from the command line options"""
+        return cls(**{k: getattr(args, k) for k in vars(Parameters())})
+
+
+def inlines(text: str) -> List[Dict[str, Any]]:
+    """The JSON of the words of the text"""
+    output: List[Dict[str, Any]] = []
+    for word in text.split():
+        if output:
+            output.append({"t": "Space"})
+
+        output.append({"t": "Str", "c": word})
+
+    return output
+
+
+def glossary(size: int) -> Dict[str, Any]:
+    """The JSON of the ``acronyms`` metadata with the given size"""
+    acronyms: Dict[str, Any] = {}
+    for i in range(size):
+        fields = {
+            "short": {"t": "MetaInlines", "c": inlines(f"A{i}")},
+            "long": {"t": "MetaInlines", "c": inlines(f"long form {i}")},
+        }
+        if i % 10 == 0:
+            fields["long-plural-form"] = {
+                "t": "MetaInlines", "c": inlines(f"long forms {i}")
+            }
+
+        acronyms[f"key{i}"] = {"t": "MetaMap", "c": fields}
+
+    return {"t": "MetaMap", "c": acronyms}
+
+
+def key(params: Parameters, rng: random.Random) -> Dict[str, Any]:
+    """The JSON of a random key"""
+    value = f"key{rng.randrange(params.acronyms)}"
+    star = "*" if rng.random() < 0.05 else ""
+    if rng.random() < params.spans:
+        classes = rng.sample(CLASSES, rng.randrange(3))
+        if len([c for c in classes if c in ("short", "long", "full")]) > 1:
+            classes = classes[:1]
+
+        elem = {"t": "Span", "c": [["", classes, []],
+                                   [{"t": "Str", "c": f"+{star}{value}"}]]}
+    else:
+        post = rng.choice(PUNCTUATION)
+        elem = {"t": "Str", "c": f"+{star}{value}{post}"}
+
+    if rng.random() < params.quoted:
+        for _ in range(rng.randint(1, max(1, params.nesting))):
+            quote = rng.choice(("SingleQuote", "DoubleQuote"))
+            elem = {"t": "Quoted", "c": [{"t": quote}, [elem]]}
+
+    return elem
+
+
+def generate(params: Parameters,
+             api_version: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Generate the JSON of a document
+
+    Parameters
+    ----------
+
+    params: :class:`Parameters`
+        The parameters of the document.
+    api_version: list of int, optional
+        The Pandoc API version of the document instead of asking Pandoc.
+
+    Returns
+    -------
+
+    dict:
+        The JSON of the document.
+
+    """
+    if api_version is None:
+        api_version = list(panflute.convert_text("", standalone=True)
+                           .api_version)
+
+    rng = random.Random(params.seed)
+    blocks: List[Dict[str, Any]] = []
+    every = max(1, params.paragraphs // max(1, params.lists))
+    for i in range(params.paragraphs):
+        content: List[Dict[str, Any]] = []
+        for j in range(params.words):
+            if j > 0:
+                content.append({"t": "Space"})
+
+            content.append(key(params, rng) if rng.random() < params.density
+                           else {"t": "Str", "c": f"word{j}"})
+
+        blocks.append({"t": "Para", "c": content})
+        if params.lists > 0 and (i + 1) % every == 0 \
+                and len(blocks) - i - 1 < params.lists:
+            blocks.append({"t": "Div", "c": [["acronyms", [], []], []]})
+
+    return {
+        "pandoc-api-version": api_version,
+        "meta": {"acronyms": glossary(params.acronyms)},
+        "blocks": blocks,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    Parameters.add_arguments(parser)
+    args = parser.parse_args()
+    json.dump(generate(Parameters.from_arguments(args)), sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
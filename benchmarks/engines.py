@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+__doc__ = """Benchmark the panflute and JSON engines on a large document
+
+The document is a number of paragraphs of words and a few keys with a
+list of acronyms at the end.  Each engine reads the JSON from Pandoc,
+processes it, and writes the JSON back as the filter would.  The time
+includes the loading and dumping because that is where the panflute
+engine spends most of its time.
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import timeit
+
+from typing import Dict
+
+import panflute
+
+import pandocacro
+
+META = """---
+acronyms:
+  afaik:
+    short: AFAIK
+    long: as far as I know
+  lol:
+    short: lol
+    long: laugh out loud
+...
+"""
+
+
+def generate(paragraphs: int, words: int) -> str:
+    """Generate the JSON of a document from Pandoc"""
+    keys = ("+afaik", "+lol.", "[+lol]{.short}", "*+afaik*")
+    text = "\n\n".join(
+        " ".join(random.choice(keys) if random.random() < 0.01
+                 else f"word{j}" for j in range(words))
+        for _ in range(paragraphs)
+    )
+    return panflute.convert_text(META + "\n" + text + "\n\n# List {#acronyms}",
+                                 output_format="json", standalone=True)
+
+
+def panflute_engine(data: str, format: str) -> str:
+    """Run the default engine"""
+    doc = panflute.load(io.StringIO(data))
+    doc.format = format
+    pandocacro.main(doc)
+    with io.StringIO() as stream:
+        panflute.dump(doc, stream)
+        return stream.getvalue()
+
+
+def json_engine(data: str, format: str) -> str:
+    """Run the JSON engine"""
+    sys.argv = ["pandoc-acro", format]
+    with io.StringIO() as stream:
+        pandocacro.run(io.StringIO(data), stream)
+        return stream.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=1000,
+                        help="The number of paragraphs in the document")
+    parser.add_argument("--words", type=int, default=100,
+                        help="The number of words in each paragraph")
+    parser.add_argument("--format", default="markdown",
+                        help="The output format")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="The number of times to run each engine")
+    args = parser.parse_args()
+
+    data = generate(args.paragraphs, args.words)
+    outputs = {e.__name__: json.loads(e(data, args.format))
+               for e in (panflute_engine, json_engine)}
+    assert outputs["panflute_engine"] == outputs["json_engine"]
+
+    results: Dict[str, object] = {
+        "bytes": len(data),
+        "format": args.format,
+    }
+    for engine in (panflute_engine, json_engine):
+        results[engine.__name__] = min(timeit.repeat(
+            lambda: engine(data, args.format),
+            number=1, repeat=args.repeat
+        ))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+__doc__ = """Micro benchmark of :func:`pandocacro.keys.get` on plain words
+
+Almost every element the filter inspects is a word that is not a key.
+This measures the cost per element of rejecting such words both in a
+plain paragraph and within a :class:`panflute.Quoted` where the quotes
+used to be stripped before the regular expression could fail.
+"""
+
+import argparse
+import json
+import timeit
+
+from typing import Dict, List
+
+import panflute
+
+import pandocacro
+
+from pandocacro import keys
+
+META = """---
+acronyms:
+  afaik:
+    short: AFAIK
+    long: as far as I know
+...
+"""
+
+
+def generate(words: int) -> panflute.Doc:
+    """Generate a prepared document of plain and quoted words"""
+    plain = [panflute.Str(f"word{i}") for i in range(words)]
+    quoted = [panflute.Str(f"word{i}") for i in range(words)]
+    doc = panflute.convert_text(META, standalone=True)
+    doc.content.extend([
+        panflute.Para(*plain),
+        panflute.Para(panflute.Quoted(*quoted)),
+    ])
+    pandocacro.prepare(doc)
+    return doc
+
+
+def measure(elems: List[panflute.Element],
+            doc: panflute.Doc,
+            repeat: int) -> float:
+    """The best time per element in nanoseconds"""
+    def run() -> None:
+        for elem in elems:
+            keys.get(elem, doc)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return 1e9 * best / len(elems)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=100_000,
+                        help="The number of words in each paragraph")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="The number of repetitions to take the best")
+    args = parser.parse_args()
+
+    doc = generate(args.words)
+    plain = list(doc.content[0].content)
+    quoted = list(doc.content[1].content[0].content)
+    results: Dict[str, float] = {
+        "plain_ns_per_element": measure(plain, doc, args.repeat),
+        "quoted_ns_per_element": measure(quoted, doc, args.repeat),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+__doc__ = r"""Compare the size of the acronym preamble as one chunk or many
+
+The ``header-includes`` used to hold four raw LaTeX items for every
+acronym (the ``\DeclareAcronym`` opener, the short form, the other
+fields, and the closing brace).  This measures the number of metadata
+elements, the size of the JSON, and the time to serialize the metadata
+for the old layout against the single chunk from
+:mod:`pandocacro.preamble`.
+"""
+
+import argparse
+import json
+import timeit
+
+from typing import Any, Dict, List
+
+import panflute
+
+from pandocacro import PandocAcro, preamble
+
+
+def items(acronyms: PandocAcro) -> List[str]:
+    """The raw LaTeX items of the old layout"""
+    lines = [r"\usepackage{acro}"]
+    for key, values in acronyms.items():
+        lines.append(fr"\DeclareAcronym{{{key}}}{{")
+        lines.append(f"short = {values['short']},\n")
+        lines.append(",\n".join(f"{k} = {v}" for k, v
+                                in sorted(values.items()) if k != "short"))
+        lines.append("}")
+
+    return lines
+
+
+def header(lines: List[str]) -> panflute.MetaList:
+    """The ``header-includes`` holding each line as raw LaTeX"""
+    return panflute.MetaList(*(
+        panflute.MetaInlines(panflute.RawInline(line, format="latex"))
+        for line in lines
+    ))
+
+
+def elements(value: Any) -> int:
+    """The number of elements in the JSON"""
+    if isinstance(value, dict):
+        return int("t" in value) + sum(elements(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(elements(v) for v in value)
+    return 0
+
+
+def measure(lines: List[str], repeat: int) -> Dict[str, float]:
+    """The size and serialization time of the header"""
+    meta = header(lines)
+    data = meta.to_json()
+
+    def run() -> None:
+        json.dumps(header(lines).to_json())
+
+    return {
+        "elements": elements(data),
+        "bytes": len(json.dumps(data)),
+        "seconds": min(timeit.repeat(run, number=1, repeat=repeat)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--acronyms", type=int, default=5000,
+                        help="The number of acronyms")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="The number of repetitions to take the best")
+    args = parser.parse_args()
+
+    acronyms = PandocAcro({
+        f"key{i}": {"short": f"K{i}", "long": f"key number {i}",
+                    "long-plural": "es"}
+        for i in range(args.acronyms)
+    })
+    results = {
+        "items": measure(items(acronyms), args.repeat),
+        "chunk": measure([preamble.text(acronyms)], args.repeat),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+__doc__ = """Benchmark the startup time of the filter
+
+Two numbers are reported for each case.  The import time of the package
+from ``python -X importtime`` and the time from starting the filter as
+Pandoc would until the first byte of the output.  The filter is run on
+a small document with and without the ``acronyms`` map with each engine
+and output format.  Each measurement is repeated and the minimum and
+median are reported in milliseconds.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Dict, List
+
+import panflute
+
+META = """---
+acronyms:
+  afaik:
+    short: AFAIK
+    long: as far as I know
+...
+"""
+
+TEXT = "The +afaik filter.\n"
+
+
+def importtime(module: str) -> float:
+    """The cumulative import time of a module in milliseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)$",
+                         line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+
+    raise RuntimeError(f"'{module}' was not imported")
+
+
+def first_byte(data: bytes, format: str, engine: str) -> float:
+    """The time until the filter writes the first byte in milliseconds"""
+    env = dict(os.environ, PANDOC_ACRO_ENGINE=engine)
+    start = time.perf_counter()
+    with subprocess.Popen(
+        [sys.executable, "-c", "import pandocacro; pandocacro.main()",
+         format],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env
+    ) as process:
+        assert process.stdin is not None and process.stdout is not None
+        process.stdin.write(data)
+        process.stdin.close()
+        process.stdout.read(1)
+        elapsed = time.perf_counter() - start
+        process.stdout.read()
+
+    return 1000 * elapsed
+
+
+def summary(times: List[float]) -> Dict[str, float]:
+    """The minimum and median of the times"""
+    return {"min": min(times), "median": statistics.median(times)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="The number of times to run each case")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {
+        "importtime": {
+            m: summary([importtime(m) for _ in range(args.repeat)])
+            for m in ("pandocacro", "pandocacro.client")
+        },
+        "first_byte": {},
+    }
+    documents = {
+        "acronyms": META + "\n" + TEXT,
+        "plain": TEXT,
+    }
+    for (name, text), format, engine in itertools.product(
+        documents.items(), ("markdown", "latex"), ("panflute", "json")
+    ):
+        data = panflute.convert_text(text, output_format="json",
+                                     standalone=True).encode("utf-8")
+        results["first_byte"][f"{name}-{format}-{engine}"] = summary(
+            [first_byte(data, format, engine) for _ in range(args.repeat)]
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+__doc__ = """Benchmark the search for keys in bare strings
+
+Compare the old approach of wrapping every :class:`panflute.Str` in a
+throw away :class:`panflute.Span` before searching for a key with the
+direct search of :func:`pandocacro.translate.find`.  The document is a
+single long paragraph of words with a key every ``--every`` words.
+Both the time and the memory allocated during the search are reported.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from typing import Callable, Dict, List, Optional
+
+import panflute
+
+import pandocacro
+
+from pandocacro import keys
+from pandocacro.translate import find
+
+META = """---
+acronyms:
+  afaik:
+    short: AFAIK
+    long: as far as I know
+...
+"""
+
+SAMPLE = 100_000
+"""The number of strings to trace for the allocations"""
+
+
+def generate(words: int, every: int) -> panflute.Doc:
+    """Generate a prepared document with the given number of words"""
+    content: List[panflute.Inline] = []
+    for i in range(words):
+        if i > 0:
+            content.append(panflute.Space())
+
+        content.append(panflute.Str("+afaik" if i % every == 0 else "word"))
+
+    doc = panflute.convert_text(META, standalone=True)
+    doc.content.append(panflute.Para(*content))
+    pandocacro.prepare(doc, tally=False)
+    return doc
+
+
+def wrapped(elem: panflute.Element,
+            doc: panflute.Doc) -> Optional[keys.Key]:
+    """The original search through a throw away span"""
+    if isinstance(elem, panflute.Str):
+        if isinstance(elem.parent, panflute.Span):
+            return None
+
+        return keys.get(panflute.Span(elem), doc)
+
+    return keys.get(elem, doc)
+
+
+def measure(search: Callable, doc: panflute.Doc) -> Dict[str, float]:
+    """Time the search over all strings and trace the allocations"""
+    para = doc.content[0]
+
+    def strings() -> List[panflute.Str]:
+        # Iterating the content reattaches the parents which the
+        # wrapped search changes.
+        return [e for e in para.content if isinstance(e, panflute.Str)]
+
+    sample = strings()
+    start = time.perf_counter()
+    found = sum(1 for e in sample if search(e, doc))
+    elapsed = time.perf_counter() - start
+
+    # Count the panflute objects constructed on a sample of the strings
+    sample = strings()[:SAMPLE]
+    created = [0]
+
+    def profile(frame, event, arg):
+        if event == "call" and frame.f_code.co_name == "__init__" \
+                and "panflute" in frame.f_code.co_filename:
+            created[0] += 1
+
+    sys.setprofile(profile)
+    for e in sample:
+        search(e, doc)
+
+    sys.setprofile(None)
+
+    sample = strings()[:SAMPLE]
+    tracemalloc.start()
+    for e in sample:
+        search(e, doc)
+
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "found": found,
+        "seconds": elapsed,
+        "objects_per_str": created[0] / len(sample),
+        "peak_bytes": peak,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=1_000_000,
+                        help="The number of words in the document")
+    parser.add_argument("--every", type=int, default=1000,
+                        help="The number of words per key")
+    args = parser.parse_args()
+
+    doc = generate(args.words, args.every)
+    results = {
+        "words": args.words,
+        "wrapped": measure(wrapped, doc),
+        "direct": measure(find, doc),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+__doc__ = """Time the phases of the filter on synthetic documents
+
+Each document from :mod:`corpus` is run through the original pipeline
+with the phases timed separately: loading the JSON, :func:`prepare`,
+the :func:`translate` pass, the :func:`printacronyms` pass, and dumping
+the JSON.  The complete run of the single pass engine and the JSON
+engine are timed as well.  A phase whose entry point is missing from
+the installed filter, such as the JSON engine before it was added, is
+skipped and reported as missing.  Every document is run for LaTeX and
+plain text output.  The best time of each phase over the repeats is
+stored as JSON so two versions of the filter can be compared e.g.
+
+.. code-block:: bash
+
+    python benchmarks/suite.py run -o before.json
+    git checkout feature
+    python benchmarks/suite.py run -o after.json
+    python benchmarks/suite.py compare before.json after.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from typing import Any, Callable, Dict, List
+
+import panflute
+
+import pandocacro
+
+import corpus
+
+SIZES = (10, 1000)
+"""The default glossary sizes"""
+
+DENSITIES = (0.001, 0.05)
+"""The default key densities"""
+
+FORMATS = ("latex", "markdown")
+"""The output formats"""
+
+PHASES = ("load", "prepare", "translate", "printacronyms", "dump",
+          "engine", "json")
+"""The phases timed for each document"""
+
+
+def revision() -> str:
+    """The git revision of the working tree if available"""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def phases(data: str, format: str) -> Dict[str, float]:
+    """Time the phases of the pipeline on the JSON document"""
+    times: Dict[str, float] = {}
+
+    def timed(name: str, func: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = func()
+        times[name] = time.perf_counter() - start
+        return result
+
+    doc = timed("load", lambda: panflute.load(io.StringIO(data)))
+    doc.format = format
+    timed("prepare", lambda: pandocacro.prepare(doc))
+    doc = timed("translate", lambda: doc.walk(pandocacro.translate, doc))
+    doc = timed("printacronyms",
+                lambda: doc.walk(pandocacro.printacronyms, doc))
+    with io.StringIO() as stream:
+        timed("dump", lambda: panflute.dump(doc, stream))
+
+    def engine() -> None:
+        doc = panflute.load(io.StringIO(data))
+        doc.format = format
+        pandocacro.main(doc)
+        with io.StringIO() as stream:
+            panflute.dump(doc, stream)
+
+    def raw() -> None:
+        # The JSON engine reads the format from the command line
+        argv = sys.argv
+        sys.argv = ["pandoc-acro", format]
+        try:
+            with io.StringIO() as stream:
+                pandocacro.run(io.StringIO(data), stream)
+        finally:
+            sys.argv = argv
+
+    timed("engine", engine)
+    if hasattr(pandocacro, "run"):
+        timed("json", raw)
+
+    return times
+
+
+def missing(times: Dict[str, float]) -> List[str]:
+    """The phases that could not be timed with the installed filter"""
+    return [k for k in PHASES if k not in times]
+
+
+def run(args: argparse.Namespace) -> None:
+    """Run the suite"""
+    api_version = list(panflute.convert_text("", standalone=True)
+                       .api_version)
+    cases: List[Dict[str, Any]] = []
+    for size in args.acronyms:
+        for density in args.density:
+            params = corpus.Parameters(
+                acronyms=size, paragraphs=args.paragraphs, words=args.words,
+                density=density, spans=args.spans, quoted=args.quoted,
+                nesting=args.nesting, lists=args.lists, seed=args.seed
+            )
+            data = json.dumps(corpus.generate(params, api_version))
+            for format in FORMATS:
+                runs = [phases(data, format) for _ in range(args.repeat)]
+                cases.append({
+                    "name": f"{size}-{density}-{format}",
+                    "parameters": params.to_json(),
+                    "format": format,
+                    "bytes": len(data),
+                    "seconds": {k: min(r[k] for r in runs) for k in runs[0]},
+                    "missing": missing(runs[0]),
+                })
+                print(cases[-1]["name"], json.dumps(cases[-1]["seconds"]),
+                      file=sys.stderr)
+                if cases[-1]["missing"]:
+                    print(cases[-1]["name"], "missing",
+                          ", ".join(cases[-1]["missing"]), file=sys.stderr)
+
+    results = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "panflute": panflute.__version__,
+        "repeat": args.repeat,
+        "cases": cases,
+    }
+    with open(args.output, "w") as stream:
+        json.dump(results, stream, indent=2)
+
+
+def compare(args: argparse.Namespace) -> None:
+    """Print the ratio of the times of two runs of the suite"""
+    with open(args.before) as stream:
+        before = {c["name"]: c for c in json.load(stream)["cases"]}
+
+    with open(args.after) as stream:
+        after = {c["name"]: c for c in json.load(stream)["cases"]}
+
+    print(f"{'case':<24} {'phase':<14} {'before':>10} {'after':>10} "
+          f"{'ratio':>7}")
+    for name in before:
+        if name not in after:
+            continue
+
+        old_times = before[name]["seconds"]
+        new_times = after[name]["seconds"]
+        for phase in [k for k in PHASES if k in old_times or k in new_times]:
+            old, new = old_times.get(phase), new_times.get(phase)
+            if old is None or new is None:
+                print(f"{name:<24} {phase:<14} "
+                      f"{'missing' if old is None else f'{old:.4f}':>10} "
+                      f"{'missing' if new is None else f'{new:.4f}':>10}")
+                continue
+
+            ratio = new / old if old > 0 else float("nan")
+            print(f"{name:<24} {phase:<14} {old:>10.4f} {new:>10.4f} "
+                  f"{ratio:>7.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    runner = commands.add_parser("run", help="Run the suite")
+    runner.add_argument("-o", "--output", default="benchmark.json",
+                        help="The results file [benchmark.json]")
+    runner.add_argument("--acronyms", type=int, nargs="+",
+                        default=list(SIZES),
+                        help="The glossary sizes")
+    runner.add_argument("--density", type=float, nargs="+",
+                        default=list(DENSITIES),
+                        help="The fractions of the words that are keys")
+    runner.add_argument("--paragraphs", type=int, default=200)
+    runner.add_argument("--words", type=int, default=100)
+    runner.add_argument("--spans", type=float, default=0.2)
+    runner.add_argument("--quoted", type=float, default=0.1)
+    runner.add_argument("--nesting", type=int, default=2)
+    runner.add_argument("--lists", type=int, default=1)
+    runner.add_argument("--seed", type=int, default=0)
+    runner.add_argument("--repeat", type=int, default=3,
+                        help="The number of times to run each case")
+    runner.set_defaults(func=run)
+
+    comparer = commands.add_parser("compare", help="Compare two runs")
+    comparer.add_argument("before", help="The results of the baseline")
+    comparer.add_argument("after", help="The results to compare")
+    comparer.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
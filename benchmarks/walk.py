@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+__doc__ = """Compare the walk of the engine with panflute's on technical text
+
+Technical documents hold a lot of code, math, and raw elements where no
+key can be found.  :meth:`panflute.Element.walk` calls the action on
+every element and rebuilds every container while
+:func:`pandocacro.engine.walk` only calls the handlers of the
+:class:`panflute.Str`, :class:`panflute.Span`, :class:`panflute.Div`,
+and :class:`panflute.Header`.  This times both walks with the handlers
+of :func:`pandocacro.engine.scan` and the scan itself on a document
+with a mix of prose and code.
+"""
+
+import argparse
+import json
+import timeit
+
+from typing import Dict
+
+import panflute
+
+import pandocacro
+
+from pandocacro import engine, keys
+from pandocacro.translate import find
+
+META = """---
+acronyms:
+  afaik:
+    short: AFAIK
+    long: as far as I know
+...
+"""
+
+SECTION = """
+# Section {number}
+
+The +afaik in `call(+x, y)` with $a + b$ and ``raw``{{=latex}} text.
+
+```python
+def function(x, y):
+    return x + y  # a + comment with many words in the code block
+```
+
+```{{=latex}}
+\\begin{{equation}} a + b \\end{{equation}}
+```
+
+$$\\sum_{{i=0}}^{{n}} x_i + y_i$$
+"""
+
+
+def generate(sections: int) -> panflute.Doc:
+    """Generate a prepared document of prose and code"""
+    text = META + "".join(SECTION.format(number=n) for n in range(sections))
+    doc = panflute.convert_text(text, standalone=True)
+    pandocacro.prepare(doc, tally=False)
+    return doc
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=2000,
+                        help="The number of sections of prose and code")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="The number of repetitions to take the best")
+    args = parser.parse_args()
+
+    doc = generate(args.sections)
+
+    def key(elem: panflute.Element, doc: panflute.Doc) -> None:
+        keys.count(elem, doc)
+        find(elem, doc)
+
+    def block(elem: panflute.Element, doc: panflute.Doc) -> None:
+        lists.append(elem.identifier == "acronyms")
+
+    def record(elem: panflute.Element, doc: panflute.Doc) -> None:
+        if isinstance(elem, (panflute.Str, panflute.Span)):
+            key(elem, doc)
+        elif isinstance(elem, (panflute.Div, panflute.Header)):
+            block(elem, doc)
+
+    lists = []
+    handlers = {panflute.Str: key, panflute.Span: key,
+                panflute.Div: block, panflute.Header: block}
+    runs = {
+        "panflute": lambda: doc.walk(record),
+        "engine": lambda: engine.walk(doc, handlers, doc),
+        "scan": lambda: engine.scan(doc),
+    }
+    results: Dict[str, float] = {
+        name: min(timeit.repeat(run, number=1, repeat=args.repeat))
+        for name, run in runs.items()
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -67,6 +67,19 @@ def test(session):
     session.run("pytest", *tests)
 
 
+@nox.session
+def benchmark(session):
+    """Run the benchmark suite
+
+    The arguments are passed to ``benchmarks/suite.py`` e.g. ``nox -s
+    benchmark -- run -o after.json``.
+    """
+    session.install(*config["options"].get("install_requires", []))
+    session.install(".")
+    session.run("python", "benchmarks/suite.py",
+                *(session.posargs or ["run"]))
+
+
 @nox.session
 def docs(session):
     """Build the documentation"""
@@ -8,64 +8,192 @@ have a ``long`` and ``short`` field.  On first use, the expansion is
 overridden by the class of the span.  In LaTeX mode, the markup is
 simply translated to the ``acro`` macro.  If a key is not defined in the
 metadata, no transformation is done.
+
+The submodules and panflute are only imported when first needed so
+starting the filter, or the :mod:`pandocacro.client`, is quick.
 """
 
-from typing import Optional
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import types
+
+from typing import TYPE_CHECKING, Any, Dict, Optional, Pattern, TextIO
+
+if TYPE_CHECKING:
+    import panflute
+
+    from .pandocacro import PandocAcro
+    from .translate import translate  # noqa: F401 re-exported filter
+    from .list import printacronyms  # noqa: F401 re-exported filter
+
+EXPORTS: Dict[str, str] = {
+    "PandocAcro": "pandocacro",
+    "translate": "translate",
+    "printacronyms": "list",
+}
+"""The attributes of the package loaded from the submodules on use"""
+
+DEFINITIONS: Pattern[str] = re.compile(r'"(?:acronyms|pandoc-acro)"\s*:')
+"""The pattern of the metadata defining acronyms in the JSON"""
+
+LISTS: Pattern[str] = re.compile(r'\[\s*"acronyms"\s*,')
+"""The pattern of an element with the ``acronyms`` identifier in the JSON"""
+
+MARKERS: Pattern[str] = re.compile(r'"c"\s*:\s*"(?:[^"\\+]|\\.)*[+]')
+"""The pattern of a string holding a ``+`` in the JSON"""
+
+AUTOMARK: Pattern[str] = re.compile(r'"automark"\s*:')
+"""The pattern of the option to mark the bare uses in the JSON"""
+
+
+class Package(types.ModuleType):
+    """The package module
+
+    Importing a submodule sets it as an attribute of the package.  The
+    :mod:`pandocacro.translate` module shares its name with the
+    :func:`translate` filter so the filter is kept instead.
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in EXPORTS and isinstance(value, types.ModuleType):
+            value = getattr(value, name)
+
+        super().__setattr__(name, value)
+
 
-import panflute
+sys.modules[__name__].__class__ = Package
 
-from . import keys, options
-from .pandocacro import PandocAcro
-from .translate import translate
-from .list import printacronyms
 
+def __getattr__(name: str) -> Any:
+    """Import the exported attributes and submodules on first use"""
+    if name in EXPORTS:
+        module = importlib.import_module("." + EXPORTS[name], __name__)
+        value = getattr(module, name)
+    else:
+        try:
+            value = importlib.import_module("." + name, __name__)
+        except ModuleNotFoundError as exc:
+            if exc.name != f"{__name__}.{name}":
+                raise
 
-def prepare(doc: panflute.Doc) -> None:
+            raise AttributeError(
+                f"module '{__name__}' has no attribute '{name}'"
+            ) from None
+
+    globals()[name] = value
+    return value
+
+
+def prepare(doc: "panflute.Doc", tally: bool = True,
+            acronyms: Optional["PandocAcro"] = None,
+            directory: Optional[str] = None) -> None:
     """Prepare the document
 
     If ``acronyms`` map is in the metadata, generate the LaTeX
     definitions of the acronyms and count the number of uses of the
     acronyms in the document.  These details are to be used by the
-    writer or the main filter.
+    writer or the main filter.  The count is skipped if ``tally`` is
+    False which is used by :func:`engine.process` to count while it
+    walks the document.  If only the used acronyms are declared, the
+    definitions are added after the count (see
+    :func:`preamble.finish`).  The ``acronyms`` can be given to reuse a
+    :class:`PandocAcro` already built from the same metadata (see
+    :mod:`pandocacro.server`).  The acronyms in the glossary files
+    listed in the ``pandoc-acro`` map are included (see
+    :mod:`pandocacro.glossary`) and the usage starts from the index of
+    the book if given (see :mod:`pandocacro.usage`).  The bare uses of
+    the acronyms in the content are marked if requested (see
+    :mod:`pandocacro.automark`).  Relative glossary
+    files and the sidecar of the definitions (see
+    :func:`preamble.sidecar`) are relative to the ``directory`` if
+    given.
     """
-    if "acronyms" not in doc.metadata:
-        return
+    if directory is not None:
+        doc.directory = directory
+
+    if acronyms is None:
+        if "acronyms" not in doc.metadata \
+                and "pandoc-acro" not in doc.metadata \
+                and getattr(doc, "definitions", None) is None:
+            return
+
+        from . import glossary
+        definitions = glossary.definitions(doc, directory)
+        if definitions is None:
+            return
+
+        from .pandocacro import PandocAcro
+        acronyms = PandocAcro(definitions)
+
+    from . import keys, preamble
 
     # Store the acronym information as an attribute of the document
-    doc.acronyms = PandocAcro(doc.get_metadata("acronyms"))
-
-    # Prepare the LaTeX details.
-    header = doc.metadata["header-includes"] \
-        if "header-includes" in doc.metadata else []
-
-    LaTeX = lambda l: panflute.MetaInlines( # noqa E731 I just want a short name
-        panflute.RawInline(l, format="latex")
-    )
-    header.append(LaTeX(r"\usepackage{acro}"))
-    if doc.acronyms.options:
-        header.append(LaTeX(options.acsetup(doc.acronyms.options)))
-
-    for key, values in doc.acronyms.items():
-        header.append(LaTeX(fr"\DeclareAcronym{{{key}}}{{"))
-        # The short key *must be first*!
-        header.append(LaTeX(f"short = {values['short']},\n"))
-        header.append(LaTeX(",\n".join(f"{k} = {v}" for k, v
-                                       in sorted(values.items())
-                                       if k != "short")))
-        header.append(LaTeX("}"))
-
-        doc.acronyms[key]["count"] = 0
-        doc.acronyms[key]["total"] = 0
-        doc.acronyms[key]["list"] = False
-
-    doc.metadata["header-includes"] = header
+    doc.acronyms = acronyms
+    if "pandoc-acro" in doc.metadata:
+        from . import automark, usage
+        usage.apply(doc)
+        if automark.enabled(doc):
+            automark.mark(doc)
+
+    # Prepare the LaTeX details as a single raw chunk unless it must
+    # wait for the used acronyms.
+    if not preamble.restricted(doc):
+        preamble.add(doc)
 
     # For other outputs, we'll need to tally use of the acronyms
-    doc.walk(keys.count)
+    if tally:
+        import panflute
+
+        from . import engine
+        engine.walk(doc, {panflute.Str: keys.count,
+                          panflute.Span: keys.count}, doc)
+        preamble.finish(doc)
+
     return
 
 
-def finalize(doc: panflute.Doc) -> None:
+def unchanged(text: str, format: str) -> bool:
+    """Check if the filter cannot change a JSON document
+
+    The JSON is searched as text without decoding it.  A document cannot
+    change if it has no ``acronyms`` or ``pandoc-acro`` map in the
+    metadata unless the output is LaTeX and it has a list of acronyms
+    which is still printed.  With acronyms, a document cannot change if
+    the output is not LaTeX, which needs the definitions in the
+    preamble, no string holds a ``+`` for a key, it has no list of
+    acronyms, and the bare uses are not marked (see
+    :mod:`pandocacro.automark`).  The search errs on the side of
+    processing the document e.g. a ``+`` in a metadata string.
+
+    Parameters
+    ----------
+
+    text: str
+        The JSON document.
+    format: str
+        The output format.
+
+    Returns
+    -------
+
+    bool:
+        True if the document can be passed through as is.
+
+    """
+    latex = format in ("latex", "beamer")
+    lists = LISTS.search(text) is not None
+    if DEFINITIONS.search(text) is None:
+        return not (latex and lists)
+
+    return not latex and not lists and MARKERS.search(text) is None \
+        and AUTOMARK.search(text) is None
+
+
+def finalize(doc: "panflute.Doc") -> None:
     """Clear all temporary attributes from the elements
 
     The utilities can place attributes on the elements that are
@@ -74,9 +202,130 @@ def finalize(doc: panflute.Doc) -> None:
     del doc.acronyms
 
 
-def main(doc: Optional[panflute.Doc] = None) -> Optional[panflute.Doc]:
-    return panflute.run_filters([translate, printacronyms],
-                                prepare=prepare, doc=doc)
+def main(doc: Optional["panflute.Doc"] = None
+         ) -> Optional["panflute.Doc"]:
+    """Run the filter
+
+    This is equivalent to :func:`panflute.run_filters` with
+    :func:`translate` and :func:`printacronyms` but the document is
+    walked only once (see :mod:`pandocacro.engine`).  When reading from
+    standard input with ``$PANDOC_ACRO_ENGINE`` set to ``json`` or
+    ``$PANDOC_ACRO_INCREMENTAL`` set, the document is processed with
+    :func:`run` instead.  A document read from standard input that
+    cannot change (see :func:`unchanged`) is written back as is without
+    loading panflute.  Running
+    ``pandoc-acro batch`` processes many documents at once (see
+    :mod:`pandocacro.batch`) and ``pandoc-acro index`` writes the usage
+    index of a book (see :mod:`pandocacro.usage`).
+    """
+    load_and_dump = doc is None
+    if load_and_dump and sys.argv[1:2] == ["batch"]:
+        from . import batch
+        batch.main(sys.argv[2:])
+        return None
+
+    if load_and_dump and sys.argv[1:2] == ["index"]:
+        from . import usage
+        usage.main(sys.argv[2:])
+        return None
+
+    if load_and_dump and (os.environ.get("PANDOC_ACRO_ENGINE") == "json"
+                          or os.environ.get("PANDOC_ACRO_INCREMENTAL")):
+        run()
+        return None
+
+    from . import profiling
+    with profiling.session():
+        if load_and_dump:
+            with profiling.phase("load"):
+                data = sys.stdin.buffer.read()
+                text = data.decode("utf-8")
+
+            if unchanged(text, sys.argv[1] if len(sys.argv) > 1
+                         else "html"):
+                with profiling.phase("dump"):
+                    sys.stdout.buffer.write(data)
+                    sys.stdout.flush()
+
+                return None
+
+        import panflute
+
+        from . import engine
+        if load_and_dump:
+            with profiling.phase("load"):
+                doc = panflute.load(io.StringIO(text))
+
+        with profiling.phase("prepare"):
+            prepare(doc, tally=False)
+
+        engine.process(doc)
+        if load_and_dump:
+            with profiling.phase("dump"):
+                panflute.dump(doc)
+
+            return None
+
+    return doc
+
+
+def run(input_stream: Optional[TextIO] = None,
+        output_stream: Optional[TextIO] = None) -> None:
+    """Run the filter on a JSON document without panflute objects
+
+    This is the equivalent of :func:`main` with :mod:`pandocacro.raw`
+    where the format is the first command line argument.  The blocks
+    translated by an earlier run are reused if
+    ``$PANDOC_ACRO_INCREMENTAL`` is set (see
+    :mod:`pandocacro.incremental`).  If the
+    document cannot change (see :func:`unchanged`), it is written back
+    as is without decoding the JSON or importing the engine or panflute.
+
+    Parameters
+    ----------
+
+    input_stream: text stream, optional
+        The stream with the JSON document instead of standard input.
+    output_stream: text stream, optional
+        The stream for the processed document instead of standard
+        output.
+
+    """
+    if input_stream is None:
+        input_stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+
+    if output_stream is None:
+        output_stream = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+
+    from . import profiling
+    with profiling.session():
+        format = sys.argv[1] if len(sys.argv) > 1 else "html"
+        with profiling.phase("load"):
+            text = input_stream.read()
+
+        if unchanged(text, format):
+            with profiling.phase("dump"):
+                output_stream.write(text)
+                output_stream.flush()
+
+            return
+
+        with profiling.phase("load"):
+            data = json.loads(text)
+
+        if os.environ.get("PANDOC_ACRO_INCREMENTAL"):
+            from . import incremental
+            data = incremental.process(data, format, prepare)
+        else:
+            from . import raw
+            data = raw.process(data, format, prepare)
+
+        with profiling.phase("dump"):
+            # Only json.dumps uses the fast encoder
+            output_stream.write(json.dumps(data, check_circular=False,
+                                           separators=(",", ":"),
+                                           ensure_ascii=False))
+            output_stream.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,276 @@
+__doc__ = """Mark the bare uses of the acronyms as keys
+
+Authors often type ``AFAIK`` or ``as far as I know`` without the ``+``
+so those uses are left alone.  Setting ``automark`` in the
+``pandoc-acro`` map of the metadata marks them as keys before the
+document is scanned:
+
+.. code-block:: yaml
+
+    ---
+    pandoc-acro:
+      automark: true
+    ...
+
+The short and long forms, and their plurals, of every acronym are
+compiled once into a trie of the words (see :func:`trie`).  The words of
+each run of :class:`panflute.Str` separated by spaces are matched
+against the trie from each word keeping the longest match so a phrase
+split across many elements is found.  The lookup of each word is a
+single dictionary access so the time does not grow with the number of
+acronyms.  A match becomes ``+key`` or a span with the ``plural`` and
+``caps`` classes as needed.  The opening brackets and quotes before the
+first word and the closing brackets, quotes, and punctuation after the
+last word are kept outside of the key.  A long form starting with a
+capital letter where the definition does not is marked with ``caps``.
+The short forms are matched exactly.  Only the content of the document
+is marked, not the metadata, and words already marked with ``+`` are not
+touched.
+"""
+
+import logging
+import re
+
+from typing import (Any, Callable, Dict, List, MutableSequence, Optional,
+                    Pattern, Tuple)
+
+import panflute
+
+from .keys import Key
+from .pandocacro import PandocAcro
+
+END: str = ""
+"""The entry of a node of the trie holding the acronym of the phrase"""
+
+Node = Dict[str, Any]
+"""A node of the trie mapping each next word to the following node"""
+
+Match = Tuple[int, int, str, str, str, bool, bool]
+"""The first and last word, acronym key, leading and trailing
+punctuation, and if the match is plural and capitalized"""
+
+PRE: Pattern[str] = re.compile(r"\A[(\[{\"'“‘«]*")
+"""The pattern of the leading brackets and quotes of a word"""
+
+POST: Pattern[str] = re.compile(r"(?:['’]s)?[)\]}\"'”’».,;:!?]*\Z")
+"""The pattern of the trailing brackets, quotes, and punctuation of a
+word"""
+
+
+def enabled(doc: panflute.Doc) -> bool:
+    """Check if the bare uses are to be marked
+
+    This reads ``automark`` in the ``pandoc-acro`` map of the metadata
+    which is either true or false (the default).  Any other value is
+    logged and ignored.
+    """
+    options = doc.get_metadata("pandoc-acro", {})
+    value = options.get("automark", False) if isinstance(options, dict) \
+        else False
+    if value not in (True, False, "true", "false"):
+        logging.getLogger(__name__).warning(
+            f"Unknown 'automark' option '{value}'"
+        )
+
+    return value in (True, "true")
+
+
+def build(acronyms: PandocAcro) -> Node:
+    """Build the trie of the forms of the acronyms
+
+    The first acronym with a phrase wins and the singular forms are
+    added before the plural forms.  Acronyms with keys that cannot be
+    written as ``+key`` are skipped.
+    """
+    root: Node = {}
+    for plural in (False, True):
+        for name in acronyms.names:
+            if not Key.PATTERN.fullmatch("+" + name):
+                continue
+
+            acronym = acronyms[name]
+            phrases = [(acronyms.text(acronym, "short", plural), False)]
+            long_ = acronyms.text(acronym, "long", plural)
+            phrases.append((long_, False))
+            capital = long_[:1].upper() + long_[1:]
+            if capital != long_:
+                phrases.append((capital, True))
+
+            for phrase, capitalize in phrases:
+                node = root
+                for word in phrase.split():
+                    node = node.setdefault(word, {})
+
+                if node is not root:
+                    node.setdefault(END, (name, plural, capitalize))
+
+    return root
+
+
+def trie(acronyms: PandocAcro) -> Node:
+    """The trie of the acronyms built once and shared with the copies"""
+    root = acronyms.compiled.get("automark")
+    if root is None:
+        root = acronyms.compiled["automark"] = build(acronyms)
+
+    return root
+
+
+def find(words: List[Optional[str]], root: Node) -> List[Match]:
+    """Find the longest matches of the phrases in the words
+
+    Parameters
+    ----------
+
+    words: list of str or None
+        The words of the runs of text with None between the runs.
+    root: map
+        The trie from :func:`trie`.
+
+    Returns
+    -------
+
+    list of :data:`Match`:
+        The matches in order without overlaps.
+
+    """
+    matches: List[Match] = []
+    size = len(words)
+    start = 0
+    while start < size:
+        node = root
+        best: Optional[Match] = None
+        index = start
+        pre = ""
+        while index < size:
+            word = words[index]
+            if not word:
+                break
+
+            # The first word of a phrase may carry the opening brackets
+            if index == start:
+                pre = PRE.match(word).group()  # type: ignore
+                word = word[len(pre):]
+
+            # The last word of a phrase may carry the punctuation
+            child = node.get(word)
+            if child is None:
+                post = POST.search(word).group()  # type: ignore
+                if post and post != word:
+                    last = node.get(word[:-len(post)])
+                    if last is not None and END in last:
+                        name, plural, capitalize = last[END]
+                        best = (start, index, name, pre, post, plural,
+                                capitalize)
+
+                break
+
+            if END in child:
+                name, plural, capitalize = child[END]
+                best = (start, index, name, pre, "", plural, capitalize)
+
+            node = child
+            index += 1
+
+        if best is None:
+            start += 1
+        else:
+            matches.append(best)
+            start = best[1] + 1
+
+    return matches
+
+
+def rewrite(items: MutableSequence[Any],
+            root: Node,
+            tag: Callable[[Any], str],
+            text: Callable[[Any], str],
+            make: Callable[[str, List[str]], Any]) -> bool:
+    """Replace the matches in a list of inline elements in place
+
+    Parameters
+    ----------
+
+    items: mutable sequence
+        The elements such as a :class:`panflute.ListContainer`.
+    root: map
+        The trie from :func:`trie`.
+    tag: callable
+        The function giving the tag of an element.
+    text: callable
+        The function giving the text of a :class:`panflute.Str`.
+    make: callable
+        The function building a :class:`panflute.Str` for the text or a
+        :class:`panflute.Span` for the key with the classes.
+
+    Returns
+    -------
+
+    bool:
+        True if any match was replaced.
+
+    """
+    words: List[Optional[str]] = []
+    where: List[int] = []
+    previous = ""
+    for index, item in enumerate(items):
+        current = tag(item)
+        if current == "Str":
+            if previous == "Str":
+                words.append(None)
+                where.append(-1)
+
+            words.append(text(item))
+            where.append(index)
+        elif current not in ("Space", "SoftBreak") or previous != "Str":
+            words.append(None)
+            where.append(-1)
+
+        previous = current
+
+    matches = find(words, root)
+    for first, last, name, pre, post, plural, capitalize \
+            in reversed(matches):
+        # A key cannot start with punctuation
+        elems = [make(pre, [])] if pre else []
+        classes = ["plural"] * plural + ["caps"] * capitalize
+        if classes:
+            elems.append(make("+" + name, classes))
+            if post:
+                elems.append(make(post, []))
+        else:
+            elems.append(make("+" + name + post, []))
+
+        items[where[first]:where[last] + 1] = elems
+
+    return bool(matches)
+
+
+def mark(doc: panflute.Doc) -> None:
+    """Mark the bare uses in the content of a panflute document
+
+    The JSON of a document is marked by :func:`raw.mark`.
+    """
+    root = trie(doc.acronyms)
+
+    def make(text: str, classes: List[str]) -> panflute.Inline:
+        if classes:
+            return panflute.Span(panflute.Str(text), classes=classes)
+
+        return panflute.Str(text)
+
+    def visit(elem: panflute.Element) -> None:
+        for name in elem._children:
+            child = getattr(elem, name)
+            if isinstance(child, panflute.Element):
+                visit(child)
+            elif isinstance(child, panflute.ListContainer):
+                for item in child:
+                    if item._children:
+                        visit(item)
+
+                rewrite(child, root, lambda e: e.tag, lambda e: e.text,
+                        make)
+
+    for block in doc.content:
+        visit(block)
@@ -0,0 +1,282 @@
+__doc__ = """Process many JSON documents in a pool of processes
+
+Running ``pandoc -F pandoc-acro`` for each of many small documents pays
+for starting Python and building the acronyms every time.  Instead,
+convert the documents to JSON and run the filter on all of them at
+once:
+
+.. code-block:: bash
+
+    pandoc-acro batch --to latex --jobs 4 notes/
+
+Each ``input.json`` is processed with the JSON engine (see
+:mod:`pandocacro.raw`) and written atomically to ``input.acro.json``
+next to it which can be passed to ``pandoc -f json``.  Relative paths
+in the metadata, such as the glossary files, are relative to the
+directory of each document.  The acronyms of each distinct ``acronyms``
+map are built once in the main process before the pool is started and
+are installed in every worker (see :func:`install`) whatever the start
+method of the processes, so they are reused by every document with the
+same map.  The time of each document and any failure is reported.
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import pathlib
+import re
+import sys
+import time
+
+from typing import Any, Dict, Iterable, List, Optional, Pattern
+
+from . import glossary, prepare, raw
+from .pandocacro import PandocAcro
+
+SUFFIX: str = ".acro.json"
+"""The suffix of the processed documents"""
+
+GLOSSARIES: raw.Glossaries = raw.Glossaries()
+"""The acronyms shared by the documents processed in this process"""
+
+HEAD: Pattern[str] = re.compile(
+    r'\{\s*"pandoc-api-version"\s*:\s*(\[[\d,\s]*\])\s*,\s*"meta"\s*:\s*'
+)
+"""The start of a JSON document from Pandoc up to the metadata"""
+
+
+def inputs(paths: Iterable[str], suffix: str = SUFFIX) -> List[pathlib.Path]:
+    """The documents to process
+
+    A directory is replaced by the JSON files in it that are not already
+    processed documents.
+    """
+    files: List[pathlib.Path] = []
+    for path in map(pathlib.Path, paths):
+        if path.is_dir():
+            files.extend(p for p in sorted(path.glob("*.json"))
+                         if not p.name.endswith(suffix))
+        else:
+            files.append(path)
+
+    return files
+
+
+def output(path: pathlib.Path, suffix: str = SUFFIX) -> pathlib.Path:
+    """The processed document for an input"""
+    name = path.name[:-len(".json")] if path.name.endswith(".json") \
+        else path.name
+    return path.with_name(name + suffix)
+
+
+def convert(path: pathlib.Path,
+            format: str,
+            suffix: str = SUFFIX) -> Dict[str, Any]:
+    """Process a single document
+
+    Parameters
+    ----------
+
+    path: :class:`pathlib.Path`
+        The JSON document.
+    format: str
+        The output format.
+    suffix: str, optional
+        The suffix of the processed document.
+
+    Returns
+    -------
+
+    map of str:
+        The ``input``, ``output``, ``seconds``, and ``error`` (or None)
+        of the document.
+
+    """
+    start = time.perf_counter()
+    target = output(path, suffix)
+    error: Optional[str] = None
+    try:
+        with path.open("r", encoding="utf-8") as stream:
+            data = json.load(stream)
+
+        data = GLOSSARIES.process(data, format, prepare, str(path.parent))
+        temp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try:
+            with temp.open("w", encoding="utf-8") as stream:
+                stream.write(json.dumps(data, check_circular=False,
+                                        separators=(",", ":"),
+                                        ensure_ascii=False))
+
+            os.replace(temp, target)
+        finally:
+            if temp.exists():
+                temp.unlink()
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+
+    return {
+        "input": str(path),
+        "output": str(target),
+        "seconds": time.perf_counter() - start,
+        "error": error,
+    }
+
+
+def metadata(path: pathlib.Path) -> Dict[str, Any]:
+    """Read the metadata of a JSON document
+
+    Pandoc writes the metadata before the blocks so only the metadata is
+    decoded.  Any other document is decoded in full.
+
+    Returns
+    -------
+
+    map of str:
+        The document with the ``pandoc-api-version`` and ``meta``.
+
+    """
+    text = path.read_text(encoding="utf-8")
+    match = HEAD.match(text)
+    if match is None:
+        return json.loads(text)
+
+    meta, _ = json.JSONDecoder().raw_decode(text, match.end())
+    return {"pandoc-api-version": json.loads(match.group(1)),
+            "meta": meta, "blocks": []}
+
+
+def preload(files: Iterable[pathlib.Path],
+            format: str) -> Dict[str, PandocAcro]:
+    """Build the acronyms of the documents before starting the pool
+
+    Only the metadata of each document is read (see :func:`metadata`)
+    and hashed as JSON (see :meth:`raw.Glossaries.digest`) so only the
+    first document with each distinct glossary is loaded to build the
+    acronyms.  Any error is
+    left for :func:`convert` to report.
+
+    Returns
+    -------
+
+    map of str to :class:`PandocAcro`:
+        The acronyms keyed by the hash of the metadata (see
+        :meth:`raw.Glossaries.digest`).
+
+    """
+    acronyms: Dict[str, PandocAcro] = {}
+    for path in files:
+        try:
+            data = metadata(path)
+            meta = data["meta"]
+            if "acronyms" not in meta and "pandoc-acro" not in meta:
+                continue
+
+            directory = str(path.parent)
+            digest = GLOSSARIES.digest(data, directory)
+            if digest not in acronyms:
+                doc = raw.document(data, format)
+                acronyms[digest] = PandocAcro(
+                    glossary.definitions(doc, directory) or {}
+                )
+        except Exception:
+            pass
+
+    return acronyms
+
+
+def install(acronyms: Dict[str, PandocAcro]) -> None:
+    """Install the prebuilt acronyms in a worker of the pool
+
+    This is the initializer of the workers.  The acronyms are passed
+    explicitly so the workers start with them even when the processes
+    are spawned instead of forked.  The cache of the worker is grown to
+    hold all of them.
+    """
+    with GLOSSARIES.lock:
+        GLOSSARIES.size = max(GLOSSARIES.size, len(acronyms))
+        GLOSSARIES.acronyms.update(acronyms)
+
+
+def run(paths: Iterable[str],
+        format: str,
+        jobs: Optional[int] = None,
+        suffix: str = SUFFIX) -> List[Dict[str, Any]]:
+    """Process the documents in a pool of processes
+
+    Parameters
+    ----------
+
+    paths: iterable of str
+        The JSON documents or directories of documents.
+    format: str
+        The output format.
+    jobs: int, optional
+        The number of processes (one per CPU by default).  With one job
+        the documents are processed in this process.
+    suffix: str, optional
+        The suffix of the processed documents.
+
+    Returns
+    -------
+
+    list of maps of str:
+        The result of :func:`convert` for each document in order.
+
+    """
+    files = inputs(paths, suffix)
+    if not files:
+        return []
+
+    if jobs == 1 or len(files) == 1:
+        return [convert(f, format, suffix) for f in files]
+
+    jobs = jobs or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(
+        jobs, initializer=install, initargs=(preload(files, format),)
+    ) as pool:
+        return list(pool.map(convert, files, itertools.repeat(format),
+                             itertools.repeat(suffix),
+                             chunksize=max(1, len(files) // (4 * jobs))))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the ``batch`` subcommand of ``pandoc-acro``"""
+    parser = argparse.ArgumentParser(
+        prog="pandoc-acro batch",
+        description="Run the filter on many Pandoc JSON documents"
+    )
+    parser.add_argument("paths", nargs="+",
+                        help="The JSON documents or directories of them")
+    parser.add_argument("-t", "--to", default="html",
+                        help="The output format [html]")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="The number of processes [one per CPU]")
+    parser.add_argument("--suffix", default=SUFFIX,
+                        help=f"The suffix of the output files [{SUFFIX}]")
+    parser.add_argument("--report", default=None,
+                        help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run(args.paths, args.to, args.jobs, args.suffix)
+    failures = [r for r in results if r["error"] is not None]
+    for result in results:
+        if result["error"] is None:
+            print(f"{result['seconds']:8.3f}s {result['input']}"
+                  f" -> {result['output']}")
+        else:
+            print(f"{result['seconds']:8.3f}s {result['input']}"
+                  f" FAILED {result['error']}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(results) - len(failures)} processed, {len(failures)}"
+          f" failed in {elapsed:.3f}s")
+    if args.report:
+        with open(args.report, "w") as stream:
+            json.dump({"seconds": elapsed, "results": results}, stream,
+                      indent=2)
+
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,249 @@
+__doc__ = """Batched and cached parsing of plain text fields
+
+Fields of the acronyms that arrive as plain strings instead of parsed
+metadata must be sent through Pandoc to get the inlines.  Rather than
+calling Pandoc once per field, all of the texts are gathered into a
+single document with one div per text and parsed with a single call.
+The results are stored on disk keyed by a hash of the text and the
+Pandoc version so repeated builds never call Pandoc at all.
+
+The cache lives in ``$PANDOC_ACRO_CACHE`` if set or ``pandoc-acro``
+under ``$XDG_CACHE_HOME`` (``~/.cache`` by default).  The total size is
+bounded by ``$PANDOC_ACRO_CACHE_SIZE`` bytes and the least recently
+used entries are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import threading
+
+from typing import Dict, List, Optional, Sequence
+
+import panflute
+
+SIZE: int = 32 * 1024 * 1024
+"""The default bound on the size of the cache in bytes"""
+
+
+class Cache:
+    """A size bounded directory of parsed texts
+
+    Each entry is a JSON file named by the hash of the text and the
+    Pandoc version.  The modification time of an entry is refreshed on
+    every hit so eviction removes the least recently used entries.
+    Errors accessing the directory are ignored so a read only or
+    missing cache simply means parsing the text again.
+
+    Attributes
+    ----------
+
+    path: :class:`pathlib.Path`
+        The cache directory.
+    size: int
+        The maximum total size of the entries in bytes.
+    version: str
+        The Pandoc version the entries are valid for.
+
+    """
+
+    def __init__(self, path: Optional[pathlib.Path] = None,
+                 size: Optional[int] = None,
+                 version: str = ""):
+        self.path: pathlib.Path = directory() if path is None else path
+        self.size: int = int(os.environ.get("PANDOC_ACRO_CACHE_SIZE", SIZE)) \
+            if size is None else size
+        self.version: str = version
+
+    def digest(self, text: str) -> str:
+        """The name of the entry for a text"""
+        return hashlib.sha256(
+            (self.version + "\0" + text).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, text: str) -> Optional[list]:
+        """Get the JSON version of the parsed text if it is cached"""
+        entry = self.path / (self.digest(text) + ".json")
+        try:
+            with entry.open("r", encoding="utf-8") as stream:
+                value = json.load(stream)
+
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+
+        return value
+
+    def put(self, values: Dict[str, list]) -> None:
+        """Store the JSON versions of the parsed texts and evict"""
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            for text, value in values.items():
+                entry = self.path / (self.digest(text) + ".json")
+                write(entry, json.dumps(value).encode("utf-8"))
+
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Remove the least recently used entries to fit the size"""
+        entries = []
+        total = 0
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.size:
+                break
+
+            os.remove(path)
+            total -= size
+
+
+def directory() -> pathlib.Path:
+    """The default cache directory"""
+    if "PANDOC_ACRO_CACHE" in os.environ:
+        return pathlib.Path(os.environ["PANDOC_ACRO_CACHE"])
+
+    base = os.environ.get("XDG_CACHE_HOME") \
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    return pathlib.Path(base) / "pandoc-acro"
+
+
+def write(path: pathlib.Path, data: bytes) -> None:
+    """Replace the file atomically
+
+    The data is written to a temporary file next to the file and moved
+    into place.  The temporary file is named by the process and thread
+    so concurrent writers, such as the threads of the server, never
+    share it.  It is removed if the write fails.
+
+    Raises
+    ------
+
+    OSError:
+        When the file cannot be written.
+
+    """
+    temp = path.with_name(
+        f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        temp.write_bytes(data)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            temp.unlink()
+        except OSError:
+            pass
+
+        raise
+
+
+def version(doc: panflute.Doc) -> str:
+    """The Pandoc version to key the cache
+
+    Pandoc passes its version to filters in ``$PANDOC_VERSION``.  When
+    that is not available, the API version of the document is used so
+    we never need to call Pandoc just to ask.
+    """
+    if "PANDOC_VERSION" in os.environ:
+        return os.environ["PANDOC_VERSION"]
+
+    return "api-" + ".".join(str(v) for v in doc.api_version)
+
+
+def parse(texts: Sequence[str],
+          doc: panflute.Doc,
+          cache: Optional[Cache] = None) -> List[List[panflute.Inline]]:
+    """Parse the texts as Markdown inlines
+
+    The cached texts are loaded from disk and the rest are parsed with
+    a single call to Pandoc.  Each text is reduced to the inlines of its
+    first paragraph.
+
+    Parameters
+    ----------
+
+    texts: sequence of str
+        The texts to parse.
+    doc: :class:`panflute.Doc`
+        The document under consideration.
+    cache: :class:`Cache`, optional
+        The cache to use instead of the default.
+
+    Returns
+    -------
+
+    list of lists of :class:`panflute.Inline`:
+        The new inlines for each text in the same order.
+
+    """
+    if cache is None:
+        cache = Cache(version=version(doc))
+
+    values: Dict[str, list] = {}
+    for text in texts:
+        if text not in values:
+            value = cache.get(text)
+            if value is not None:
+                values[text] = value
+
+    missing = [t for t in dict.fromkeys(texts) if t not in values]
+    if missing:
+        parsed = batch(missing)
+        cache.put(parsed)
+        values.update(parsed)
+
+    return [json.loads(json.dumps(values[t]),
+                       object_hook=panflute.elements.from_json)
+            for t in texts]
+
+
+def batch(texts: Sequence[str]) -> Dict[str, list]:
+    """Parse the texts with a single call to Pandoc
+
+    Each text is placed in a fenced div with a numbered identifier.  The
+    fence is longer than any run of colons in the texts so a text cannot
+    close its div early.
+
+    Parameters
+    ----------
+
+    texts: sequence of str
+        The distinct texts to parse.
+
+    Returns
+    -------
+
+    map of str to list:
+        The JSON version of the inlines of each text.
+
+    """
+    longest = max((len(m) for t in texts for m in re.findall(":+", t)),
+                  default=0)
+    fence = ":" * max(3, longest + 1)
+    source = "\n\n".join(f"{fence} {{#pandoc-acro-{i}}}\n{text}\n{fence}"
+                         for i, text in enumerate(texts))
+    output: Dict[str, list] = {t: [] for t in texts}
+    for block in panflute.convert_text(source):
+        if not isinstance(block, panflute.Div):
+            continue
+
+        match = re.match(r"pandoc-acro-(\d+)$", block.identifier)
+        if not match:
+            continue
+
+        content = block.content
+        if len(content) > 0 and isinstance(content[0], (panflute.Plain,
+                                                        panflute.Para)):
+            output[texts[int(match.group(1))]] = content[0].content.to_json()
+
+    return output
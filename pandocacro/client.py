@@ -0,0 +1,110 @@
+__doc__ = """The thin filter that forwards documents to the server
+
+Starting Python, importing panflute, and building the acronyms for every
+call to the filter dominates the time of small documents.  This client
+only uses the standard library.  It sends the JSON document from Pandoc
+to a running ``pandoc-acro-server`` (see :mod:`pandocacro.server`) over
+a Unix socket and writes the reply for Pandoc.  If the server cannot be
+reached, the filter runs in this process instead.  Use it in place of
+``pandoc-acro`` e.g.
+
+.. code-block:: bash
+
+    pandoc-acro-server &
+    pandoc -F pandoc-acro-client input.md
+
+The messages in either direction are a line with a JSON header followed
+by the document.  The request header holds the ``format`` and the
+working ``directory`` of the client for relative glossary files and the
+reply header holds the ``error`` or null.
+"""
+
+import io
+import json
+import os
+import socket
+import sys
+
+
+def path() -> str:
+    """The default path of the server socket
+
+    The socket is ``$PANDOC_ACRO_SOCKET`` if set or
+    ``pandoc-acro.sock`` in ``$XDG_RUNTIME_DIR`` falling back to a per
+    user name in the temporary directory.
+    """
+    if "PANDOC_ACRO_SOCKET" in os.environ:
+        return os.environ["PANDOC_ACRO_SOCKET"]
+
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "pandoc-acro.sock")
+
+    import tempfile
+    return os.path.join(tempfile.gettempdir(),
+                        f"pandoc-acro-{os.getuid()}.sock")
+
+
+def request(data: bytes, format: str, address: str = "") -> bytes:
+    """Process a document with the server
+
+    Parameters
+    ----------
+
+    data: bytes
+        The JSON document.
+    format: str
+        The output format.
+    address: str, optional
+        The path of the socket instead of :func:`path`.
+
+    Returns
+    -------
+
+    bytes:
+        The processed JSON document.
+
+    Raises
+    ------
+
+    OSError:
+        If the server cannot be reached.
+    RuntimeError:
+        If the server failed to process the document.
+
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(address or path())
+        header = json.dumps({
+            "format": format, "directory": os.getcwd()
+        }).encode("utf-8")
+        sock.sendall(header + b"\n" + data)
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as stream:
+            reply = json.loads(stream.readline())
+            output = stream.read()
+
+    if reply.get("error") is not None:
+        raise RuntimeError(f"pandoc-acro-server: {reply['error']}")
+
+    return output
+
+
+def main() -> None:
+    """Run the filter through the server"""
+    format = sys.argv[1] if len(sys.argv) > 1 else "html"
+    data = sys.stdin.buffer.read()
+    try:
+        output = request(data, format)
+    except OSError:
+        # Without a server, the filter runs here as usual.
+        import pandocacro
+        sys.stdin = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+        pandocacro.main()
+        return
+
+    sys.stdout.buffer.write(output)
+    sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+__doc__ = """The single pass engine for processing a document
+
+The filter used to walk the document three times: once to tally the
+uses of the acronyms, once to translate the keys, and once to print the
+list of acronyms.  This module does the same work with a single walk.
+The walk tallies the uses while recording every key and list site.  The
+key sites are then resolved in document order, which settles the first
+and single use expansions, and the lists are patched in last.
+
+The walk (see :func:`walk`) dispatches on the type of the element so
+only the :class:`panflute.Str`, :class:`panflute.Span`,
+:class:`panflute.Div`, and :class:`panflute.Header` reach the handlers.
+Elements without children that cannot hold a key, such as the spaces,
+code, math, and raw elements, are skipped without a call.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import panflute
+
+from . import keys, preamble, profiling
+from .list import printacronyms
+from .translate import expand, find
+
+
+Handler = Callable[[panflute.Element, panflute.Doc], None]
+"""A function called on an element during the walk"""
+
+
+def walk(elem: panflute.Element,
+         handlers: Dict[type, Handler],
+         doc: panflute.Doc) -> None:
+    """Call the handler of the type of each element
+
+    This visits the elements in the same order as
+    :meth:`panflute.Element.walk`, the children before their parent,
+    but only elements with a handler or children are visited.  The
+    ``parent``, ``location``, and ``index`` of the visited elements are
+    set as if accessed through their containers.  The containers are
+    not rebuilt so the handlers must not replace the elements.
+
+    Parameters
+    ----------
+
+    elem: :class:`panflute.Element`
+        The root of the walk.
+    handlers: map of type to callable
+        The function taking the element and the document for each
+        exact type of element to handle.
+    doc: :class:`panflute.Doc`
+        The document.
+
+    """
+    for name in elem._children:
+        child: Any = getattr(elem, name)
+        if child is None:
+            continue
+
+        if isinstance(child, panflute.Element):
+            walk(child, handlers, doc)
+            continue
+
+        parent, location = child.parent, child.location
+        items = enumerate(child.list) if type(child) is \
+            panflute.ListContainer else ((None, v) for v in child.values())
+        for index, item in items:
+            if item._children or type(item) in handlers:
+                item.parent, item.location, item.index = \
+                    parent, location, index
+                walk(item, handlers, doc)
+
+    handler = handlers.get(type(elem))
+    if handler is not None:
+        handler(elem, doc)
+
+
+class Site:
+    """A location in the document to be replaced
+
+    The site stores the parent of the element and the position within
+    the parent instead of a reference to the container so the element
+    can still be replaced if the parent's container is rebuilt.
+
+    Attributes
+    ----------
+
+    elem: :class:`panflute.Element`
+        The element to replace.
+    parent: :class:`panflute.Element`
+        The parent of the element when it was visited.
+    location: str, optional
+        The attribute of the parent holding the element if it is not
+        the ``content``.
+    index: int
+        The index of the element within the container.
+    key: :class:`keys.Key`, optional
+        The key found at the site.
+
+    Arguments
+    ---------
+
+    elem: :class:`panflute.Element`
+        The element as visited by the walk.
+    key: :class:`keys.Key`, optional
+        The key found at the site.
+
+    """
+
+    __slots__ = ("elem", "parent", "location", "index", "key")
+
+    def __init__(self, elem: panflute.Element,
+                 key: Optional[keys.Key] = None):
+        self.elem = elem
+        self.parent = elem.parent
+        self.location = elem.location
+        self.index = elem.index
+        self.key = key
+
+    def replace(self, elem: panflute.Element) -> None:
+        """Replace the element at the site"""
+        container = self.parent.content if self.location is None \
+            else getattr(self.parent, self.location)
+        container[self.index] = elem
+
+
+def scan(doc: panflute.Doc,
+         elem: Optional[panflute.Element] = None
+         ) -> Tuple[List[Site], List[Site]]:
+    """Tally the acronyms and record the sites in a single walk
+
+    The walk (see :func:`walk`) visits the elements in the same order
+    as :func:`panflute.run_filters` so the tally matches
+    :func:`keys.count` and the sites are in the order
+    :func:`translate.translate` would replace them.
+
+    Parameters
+    ----------
+
+    doc: :class:`panflute.Doc`
+        The prepared document.
+    elem: :class:`panflute.Element`, optional
+        The root of the walk instead of the document (see
+        :class:`raw.Meta`).
+
+    Returns
+    -------
+
+    list of :class:`Site`:
+        The sites of the keys to translate.
+    list of :class:`Site`:
+        The sites of the :class:`panflute.Div` or
+        :class:`panflute.Header` to replace with the list of acronyms.
+
+    """
+    sites: List[Site] = []
+    lists: List[Site] = []
+
+    def key(elem: panflute.Element, doc: panflute.Doc) -> None:
+        keys.count(elem, doc)
+        found = find(elem, doc)
+        if found:
+            sites.append(Site(elem, found))
+
+    def block(elem: panflute.Element, doc: panflute.Doc) -> None:
+        if elem.identifier == "acronyms":
+            lists.append(Site(elem))
+
+    walk(doc if elem is None else elem,
+         {panflute.Str: key, panflute.Span: key,
+          panflute.Div: block, panflute.Header: block}, doc)
+    return sites, lists
+
+
+def resolve(doc: panflute.Doc,
+            sites: List[Site],
+            lists: List[Site]) -> None:
+    """Replace the recorded sites
+
+    The key sites are expanded in order so the usage counts advance
+    exactly as they would in a full walk.  A :class:`panflute.Span`
+    that contains an already replaced site no longer reads as the key
+    found during the walk so it is searched again before expanding.
+    Once all keys are settled, the lists of acronyms are generated.
+
+    Parameters
+    ----------
+
+    doc: :class:`panflute.Doc`
+        The prepared document.
+    sites: list of :class:`Site`
+        The key sites from :func:`scan`.
+    lists: list of :class:`Site`
+        The list sites from :func:`scan`.
+
+    """
+    dirty = set()
+    with profiling.phase("translate"):
+        for site in sites:
+            key = find(site.elem, doc) if id(site.elem) in dirty \
+                else site.key
+            if not key:
+                continue
+
+            site.replace(expand(key, doc))
+            parent = site.parent
+            while parent is not None:
+                dirty.add(id(parent))
+                parent = parent.parent
+
+    with profiling.phase("lists"):
+        for site in lists:
+            block = printacronyms(site.elem, doc)
+            if block is not None:
+                site.replace(block)
+
+
+def settle(doc: panflute.Doc, sites: List[Site]) -> None:
+    """Convert the definitions holding keys before they are translated
+
+    The definitions are the :class:`panflute.MetaMap` of the metadata
+    converted on first use (see :class:`PandocAcro`) so an acronym with
+    a key in its fields is converted before the key is replaced.  The
+    sites in the metadata come first so the search stops at the first
+    site in the content.
+    """
+    acronyms = getattr(doc, "acronyms", None)
+    if acronyms is None or "acronyms" not in doc.metadata:
+        return
+
+    entries = doc.metadata["acronyms"]
+    names: Dict[int, str] = {}
+    for site in sites:
+        elem = site.elem
+        while elem.parent is not entries and elem.parent is not doc \
+                and elem.parent is not None:
+            elem = elem.parent
+
+        if elem.parent is not entries:
+            if elem is doc.metadata:
+                continue
+
+            break
+
+        if not names and isinstance(entries, panflute.MetaMap):
+            names = {id(v): k for k, v in entries.content.dict.items()}
+
+        name = names.get(id(elem))
+        if name in acronyms:
+            acronyms[name]
+
+
+def process(doc: panflute.Doc) -> panflute.Doc:
+    """Translate the keys and print the lists in a single walk
+
+    The document must be prepared without the tally (see
+    :func:`pandocacro.prepare`) because the walk does the tally.
+
+    Parameters
+    ----------
+
+    doc: :class:`panflute.Doc`
+        The prepared document.
+
+    Returns
+    -------
+
+    :class:`panflute.Doc`:
+        The processed document.
+
+    """
+    with profiling.phase("scan"):
+        sites, lists = scan(doc)
+
+    preamble.finish(doc)
+    settle(doc, sites)
+    resolve(doc, sites, lists)
+    return doc
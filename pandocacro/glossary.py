@@ -0,0 +1,255 @@
+__doc__ = """External glossary files shared between documents
+
+Instead of repeating the ``acronyms`` map in every document, the
+acronyms can be kept in YAML or JSON files referenced from the
+``pandoc-acro`` map in the metadata:
+
+.. code-block:: yaml
+
+    ---
+    pandoc-acro:
+      glossary:
+        - company.yaml
+        - project.json
+    ...
+
+Each file holds the same map as the ``acronyms`` metadata, optionally
+under a top level ``acronyms`` key.  The values are Markdown parsed
+just like the metadata so a field such as ``long: "*as* far"`` is
+emphasized in the list of acronyms and declared as plain text in LaTeX.
+The files are merged in order followed by the ``acronyms`` map of the
+document so later definitions win.  The ``options`` are merged key by
+key in the same order.  A relative path is relative to the working
+directory of Pandoc.  YAML files need PyYAML_.
+
+Parsing a large file is slow so the definitions are compiled to JSON
+in the cache directory (see :func:`cache.directory`).  The compiled
+form is used as long as the modification time and size of the file are
+unchanged, or the contents still hash the same.
+
+.. _PyYAML: https://pyyaml.org/
+"""
+
+import hashlib
+import json
+import pathlib
+
+from typing import Any, Dict, List, Optional
+
+import panflute
+
+from . import cache
+from .pandocacro import PandocAcro
+
+VERSION: int = 2
+"""The version of the compiled form"""
+
+
+def paths(doc: panflute.Doc,
+          directory: Optional[str] = None) -> List[pathlib.Path]:
+    """The glossary files referenced by the document
+
+    Relative paths are relative to the ``directory`` if given (see
+    :mod:`pandocacro.server`) or else the working directory.
+    """
+    return files(doc.get_metadata("pandoc-acro", {}), directory)
+
+
+def files(options: Any,
+          directory: Optional[str] = None) -> List[pathlib.Path]:
+    """The glossary files listed in the ``pandoc-acro`` options
+
+    This is :func:`paths` for the options converted to builtins.
+    """
+    value = options.get("glossary", []) if isinstance(options, dict) else []
+    if isinstance(value, str):
+        value = [value]
+
+    base = pathlib.Path(directory or ".")
+    return [base / str(v) for v in value]
+
+
+def state(path: pathlib.Path) -> List[Any]:
+    """The modification time and size of a file or empty if missing"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return []
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def parse(path: pathlib.Path, content: bytes) -> Dict[str, Any]:
+    """Parse the contents of a glossary file
+
+    The fields of the acronyms are parsed as Markdown with a single call
+    to Pandoc (see :func:`cache.batch`) into the JSON of the
+    :class:`panflute.MetaMap` the metadata would hold.  The ``options``
+    are kept as given.
+
+    Raises
+    ------
+
+    ValueError:
+        If the file does not hold a map of acronyms.
+    RuntimeError:
+        If PyYAML is needed but not installed.
+
+    """
+    if path.suffix.lower() == ".json":
+        data = json.loads(content.decode("utf-8"))
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError(
+                f"PyYAML is required to read the glossary '{path}'"
+            ) from None
+
+        data = yaml.safe_load(content)
+
+    if isinstance(data, dict) and set(data) == {"acronyms"}:
+        data = data["acronyms"]
+
+    if not isinstance(data, dict) or not all(
+        isinstance(v, dict) and (k == "options"
+                                 or ("short" in v and "long" in v))
+        for k, v in data.items()
+    ):
+        raise ValueError(
+            f"The glossary '{path}' is not a map of acronyms with the "
+            "'short' and 'long' forms"
+        )
+
+    texts = [str(t) for k, v in data.items() if k != "options"
+             for t in v.values()]
+    parsed = cache.batch(list(dict.fromkeys(texts))) if texts else {}
+    return {k: v if k == "options" else {"t": "MetaMap", "c": {
+                f: {"t": "MetaInlines", "c": parsed[str(t)]}
+                for f, t in v.items()
+            }} for k, v in data.items()}
+
+
+def load(path: pathlib.Path,
+         directory: Optional[pathlib.Path] = None) -> Dict[str, Any]:
+    """Load a glossary file through the compiled cache
+
+    Parameters
+    ----------
+
+    path: :class:`pathlib.Path`
+        The glossary file.
+    directory: :class:`pathlib.Path`, optional
+        The directory for the compiled files instead of ``glossary`` in
+        :func:`cache.directory`.
+
+    Returns
+    -------
+
+    map of str:
+        The definitions in the file (see :func:`parse`).
+
+    """
+    path = path.resolve()
+    if directory is None:
+        directory = cache.directory() / "glossary"
+
+    compiled = directory / (
+        hashlib.sha256(str(path).encode("utf-8")).hexdigest() + ".json"
+    )
+    current = state(path)
+    try:
+        with compiled.open("r", encoding="utf-8") as stream:
+            entry = json.load(stream)
+
+        if entry["version"] == VERSION and entry["state"] == current:
+            return entry["data"]
+    except Exception:
+        entry = None
+
+    content = path.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+    if entry is not None and entry["version"] == VERSION \
+            and entry["sha256"] == digest:
+        data = entry["data"]
+    else:
+        data = parse(path, content)
+
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        cache.write(compiled, json.dumps(
+            {"version": VERSION, "state": current, "sha256": digest,
+             "data": data}
+        ).encode("utf-8"))
+    except (OSError, TypeError, ValueError):
+        # The options may hold values without a JSON form (e.g. dates)
+        pass
+
+    return data
+
+
+def metadata(doc: panflute.Doc) -> Any:
+    """The ``acronyms`` map of the metadata of the document
+
+    This is the :class:`panflute.MetaMap` or, for a document loaded by
+    :func:`raw.document`, the JSON of the map.  None if the document has
+    no ``acronyms``.
+    """
+    if "acronyms" in doc.metadata:
+        return doc.metadata["acronyms"]
+
+    return getattr(doc, "definitions", None)
+
+
+def definitions(doc: panflute.Doc,
+                directory: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The acronyms of the document from the glossaries and metadata
+
+    Parameters
+    ----------
+
+    doc: :class:`panflute.Doc`
+        The document under consideration.
+    directory: str, optional
+        The directory for relative paths (see :func:`paths`).
+
+    Returns
+    -------
+
+    map of str, optional:
+        The merged definitions ready for :class:`PandocAcro` or None if
+        the document has neither glossary files nor ``acronyms``.  The
+        definitions are the :class:`panflute.MetaMap` or the JSON of
+        each acronym (see :func:`metadata` and :func:`parse`) and the
+        merged ``options``.
+
+    """
+    files = paths(doc, directory)
+    acronyms = metadata(doc)
+    if not files and acronyms is None:
+        return None
+
+    merged: Dict[str, Any] = {}
+    options: Dict[str, Any] = {}
+    for path in files:
+        entries = dict(load(path))
+        options.update(entries.pop("options", {}))
+        merged.update(entries)
+
+    # The entries are converted when first used (see PandocAcro)
+    if isinstance(acronyms, panflute.MetaMap):
+        entries = dict(acronyms.content.dict)
+    elif isinstance(acronyms, dict) and acronyms.get("t") == "MetaMap":
+        entries = dict(acronyms["c"])
+    else:
+        entries = dict(PandocAcro.convert(acronyms) or {})
+
+    value = PandocAcro.convert(entries.pop("options", {}))
+    if isinstance(value, dict):
+        options.update(value)
+
+    merged.update(entries)
+    if options:
+        merged["options"] = options
+
+    return merged
@@ -0,0 +1,294 @@
+__doc__ = """Reuse the translations of the unchanged blocks of an earlier run
+
+Rebuilding a long book after editing one paragraph should not search
+every paragraph for keys again.  Setting ``$PANDOC_ACRO_INCREMENTAL`` to
+a non-empty value runs the JSON engine (see :mod:`pandocacro.raw`) with
+a cache of the top level blocks.  Each block is fingerprinted by a hash
+of its content.  The cache holds the uses of the acronyms counted in the
+block and, for each key in the block, its location, the form chosen,
+and the replacement.
+
+On a rebuild, only the blocks missing from the cache are scanned.  The
+totals are summed from the cached uses so the first and single use
+decisions are made exactly as in a full run.  A cached block is patched
+with the cached replacements when every key in it would still be
+expanded to the same form and is translated again otherwise.  The
+blocks holding a list of acronyms depend on the whole document and are
+never cached.
+
+The blocks are kept in a single file in ``blocks`` in the cache
+directory (see :func:`cache.directory`) named by the hash of the
+acronyms (see :meth:`raw.Glossaries.digest`) and the output format.
+Since the blocks are found by their content, the documents sharing the
+acronyms and format, such as the chapters of a book, share the file.
+The blocks of each run are kept ahead of those of the earlier runs up
+to :data:`SIZE` blocks so the chapters do not evict each other.
+"""
+
+import hashlib
+import marshal
+import pathlib
+import pickle
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import panflute
+
+from . import automark, cache, preamble, profiling, raw
+from .keys import Key
+from .list import printacronyms
+from .pandocacro import PandocAcro
+from .translate import choose, use
+
+VERSION: int = 1
+"""The version of the cached blocks"""
+
+SIZE: int = 32768
+"""The bound on the number of cached blocks"""
+
+Path = Tuple[Any, ...]
+"""The indices and fields leading to an element from the block"""
+
+
+class Block:
+    """A top level block of the document
+
+    Attributes
+    ----------
+
+    digest: str
+        The hash of the content of the block.
+    wrapper: list of dict
+        A list holding just the block so a list of acronyms at the top
+        level can be replaced.
+    counted: list of int
+        The ids of the counted uses of the acronyms.
+    uses: list, optional
+        The path, replacement, id, ``count``, ``type``, ``capitalize``,
+        ``plural``, and chosen form of each expanded key if cached.
+    sites: list of :class:`raw.Site`, optional
+        The key sites if the block was scanned.
+    lists: list of :class:`raw.Site`
+        The sites of the lists of acronyms.
+
+    """
+
+    __slots__ = ("digest", "wrapper", "counted", "uses", "sites", "lists")
+
+    def __init__(self, block: raw.Element):
+        # The marshal format before version 3 does not depend on the
+        # sharing of the objects and is much faster than JSON.
+        self.digest: str = hashlib.sha1(marshal.dumps(block, 2)).hexdigest()
+        self.wrapper: List[raw.Element] = [block]
+        self.counted: List[int] = []
+        self.uses: Optional[list] = None
+        self.sites: Optional[List[raw.Site]] = None
+        self.lists: List[raw.Site] = []
+
+    def scan(self, doc: panflute.Doc) -> None:
+        """Record the sites of the block"""
+        self.counted = []
+        self.sites, self.lists = raw.scan(doc, self.wrapper, self.counted)
+
+    def reuse(self, acronyms: PandocAcro, latex: bool,
+              keys: Dict[tuple, Key]) -> bool:
+        """Apply the cached replacements if every form is unchanged
+
+        The forms do not matter for LaTeX.  Otherwise, the uses are
+        replayed and the usage counts and list marks are restored if
+        any form differs.  The keys rebuilt from the uses are shared
+        through ``keys``.
+        """
+        assert self.uses is not None
+        if not latex:
+            saved = {use_[2]: (acronyms.counts[use_[2]],
+                               acronyms.listed[use_[2]])
+                     for use_ in self.uses}
+            for _, _, *fields, form in self.uses:
+                key = keys.get(tuple(fields))
+                if key is None:
+                    key = keys[tuple(fields)] = rebuild(*fields)
+
+                if choose(key, acronyms) != form:
+                    for id, (count, listed) in saved.items():
+                        acronyms.counts[id] = count
+                        acronyms.listed[id] = listed
+
+                    return False
+
+                use(key, form, acronyms)
+
+        for path, replacement, *_ in self.uses:
+            container: Any = self.wrapper
+            for step in path[:-1]:
+                container = container[step]
+
+            container[path[-1]] = replacement
+
+        return True
+
+    def translate(self, doc: panflute.Doc, latex: bool) -> list:
+        """Translate the scanned block and record the uses"""
+        assert self.sites is not None
+        paths: Dict[int, Path] = {}
+        locate(self.wrapper, (), paths)
+        sites: List[Tuple[raw.Site, Key, str]] = []
+
+        def record(site: raw.Site, key: Key) -> None:
+            sites.append((site, key, "" if latex
+                          else choose(key, doc.acronyms)))
+
+        raw.resolve(doc, self.sites, record)
+        return [[paths[id(site.container)] + (site.index,),
+                 site.container[site.index], key.id, key.count, key.type,
+                 key.capitalize, key.plural, form]
+                for site, key, form in sites]
+
+
+def rebuild(id: int, count: bool, type_: str, capitalize: bool,
+            plural: bool) -> Key:
+    """Rebuild a bound key from the fields of a cached use"""
+    key = Key()
+    key.count, key.type, key.capitalize, key.plural = \
+        count, type_, capitalize, plural
+    return key.bind(id)
+
+
+def locate(value: Any, path: Path, paths: Dict[int, Path]) -> None:
+    """Map the :func:`id` of each list in the JSON to its path"""
+    if type(value) is list:
+        paths[id(value)] = path
+        for index, item in enumerate(value):
+            if type(item) in (list, dict):
+                locate(item, path + (index,), paths)
+    else:
+        for name, item in value.items():
+            if type(item) in (list, dict):
+                locate(item, path + (name,), paths)
+
+
+def load(path: pathlib.Path) -> Dict[str, Any]:
+    """Load the cached blocks or nothing if the cache is unusable"""
+    try:
+        with path.open("rb") as stream:
+            entry = pickle.load(stream)
+
+        if entry["version"] == VERSION:
+            return entry["blocks"]
+    except Exception:
+        pass
+
+    return {}
+
+
+def save(path: pathlib.Path, blocks: Dict[str, Any]) -> None:
+    """Store the cached blocks atomically ignoring any error"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cache.write(path, pickle.dumps({"version": VERSION,
+                                        "blocks": blocks},
+                                       protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass
+
+
+def process(data: dict,
+            format: str,
+            prepare: Callable[..., None],
+            directory: Optional[pathlib.Path] = None) -> dict:
+    """Process a JSON document reusing the cached blocks
+
+    This is :func:`raw.process` with the cache of the top level blocks.
+
+    Parameters
+    ----------
+
+    data: dict
+        The decoded JSON document which is modified in place.
+    format: str
+        The output format.
+    prepare: callable
+        The function to prepare the document without the tally (see
+        :func:`pandocacro.prepare`).
+    directory: :class:`pathlib.Path`, optional
+        The directory of the cache instead of ``blocks`` in
+        :func:`cache.directory`.
+
+    Returns
+    -------
+
+    dict:
+        The processed JSON document.
+
+    """
+    with profiling.phase("prepare"):
+        doc = raw.document(data, format)
+        prepare(doc, tally=False)
+
+    acronyms = getattr(doc, "acronyms", None)
+    if acronyms is None:
+        return raw.process(data, format, prepare)
+
+    if directory is None:
+        directory = cache.directory() / "blocks"
+
+    path = directory / (hashlib.sha256("\0".join((
+        cache.version(doc), format, raw.Glossaries.digest(data)
+    )).encode("utf-8")).hexdigest() + ".pickle")
+    latex = format in ("latex", "beamer")
+    with profiling.phase("scan"):
+        store = load(path)
+        if automark.enabled(doc):
+            raw.mark(doc, data["blocks"])
+
+        meta = raw.Meta(doc, data)
+        blocks = [Block(elem) for elem in data["blocks"]]
+        for block in blocks:
+            entry = store.get(block.digest)
+            if entry is None:
+                block.scan(doc)
+            else:
+                block.counted, block.uses = entry
+
+            for id in block.counted:
+                acronyms.totals[id] += 1
+                acronyms.seen[id] = 1
+
+            for use_ in block.uses or ():
+                acronyms.seen[use_[2]] = 1
+
+    preamble.finish(doc)
+    meta.resolve(doc)
+    entries: Dict[str, Any] = {}
+    keys: Dict[tuple, Key] = {}
+    for block in blocks:
+        if block.uses is None or not block.reuse(acronyms, latex, keys):
+            if block.sites is None:
+                block.scan(doc)
+
+            block.uses = block.translate(doc, latex)
+            if block.lists:
+                continue
+
+        entries[block.digest] = [block.counted, block.uses]
+
+    meta.lists(doc)
+    with profiling.phase("lists"):
+        for block in blocks:
+            for site in block.lists:
+                elem = printacronyms(raw.convert(site.elem), doc)
+                if elem is not None:
+                    site.replace(elem)
+
+    data["blocks"] = [block.wrapper[0] for block in blocks]
+    meta.dump(doc, data)
+    for digest, entry in store.items():
+        if len(entries) >= SIZE:
+            break
+
+        entries.setdefault(digest, entry)
+
+    if entries != store:
+        save(path, entries)
+
+    return data
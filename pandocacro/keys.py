@@ -2,12 +2,17 @@ __doc__ = """The module for defining and parsing the key from an
 element.
 """
 
+import functools
 import re
 
-from typing import ClassVar, Match, Optional, Pattern, Set
+from typing import (ClassVar, Iterable, Match, Optional, Pattern, Set,
+                    Tuple)
 
 import panflute
 
+CACHE_SIZE: int = 4096
+"""The number of distinct tokens to remember in :func:`parse`"""
+
 
 class Key:
     """The key value and associated details
@@ -34,6 +39,13 @@ class Key:
         Use the plural form of the acronym.
     post: str, optional
         The trailing punctuation.
+    id: int
+        The index of the acronym in :class:`pandocacro.PandocAcro` or
+        -1 if the key is not bound to a document (see :meth:`bind`).
+
+    A key returned by :func:`parse` (and therefore :func:`get`) is shared
+    between every occurrence of the same token so it is frozen and any
+    attempt to modify it raises an :class:`AttributeError`.
 
     Arguments
     ---------
@@ -55,18 +67,108 @@ class Key:
         ))
     """The valid class options for the type of acronym expansion"""
 
-    def __init__(self, elem: Optional[panflute.Element] = None):
+    CLASSES: ClassVar[Set] = TYPES | set(("caps", "plural"))
+    """The classes that change the parsed key"""
+
+    __slots__ = ("value", "count", "type", "capitalize", "plural", "post",
+                 "id", "_frozen")
+
+    def __init__(self, elem: Optional[panflute.Element] = None,
+                 bare: bool = False):
         self.value: str = ""
         self.count: bool = True
         self.type: str = ""
         self.capitalize: bool = False
         self.plural: bool = False
         self.post: str = ""
+        self.id: int = -1
         if elem is not None:
-            self.parse(elem)
+            self.parse(elem, bare=bare)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError(
+                f"'{type(self).__name__}' parsed keys are immutable"
+            )
+
+        super().__setattr__(name, value)
+
+    @staticmethod
+    def token(elem: panflute.Element,
+              bare: bool = False) -> Tuple[str, bool]:
+        """Extract the text of an element that may hold a key
+
+        Parameters
+        ----------
+
+        elem: :class:`panflute.Element`
+            The document element to inspect for an acronym key.
+        bare: bool, optional
+            Read a :class:`panflute.Str` by its own text as if it were
+            the only content of a :class:`panflute.Span` even within a
+            :class:`panflute.Quoted`.
+
+        Returns
+        -------
+
+        str:
+            The text of the element or the empty string if the element
+            cannot hold a key.
+        bool:
+            The quotes must be stripped from the text because the
+            element is within a :class:`panflute.Quoted`.
+
+        """
+        if isinstance(elem, panflute.Str):
+            return elem.text, \
+                not bare and isinstance(elem.parent, panflute.Quoted)
+
+        if isinstance(elem, panflute.Span) and len(elem.content) == 1:
+            child = elem.content[0]
+            return child.text if isinstance(child, panflute.Str) \
+                else panflute.stringify(child), False
+
+        return "", False
 
     @staticmethod
-    def match(elem: panflute.Element) -> Optional[Match[str]]:
+    def reject(elem: panflute.Element) -> bool:
+        """Check if an element obviously cannot hold a key
+
+        This is a cheap test to run before any other work on the
+        element.  Only a :class:`panflute.Str` or a
+        :class:`panflute.Span` with a single child can hold a key, and
+        a key needs a ``+`` which must appear in the text of a
+        :class:`panflute.Str` child.  An element that passes may still
+        not hold a key.
+
+        Parameters
+        ----------
+
+        elem: :class:`panflute.Element`
+            The document element to inspect.
+
+        Returns
+        -------
+
+        bool:
+            True if the element cannot hold a key.
+
+        """
+        if isinstance(elem, panflute.Str):
+            return "+" not in elem.text
+
+        if isinstance(elem, panflute.Span):
+            if len(elem.content) != 1:
+                return True
+
+            child = elem.content[0]
+            return isinstance(child, panflute.Str) and "+" not in child.text
+
+        return True
+
+    @staticmethod
+    def match(elem: panflute.Element,
+              bare: bool = False) -> Optional[Match[str]]:
         """Pattern match for a key in the element
 
         We can convert a given element to a string and match it against
@@ -80,6 +182,10 @@ class Key:
 
         elem: :class:`panflute.Element`
             The document element to inspect for an acronym key.
+        bare: bool, optional
+            Read a :class:`panflute.Str` by its own text as if it were
+            the only content of a :class:`panflute.Span` even within a
+            :class:`panflute.Quoted`.
 
         Returns
         -------
@@ -89,20 +195,17 @@ class Key:
             version of the element.
 
         """
-        if isinstance(elem, panflute.Str):
-            content = panflute.stringify(elem)
-            if isinstance(elem.parent, panflute.Quoted):
-                content = re.sub("['\"]", "", content)
+        if Key.reject(elem):
+            # Nothing can match so skip the substitution and regex.
+            return None
 
-        elif isinstance(elem, panflute.Span):
-            content = panflute.stringify(elem.content[0]) \
-                if len(elem.content) == 1 else ""
-        else:
-            content = ""
+        content, quoted = Key.token(elem, bare=bare)
+        if quoted:
+            content = re.sub("['\"]", "", content)
 
         return Key.PATTERN.match(content)
 
-    def parse(self, elem: panflute.Element) -> None:
+    def parse(self, elem: panflute.Element, bare: bool = False) -> None:
         """Parse the key from a document element
 
         This method does the low-level details of extracting the
@@ -111,7 +214,7 @@ class Key:
         “don't count” flag ``*`` followed by the actual key.  It then
         extracts the class details to set the type, capitalization, and
         plural details if the element has the appropriate classes
-        attribute.
+        attribute.  The ``bare`` flag is passed to :meth:`match`.
 
         Raises
         ------
@@ -121,14 +224,51 @@ class Key:
             the valid ``TYPES``.
 
         """
-        match = self.match(elem)
+        text, quoted = self.token(elem, bare=bare)
+        self.read(text, getattr(elem, "classes", ()), quoted=quoted)
+
+    def read(self, text: str,
+             classes: Iterable[str] = (),
+             quoted: bool = False) -> bool:
+        """Read the key from the text and classes of an element
+
+        This is the work horse of :meth:`parse` once the text has been
+        extracted with :meth:`token`.
+
+        Parameters
+        ----------
+
+        text: str
+            The text of the element.
+        classes: iterable of str
+            The classes of the element.
+        quoted: bool
+            Strip the quotes from the text before matching.
+
+        Returns
+        -------
+
+        bool:
+            If the text held a key.
+
+        Raises
+        ------
+
+        RuntimeError:
+            If the ``classes`` contain more than one of the valid
+            ``TYPES``.
+
+        """
+        match = self.PATTERN.match(
+            re.sub("['\"]", "", text) if quoted else text
+        )
         if not match:
-            return None
+            return False
 
         self.value = match.group("value")
         self.count = match.groupdict().get("count", "") != "*"
-        types = [] if not hasattr(elem, "classes") \
-            else [c for c in elem.classes if c in self.TYPES]
+        classes = list(classes)
+        types = [c for c in classes if c in self.TYPES]
         if len(types) > 1:
             name = type(self).__name__
             raise RuntimeError(
@@ -136,9 +276,35 @@ class Key:
             )
 
         self.type = "" if len(types) == 0 else types[0]
-        self.capitalize = hasattr(elem, "classes") and "caps" in elem.classes
-        self.plural = hasattr(elem, "classes") and "plural" in elem.classes
+        self.capitalize = "caps" in classes
+        self.plural = "plural" in classes
         self.post = match.groupdict().get("post", "")
+        return True
+
+    def bind(self, id: int) -> "Key":
+        """Create a frozen copy of the key with the given acronym id
+
+        Parameters
+        ----------
+
+        id: int
+            The index of the acronym.
+
+        Returns
+        -------
+
+        :class:`Key`:
+            The bound key.
+
+        """
+        key = Key()
+        for name in ("value", "count", "type", "capitalize", "plural",
+                     "post"):
+            setattr(key, name, getattr(self, name))
+
+        key.id = id
+        key._frozen = True
+        return key
 
     def __str__(self) -> str:
         return "[+" + ("" if self.count else "*") \
@@ -152,15 +318,51 @@ class Key:
             + "}" + self.post
 
 
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse(text: str,
+          classes: Tuple[str, ...] = (),
+          quoted: bool = False) -> Optional[Key]:
+    """Parse a key from a token with memoization
+
+    Identical tokens such as ``+api.`` are parsed once and the frozen
+    :class:`Key` is shared by all occurrences.  The least recently used
+    tokens are forgotten once more than :data:`CACHE_SIZE` distinct
+    tokens have been seen.
+
+    Parameters
+    ----------
+
+    text: str
+        The text of the element from :meth:`Key.token`.
+    classes: tuple of str
+        The classes of the element.  Only those in
+        :attr:`Key.CLASSES` should be passed to share the cache.
+    quoted: bool
+        The element is within a :class:`panflute.Quoted`.
+
+    Returns
+    -------
+
+    Key:
+        The frozen key or None if the token is not a key.
+
+    """
+    key = Key()
+    if not key.read(text, classes, quoted=quoted):
+        return None
+
+    key._frozen = True
+    return key
+
+
 def count(elem: panflute.Element, doc: panflute.Doc) -> None:
     """Count the use of acronyms in the document
 
-    This method investigates the element and increments the 'count'
-    value of the acronym in the :class:`panflute.MetaMap` of the
-    document.  If the acronym does not have a 'count' field, it is
-    added.  It is intended to be used to prepare the document before
-    actually doing the actual substitution.  It also sets the 'used'
-    field to False.
+    This method investigates the element and increments the total
+    uses of the acronym in :attr:`pandocacro.PandocAcro.totals` unless
+    the key is marked “do not count.”  Either way, the acronym is marked
+    in :attr:`pandocacro.PandocAcro.seen`.  It is intended to be used to
+    prepare the document before actually doing the actual substitution.
 
     Parameters
     ----------
@@ -173,10 +375,14 @@ def count(elem: panflute.Element, doc: panflute.Doc) -> None:
     """
     key = get(elem, doc)
     if key:
-        doc.acronyms[key.value]["total"] += 1 if key.count else 0
+        doc.acronyms.seen[key.id] = 1
+        if key.count:
+            doc.acronyms.totals[key.id] += 1
 
 
-def get(elem: panflute.Element, doc: panflute.Doc) -> Optional[Key]:
+def get(elem: panflute.Element,
+        doc: panflute.Doc,
+        bare: bool = False) -> Optional[Key]:
     """Extract the key from an element
 
     Check if the given element contains a key in the metadata ``acronyms``
@@ -190,22 +396,28 @@ def get(elem: panflute.Element, doc: panflute.Doc) -> Optional[Key]:
         The element under inspection
     doc: :class:`panflte.Doc`
         The main document
+    bare: bool, optional
+        Read a :class:`panflute.Str` by its own text (see
+        :meth:`Key.match`).
 
     Returns
     -------
 
     Key:
-        The populated :class:`Key` if the value is in the ``acronyms``
-        metadata.  Otherwise, None.
+        The populated :class:`Key` bound to the acronym id (see
+        :meth:`pandocacro.PandocAcro.bind`) if the value is in the
+        ``acronyms`` metadata.  Otherwise, None.
 
     """
-    # Check for the main acronym database
-    if "acronyms" not in doc.metadata:
+    if Key.reject(elem):
         return None
 
-    match = Key.match(elem)
-    if not match:
+    # Check for the main acronym database
+    if getattr(doc, "acronyms", None) is None:
         return None
 
-    key = Key(elem)
-    return key if key.value in doc.acronyms else None
+    text, quoted = Key.token(elem, bare=bare)
+    classes = tuple(c for c in getattr(elem, "classes", ())
+                    if c in Key.CLASSES)
+    key = parse(text, classes, quoted)
+    return doc.acronyms.bind(key) if key else None
@@ -1,11 +1,14 @@
 __doc__ = """Functions to generate the list of acronyms"""
 
+import json
 import logging
 
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 import panflute
 
+from . import cache, glossary
+
 
 def printacronyms(elem: panflute.Element,
                   doc: panflute.Doc) -> Optional[panflute.Block]:
@@ -118,7 +121,7 @@ def plain(elem: Union[panflute.Div, panflute.Header],
 
     """
     logger = logging.getLogger(__name__ + ".plain_text")
-    if "acronyms" not in doc.metadata:
+    if getattr(doc, "acronyms", None) is None:
         return None
 
     if isinstance(elem, panflute.Header):
@@ -141,18 +144,87 @@ def plain(elem: Union[panflute.Div, panflute.Header],
     else:
         sort = "true"
 
+    listed = [(key, doc.acronyms[key]) for id, key
+              in enumerate(doc.acronyms.names) if doc.acronyms.listed[id]]
     if sort == "true":
-        acronyms = sorted(doc.acronyms.values(), key=lambda x: x["short"])
-    else:
-        acronyms = doc.acronyms.values()
+        listed.sort(key=lambda x: x[1]["short"])
 
+    longs = [inlines(doc, key, "long") for key, _ in listed]
+    # Fields that are only available as text are parsed together.
+    texts = [acro["long"] for (_, acro), long_ in zip(listed, longs)
+             if long_ is None]
+    parsed = iter(cache.parse(texts, doc) if texts else [])
     acrolist = [panflute.ListItem(
         panflute.Plain(
             panflute.Strong(panflute.Str(acro["short"])),
             panflute.Str(":"),
             panflute.Space,
-            *panflute.convert_text(acro["long"])[0].content
+            *(next(parsed) if long_ is None else long_)
             )
-        ) for acro in acronyms if acro["list"]]
+        ) for (_, acro), long_ in zip(listed, longs)]
     return panflute.Div(header, panflute.BulletList(*acrolist),
                         identifier="acronym-list")
+
+
+def inlines(doc: panflute.Doc,
+            key: str,
+            field: str) -> Optional[List[panflute.Inline]]:
+    """Get a copy of the inlines of an acronym field
+
+    The metadata, and the compiled glossary files (see
+    :func:`glossary.parse`), already hold the parsed version of the
+    fields of the acronyms so we copy those inlines rather than asking
+    Pandoc to parse the text again.  A multi-paragraph field is reduced
+    to its first paragraph.  If the metadata does not hold inlines (e.g.
+    the field was passed as a plain string), the text must be parsed
+    with :func:`cache.parse`.
+
+    Parameters
+    ----------
+
+    doc: :class:`panflute.Doc`
+        The document under consideration.
+    key: str
+        The acronym key.
+    field: str
+        The field of the acronym such as ``long``.
+
+    Returns
+    -------
+
+    list of :class:`panflute.Inline`, optional:
+        The copied inlines that can be placed in the document or None
+        if the field must be parsed.
+
+    """
+    acronyms = glossary.metadata(doc)
+    if isinstance(acronyms, panflute.MetaMap) and key in acronyms.content:
+        entry = acronyms[key]
+    elif isinstance(acronyms, dict) and key in acronyms.get("c", {}):
+        # The JSON of the map (see raw.document)
+        entry = acronyms["c"][key]
+    else:
+        # The JSON of an acronym from a glossary file (see glossary.parse)
+        entry = doc.acronyms.definitions.get(key)
+
+    try:
+        if isinstance(entry, panflute.MetaMap):
+            value = entry[field]
+        else:
+            value = json.loads(json.dumps(entry["c"][field]),
+                               object_hook=panflute.elements.from_json)
+    except (KeyError, TypeError):
+        value = None
+
+    if isinstance(value, panflute.MetaBlocks) and len(value.content) > 0 \
+            and isinstance(value.content[0], (panflute.Plain,
+                                              panflute.Para)):
+        value = value.content[0]
+
+    if isinstance(value, (panflute.MetaInlines, panflute.Plain,
+                          panflute.Para)):
+        # A round trip through the JSON form is a cheap deep copy.
+        return json.loads(json.dumps(value.content.to_json()),
+                          object_hook=panflute.elements.from_json)
+
+    return None
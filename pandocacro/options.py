@@ -3,9 +3,10 @@ __doc__ = """The module for processing options"""
 import re
 import warnings
 
-from typing import List
+from typing import Dict, List, Optional, Union
 
-from .pandocacro import Options
+Options = Dict[str, Union[str, int, bool]]
+r"""Options to pass to ``\usepackage`` when loading ``acro``."""
 
 VALID_STYLES: List[str] = [
     "long-short",
@@ -98,3 +99,85 @@ def acsetup(metamap: Options,
     return "" if len(output) == 0 else (
         r"\acsetup{" + ",".join(output) + "}"
     )
+
+
+class Configuration:
+    r"""The options compiled once for the whole document
+
+    The options from the metadata are validated and interpreted when the
+    configuration is created so nothing is parsed when an acronym is
+    used.  The same object provides the ``\acsetup`` line for the LaTeX
+    header and the styles and threshold for the plain text output.
+
+    Attributes
+    ----------
+
+    options: :class:`Options`
+        The map of options from the metadata.
+    acsetup: str
+        The ``\acsetup`` line for the header or the empty string.
+    first_style: str
+        The style of the first and full uses.
+    single_style: str
+        The style of a single use.
+    single: int
+        The largest number of counted uses that is still a single use.
+    styles: map of str to str
+        The style of each plain text form of an acronym.
+
+    Arguments
+    ---------
+
+    options: :class:`Options`, optional
+        The map of options from the metadata.
+    silent: bool
+        Disable all warnings.
+
+    """
+
+    def __init__(self, options: Optional[Options] = None,
+                 silent: bool = False):
+        self.options: Options = dict(options or {})
+        self.acsetup: str = acsetup(self.options, silent=silent)
+        self.first_style: str = str(
+            self.options.get("first-style", "long-short")
+        )
+        self.single_style: str = str(self.options.get("single-style", "long"))
+        self.single: int = threshold(self.options.get("single", False))
+        self.styles: Dict[str, str] = {
+            "short": "short",
+            "long": "long",
+            "first": self.first_style,
+            "single": self.single_style,
+        }
+
+
+def threshold(single: Union[str, int, bool]) -> int:
+    """Interpret the ``single`` option as a number of uses
+
+    An acronym used at most this many times (not counting starred uses)
+    is typeset with the ``single-style``.  A boolean is equivalent to 1
+    or 0.  A value that cannot be interpreted is 0 (see
+    :func:`options` for the warning).
+
+    Parameters
+    ----------
+
+    single: str, int, or bool
+        The value of the option.
+
+    Returns
+    -------
+
+    int:
+        The threshold.
+
+    """
+    if isinstance(single, (bool, int)):
+        return int(single)
+
+    value = str(single).strip().lower()
+    if value in ("true", "false"):
+        return int(value == "true")
+
+    return int(value) if value.isdigit() else 0
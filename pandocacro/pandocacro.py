@@ -1,64 +1,348 @@
 __doc__ = """Class definitions for the package"""
 
-from typing import Dict, Union
+import array
+import json
+import types
 
-Acronym = Dict[str, Union[str, int, bool]]
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+import panflute
+
+from .keys import CACHE_SIZE, Key
+from .options import Configuration, Options
+
+Acronym = Mapping[str, Union[str, int, bool]]
 r"""A map of options passed to ``\DeclareAcronym`` and metadata variables.
 """
 
-Options = Dict[str, Union[str, int, bool]]
-r"""Options to pass to ``\usepackage`` when loading ``acro``."""
+Form = Tuple[str, bool]
+"""The plain text of an acronym and if it should appear in the list"""
+
+META: Tuple[str, ...] = ("MetaMap", "MetaList", "MetaBool", "MetaString",
+                         "MetaInlines", "MetaBlocks")
+"""The types of the JSON of the metadata values"""
+
+PLAIN: Tuple[str, ...] = ("Str", "Space", "SoftBreak", "LineBreak")
+"""The inlines converted to text without panflute"""
+
+
+def builtin(value: Dict[str, Any]) -> Any:
+    """Convert the JSON of a metadata value to Python builtins
+
+    This matches :func:`panflute.meta2builtin` without building the
+    panflute objects.  Only inlines other than plain words and spaces
+    are converted to panflute to be stringified.
+    """
+    tag, content = value["t"], value.get("c", [])
+    if tag == "MetaMap":
+        return {k: builtin(v) for k, v in content.items()}
+
+    if tag == "MetaList":
+        return [builtin(v) for v in content]
+
+    if tag in ("MetaBool", "MetaString"):
+        return content
+
+    if tag == "MetaInlines" and all(e["t"] in PLAIN for e in content):
+        return "".join(e["c"] if e["t"] == "Str" else " " for e in content)
+
+    return panflute.stringify(json.loads(
+        json.dumps(value), object_hook=panflute.elements.from_json
+    ))
 
 
 class PandocAcro:
     """A class for managing the acronyms in a document
 
-    This class stores a copy of the acronyms field from the metadata in
-    a easily modifiable location.  It loads the options into a
-    dictionary where the keys map to the values, and it places the
-    acronyms into a dictionary that maps the keys to the formatting
-    options for the acronym.  The acronyms can also be accessed using
-    a mapping notation ``obj['key']``.  The intended usage is to
+    This class stores a copy of the acronyms field from the metadata.
+    It loads the options into a dictionary where the keys map to the
+    values, and it places the acronyms into a dictionary that maps the
+    keys to the read only formatting options for the acronym.  The
+    acronyms can also be accessed using a mapping notation
+    ``obj['key']``.  Each acronym is given a small integer id in the
+    order of the metadata and the usage of the acronyms is tracked in
+    compact arrays indexed by the id.  The intended usage is to
     initialize the class from the call to the document's
     :func:`get_metadata`::
 
         obj = PandocAcro(doc.get_metadata("acronyms"))
 
+    The definitions may also be the :class:`panflute.MetaMap`, or its
+    JSON, of each acronym straight from the metadata.  Each definition
+    is only converted, and its rendering table built, when the acronym
+    is first looked up so a large glossary costs little when a document
+    uses a few of the acronyms.  The engines convert a definition
+    holding a key before the key is translated in the metadata (see
+    :func:`engine.settle`).
+
     Attributes
     ----------
 
+    definitions: map of str
+        The definition of each acronym as given.
     acronyms: map of strings :class:`Acronyms`
-        The mapping of the acronym keys to the formatting options for
-        the acronym.  The keys can also be accessed using index
-        notation.
+        The mapping of the acronym keys to the read only formatting
+        options for the acronyms converted so far.  Use the index
+        notation to look up any acronym.
+    names: list of str
+        The acronym keys indexed by the id.
+    ids: map of str to int
+        The id of each acronym key.
     options: :class:`Options`
         The mapping of the option names to the values.
+    config: :class:`options.Configuration`
+        The options validated and compiled once.
+    forms: list of the rendering tables
+        The plain text of every form of each acronym indexed by the id
+        (see :meth:`form`) or None until the acronym is first used.
+    counts: :class:`array.array`
+        The number of counted uses of each acronym translated so far.
+    totals: :class:`array.array`
+        The number of counted uses of each acronym in the document.
+    listed: bytearray
+        A non-zero entry if the acronym should appear in the list.
+    seen: bytearray
+        A non-zero entry if the acronym appears in the document even if
+        the uses are not counted.
+    compiled: map of str
+        The structures built from the definitions on first use (e.g.
+        :func:`automark.trie`) which are shared with the copies.
 
     """
 
-    def __init__(self, acronyms: Dict[str, Union[Acronym, Options]]):
-        self.acronyms: Dict[str, Acronym] = {
+    def __init__(self, acronyms: Mapping[str, Any]):
+        self.definitions: Dict[str, Any] = {
             k: v for k, v in acronyms.items() if k != "options"
         }
-        self.options: Options = acronyms.get("options", {})
+        self.acronyms: Dict[str, Acronym] = {}
+        self.names: List[str] = list(self.definitions)
+        self.ids: Dict[str, int] = {k: i for i, k in enumerate(self.names)}
+        self.options: Options = dict(self.convert(acronyms.get("options",
+                                                               {})))
+        self.config: Configuration = Configuration(self.options)
+        self.forms: List[Optional[Dict[Tuple[str, bool, bool],
+                                       Optional[Form]]]] \
+            = [None] * len(self.names)
+        self.bound: Dict[Key, Key] = {}
+        self.compiled: Dict[str, Any] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the usage of all acronyms"""
+        size = len(self.names)
+        self.counts: array.array = array.array("L", [0]) * size
+        self.totals: array.array = array.array("L", [0]) * size
+        self.listed: bytearray = bytearray(size)
+        self.seen: bytearray = bytearray(size)
+
+    def copy(self) -> "PandocAcro":
+        """Create a copy with its own usage
+
+        The definitions, options, and rendering tables are shared with
+        the copy so it is cheap to process another document with the
+        same acronyms.
+        """
+        # Not copy.copy which would drop the converted acronyms with
+        # __getstate__
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        other.reset()
+        return other
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The read only views cannot be pickled so they are converted
+        # again when used (see pandocacro.batch).
+        state = self.__dict__.copy()
+        state["acronyms"] = {}
+        return state
+
+    @staticmethod
+    def convert(value: Any) -> Any:
+        """Convert a metadata value or its JSON to Python builtins
+
+        Values that are not :class:`panflute.MetaValue` are returned as
+        is.
+        """
+        if isinstance(value, dict) and value.get("t") in META:
+            return builtin(value)
+
+        if isinstance(value, panflute.MetaValue):
+            return panflute.tools.meta2builtin(value)
+
+        return value
+
+    def bind(self, key: Key) -> Optional[Key]:
+        """Attach the id of the acronym to a parsed key
+
+        The keys from :func:`keys.parse` are shared by every occurrence
+        of the same token so the bound copy is remembered for each
+        shared key and the acronym key is only looked up once.  The
+        parse keeps at most :data:`keys.CACHE_SIZE` keys so the bound
+        copies are forgotten once that many are remembered rather than
+        growing with every document the copies process.
+
+        Parameters
+        ----------
+
+        key: :class:`keys.Key`
+            The parsed key.
+
+        Returns
+        -------
+
+        :class:`keys.Key`, optional:
+            The frozen copy of the key with the id set or None if the
+            key is not a known acronym.
+
+        """
+        bound = self.bound.get(key)
+        if bound is None:
+            id = self.ids.get(key.value)
+            if id is None:
+                return None
+
+            if len(self.bound) >= CACHE_SIZE:
+                self.bound.clear()
+
+            bound = self.bound[key] = key.bind(id)
+
+        return bound
+
+    @staticmethod
+    def text(acronym: Acronym, field: str, plural: bool = False) -> str:
+        """The plain text of the ``short`` or ``long`` field
+
+        The plural is the ``-plural-form`` of the field if given or else
+        the field with the ``-plural`` ending (``s`` by default).
+        """
+        if not plural:
+            return str(acronym[field])
+
+        if acronym.get(field + "-plural-form"):
+            return str(acronym[field + "-plural-form"])
+
+        return str(acronym[field]) + str(acronym.get(field + "-plural", "s"))
+
+    def compile(self, acronym: Acronym
+                ) -> Dict[Tuple[str, bool, bool], Optional[Form]]:
+        """Build the rendering table of an acronym
+
+        The table maps the form, plural, and capitalization to the
+        plain text of the acronym and if using that form should add the
+        acronym to the list.  The forms are the keys of
+        :attr:`options.Configuration.styles`.
+        A form with a style that cannot be rendered in plain text (e.g.
+        ``footnote``) is stored as None so the error is only raised if
+        the form is actually used.
+
+        Parameters
+        ----------
+
+        acronym: :class:`Acronym`
+            The definition of the acronym.
+
+        Returns
+        -------
+
+        map of (str, bool, bool) to :class:`Form`:
+            The table for the acronym.
+
+        """
+        table: Dict[Tuple[str, bool, bool], Optional[Form]] = {}
+        for plural in (False, True):
+            long_ = self.text(acronym, "long", plural)
+            short_ = self.text(acronym, "short", plural)
+
+            for form, style in self.config.styles.items():
+                if style == "long-short":
+                    rendered: Optional[Form] = \
+                        (long_ + " (" + str(acronym["short"]) + ")", True)
+                elif style == "short-long":
+                    rendered = \
+                        (short_ + " (" + str(acronym["long"]) + ")", True)
+                elif style == "long":
+                    rendered = (long_, False)
+                elif style == "short":
+                    rendered = (short_, True)
+                else:
+                    rendered = None
+
+                table[form, plural, False] = rendered
+                table[form, plural, True] = None if rendered is None \
+                    else (rendered[0][:1].upper() + rendered[0][1:],
+                          rendered[1])
+
+        return table
+
+    def form(self, key: Union[str, int], form: str,
+             plural: bool = False,
+             capitalize: bool = False) -> Form:
+        """Look up the plain text form of an acronym
+
+        Parameters
+        ----------
+
+        key: str or int
+            The acronym key or id.
+        form: str
+            The form of the acronym (see
+            :attr:`options.Configuration.styles`).
+        plural: bool, optional
+            Use the plural form.
+        capitalize: bool, optional
+            Capitalize the first letter.
+
+        Returns
+        -------
+
+        :class:`Form`:
+            The text and if it should be added to the list.
+
+        Raises
+        ------
+
+        NotImplementedError:
+            When the style of the form cannot be rendered.
+
+        """
+        id = key if isinstance(key, int) else self.ids[key]
+        table = self.forms[id]
+        if table is None:
+            table = self.forms[id] = self.compile(self[self.names[id]])
+
+        rendered = table[form, plural, capitalize]
+        if rendered is None:
+            style = self.config.styles[form]
+            name = type(self).__name__
+            raise NotImplementedError(
+                f"'{name}.form' unknown style '{style}'"
+            )
+
+        return rendered
 
     def __getitem__(self, key):
-        return self.acronyms[key]
+        acronym = self.acronyms.get(key)
+        if acronym is None:
+            acronym = self.acronyms[key] = types.MappingProxyType(
+                self.convert(self.definitions[key])
+            )
+
+        return acronym
 
     def __contains__(self, key):
-        return key in self.acronyms
+        return key in self.ids
 
     def __iter__(self):
-        return iter(self.acronyms)
+        return iter(self.names)
 
     def __len__(self):
-        return len(self.acronyms)
+        return len(self.names)
 
     def keys(self):
-        return self.acronyms.keys()
+        return self.ids.keys()
 
     def values(self):
-        return self.acronyms.values()
+        return [self[k] for k in self.names]
 
     def items(self):
-        return self.acronyms.items()
+        return [(k, self[k]) for k in self.names]
@@ -0,0 +1,261 @@
+__doc__ = r"""The LaTeX preamble declaring the acronyms
+
+The ``acro`` package, its options, and a ``\DeclareAcronym`` for every
+acronym are added to the ``header-includes`` of the document as a single
+raw LaTeX chunk.  Pandoc writes each item of ``header-includes`` on its
+own line so the chunk is the text those items would have produced.  One
+chunk keeps the metadata handed back to Pandoc small for a large
+glossary.
+
+With a large shared glossary, only the acronyms used in the document
+need to be declared:
+
+.. code-block:: yaml
+
+    ---
+    pandoc-acro:
+      declare: used
+    ...
+
+An acronym is used if it appears in the document even when the use is
+not counted (e.g. ``+*afaik``).  The acronyms referenced from the fields
+of a used acronym, either as a key (``+afaik``) or an ``acro`` macro
+(``\ac{afaik}``), are declared as well.  The preamble is then added
+once the document is scanned (see :func:`finish`).
+
+When many documents share the same glossary, the preamble can instead
+be written to a ``.tex`` file in a ``sidecar`` directory with only an
+``\input`` of the file added to the ``header-includes``:
+
+.. code-block:: yaml
+
+    ---
+    pandoc-acro:
+      sidecar: build/acro
+    ...
+
+The file is named by the hash of the definitions, the options, and the
+declared acronyms (see :func:`digest`) so every document with the same
+acronyms shares it and the preamble is only built and written once.  As the
+file does not change, it can also be precompiled into a LaTeX format.
+The directory is relative to where Pandoc is run and is used as written
+in the ``\input`` so LaTeX must be run from the same directory.
+"""
+
+import hashlib
+import json
+import logging
+import pathlib
+import re
+
+from typing import Any, Iterable, List, Mapping, Optional, Pattern, Set
+
+import panflute
+
+from . import cache
+from .pandocacro import PandocAcro
+
+REFERENCE: Pattern[str] = re.compile(
+    r"\\[aA]c[a-z]*[*]?\{(?P<macro>[^}]+)\}|[+][*]?(?P<key>\w+)"
+)
+"""The pattern of a reference to another acronym in a field"""
+
+
+def declaration(key: str, values: Mapping[str, Any]) -> str:
+    r"""The ``\DeclareAcronym`` of an acronym"""
+    # The short key *must be first*!
+    return "\n".join((
+        fr"\DeclareAcronym{{{key}}}{{",
+        f"short = {values['short']},",
+        ",\n".join(f"{k} = {v}" for k, v in sorted(values.items())
+                   if k != "short"),
+        "}",
+    ))
+
+
+def text(acronyms: PandocAcro, keys: Optional[Iterable[str]] = None) -> str:
+    """The preamble for the acronyms
+
+    Parameters
+    ----------
+
+    acronyms: :class:`PandocAcro`
+        The acronyms of the document.
+    keys: iterable of str, optional
+        The acronyms to declare instead of all of them.
+
+    Returns
+    -------
+
+    str:
+        The LaTeX preamble.
+
+    """
+    lines: List[str] = [r"\usepackage{acro}"]
+    if acronyms.config.acsetup:
+        lines.append(acronyms.config.acsetup)
+
+    lines.extend(declaration(k, acronyms[k])
+                 for k in (acronyms.keys() if keys is None else keys))
+    return "\n".join(lines)
+
+
+def encode(value: Any) -> Any:
+    """The JSON of a metadata value in the definitions for the hash"""
+    return value.to_json() if isinstance(value, panflute.Element) \
+        else str(value)
+
+
+def digest(acronyms: PandocAcro,
+           keys: Optional[Iterable[str]] = None) -> str:
+    """The hash of the state the preamble is built from
+
+    The hash covers the definitions, the ``acsetup`` of the options, and
+    the acronyms to declare if given.  The hash of the definitions is
+    computed once and shared with the copies of the acronyms.
+    """
+    definitions = acronyms.compiled.get("definitions")
+    if definitions is None:
+        definitions = acronyms.compiled["definitions"] = hashlib.sha256(
+            json.dumps(list(acronyms.definitions.items()), sort_keys=True,
+                       default=encode).encode("utf-8")
+        ).hexdigest()
+
+    state = [definitions, acronyms.config.acsetup,
+             None if keys is None else list(keys)]
+    return hashlib.sha256(json.dumps(state).encode("utf-8")).hexdigest()
+
+
+def include(doc: panflute.Doc, latex: str) -> None:
+    """Append raw LaTeX to the ``header-includes`` of the document
+
+    A single ``header-includes`` value that is not a list is kept as the
+    first item of the list.
+    """
+    header = doc.metadata["header-includes"] \
+        if "header-includes" in doc.metadata else panflute.MetaList()
+    if not isinstance(header, panflute.MetaList):
+        header = panflute.MetaList(header)
+
+    header.append(panflute.MetaInlines(panflute.RawInline(latex,
+                                                          format="latex")))
+    doc.metadata["header-includes"] = header
+
+
+def sidecar(doc: panflute.Doc,
+            keys: Optional[List[str]] = None,
+            directory: Optional[str] = None) -> Optional[str]:
+    r"""Write the preamble to the sidecar file
+
+    The file is written to the ``sidecar`` directory of the
+    ``pandoc-acro`` map in the metadata unless it already exists in
+    which case the preamble is not built.  A relative directory is
+    relative to the ``directory`` if given (see
+    :mod:`pandocacro.server`) or else the working directory.
+
+    Parameters
+    ----------
+
+    doc: :class:`panflute.Doc`
+        The prepared document.
+    keys: list of str, optional
+        The acronyms to declare instead of all of them.
+    directory: str, optional
+        The working directory of the Pandoc run.
+
+    Returns
+    -------
+
+    str, optional:
+        The ``\input`` of the file or None if there is no ``sidecar``
+        directory or the file cannot be written.
+
+    """
+    options = doc.get_metadata("pandoc-acro", {})
+    value = options.get("sidecar") if isinstance(options, dict) else None
+    if not value:
+        return None
+
+    name = pathlib.PurePosixPath(str(value)) / (
+        "acro-" + digest(doc.acronyms, keys)[:16] + ".tex"
+    )
+    path = pathlib.Path(directory or ".") / name
+    if not path.exists():
+        latex = text(doc.acronyms, keys)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            cache.write(path, (latex + "\n").encode("utf-8"))
+        except OSError as exc:
+            logging.getLogger(__name__).warning(
+                f"Cannot write the preamble to '{path}': {exc}"
+            )
+            return None
+
+    return fr"\input{{{name}}}"
+
+
+def add(doc: panflute.Doc, keys: Optional[Iterable[str]] = None) -> None:
+    """Add the preamble for the acronyms of the document
+
+    The preamble is written to a sidecar file if requested (see
+    :func:`sidecar`) and is otherwise included directly.  The
+    ``directory`` of the run is taken from the document if set by
+    :func:`pandocacro.prepare`.
+    """
+    names = None if keys is None else list(keys)
+    include(doc, sidecar(doc, names, getattr(doc, "directory", None))
+            or text(doc.acronyms, names))
+
+
+def restricted(doc: panflute.Doc) -> bool:
+    """Check if only the used acronyms are to be declared
+
+    This reads ``declare`` in the ``pandoc-acro`` map of the metadata
+    which is either ``all`` (the default) or ``used``.  Any other value
+    is logged and ignored.
+    """
+    options = doc.get_metadata("pandoc-acro", {})
+    value = options.get("declare", "all") if isinstance(options, dict) \
+        else "all"
+    if value not in ("all", "used"):
+        logging.getLogger(__name__).warning(
+            f"Unknown 'declare' option '{value}'"
+        )
+
+    return value == "used"
+
+
+def referenced(acronyms: PandocAcro) -> List[str]:
+    """The acronyms seen in the document and those their fields reference
+
+    Returns
+    -------
+
+    list of str:
+        The acronym keys in the order of the definitions.
+
+    """
+    found: Set[str] = {k for k, seen in zip(acronyms.names, acronyms.seen)
+                       if seen}
+    pending = list(found)
+    while pending:
+        for value in acronyms[pending.pop()].values():
+            for match in REFERENCE.finditer(str(value)):
+                key = match.group("macro") or match.group("key")
+                if key in acronyms and key not in found:
+                    found.add(key)
+                    pending.append(key)
+
+    return [k for k in acronyms.names if k in found]
+
+
+def finish(doc: panflute.Doc) -> None:
+    """Add the preamble of the used acronyms after the scan
+
+    Nothing is done unless the declarations are restricted (see
+    :func:`restricted`) in which case :func:`pandocacro.prepare` left
+    the preamble for this.
+    """
+    acronyms = getattr(doc, "acronyms", None)
+    if acronyms is not None and restricted(doc):
+        add(doc, referenced(acronyms))
@@ -0,0 +1,157 @@
+__doc__ = """Opt in timing of the phases of the filter
+
+Setting ``$PANDOC_ACRO_PROFILE`` to a path times each phase of a run of
+the filter (loading the JSON, :func:`pandocacro.prepare`, the walks,
+the lists of acronyms, and dumping the JSON) and writes a JSON report to
+the path.  If the path is a directory, each run writes a new report in
+it.  Setting ``$PANDOC_ACRO_PROFILE_TOOLS`` to a comma separated list
+with ``cprofile`` saves the :mod:`cProfile` statistics next to the
+report and ``tracemalloc`` adds the peak memory and the largest
+allocations to the report.  Nothing is written to standard output which
+Pandoc reads for the document.
+"""
+
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import pathlib
+import sys
+import time
+import tracemalloc
+
+from typing import ContextManager, Dict, Iterator, List, Optional
+
+TOP: int = 20
+"""The number of the largest allocations to report"""
+
+
+class Profile:
+    """The timers of a run of the filter
+
+    Attributes
+    ----------
+
+    path: :class:`pathlib.Path`
+        The file for the report.
+    tools: list of str
+        The extra profilers to run.
+    phases: map of str to map of str to float
+        The total ``seconds`` and number of ``calls`` of each phase.
+    profiler: :class:`cProfile.Profile`, optional
+        The profiler if ``cprofile`` is requested.
+
+    Arguments
+    ---------
+
+    path: str
+        The file or directory for the report.
+    tools: list of str, optional
+        The extra profilers to run.
+
+    """
+
+    def __init__(self, path: str, tools: Optional[List[str]] = None):
+        self.path: pathlib.Path = pathlib.Path(path)
+        if self.path.is_dir():
+            self.path = self.path / "pandoc-acro-{}-{}.json".format(
+                time.strftime("%Y%m%dT%H%M%S"), os.getpid()
+            )
+
+        self.tools: List[str] = tools or []
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.profiler: Optional[cProfile.Profile] = None
+        self.started: float = 0.0
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase of the run"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += time.perf_counter() - start
+            entry["calls"] += 1
+
+    def start(self) -> None:
+        """Start the clock and the extra profilers"""
+        if "tracemalloc" in self.tools:
+            tracemalloc.start()
+
+        if "cprofile" in self.tools:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        self.started = time.perf_counter()
+
+    def stop(self) -> None:
+        """Stop the profilers and write the report"""
+        report = {
+            "argv": sys.argv,
+            "engine": os.environ.get("PANDOC_ACRO_ENGINE", "panflute"),
+            "seconds": time.perf_counter() - self.started,
+            "phases": self.phases,
+        }
+        if self.profiler is not None:
+            self.profiler.disable()
+            stats = self.path.with_suffix(".prof")
+            report["cprofile"] = str(stats)
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            report["tracemalloc"] = {
+                "peak": tracemalloc.get_traced_memory()[1],
+                "top": [str(s) for s
+                        in snapshot.statistics("lineno")[:TOP]],
+            }
+            tracemalloc.stop()
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("w") as stream:
+                json.dump(report, stream, indent=2)
+
+            if self.profiler is not None:
+                self.profiler.dump_stats(str(stats))
+        except OSError as exc:
+            logging.getLogger(__name__).warning(
+                f"Cannot write the profile '{self.path}': {exc}"
+            )
+
+
+ACTIVE: Optional[Profile] = None
+"""The profile of the current run if enabled"""
+
+
+def phase(name: str) -> ContextManager[None]:
+    """Time a phase of the current run if profiling is enabled"""
+    if ACTIVE is None:
+        return contextlib.nullcontext()
+
+    return ACTIVE.phase(name)
+
+
+@contextlib.contextmanager
+def session() -> Iterator[Optional[Profile]]:
+    """Profile a run of the filter if ``$PANDOC_ACRO_PROFILE`` is set
+
+    Nested sessions are part of the outer session.
+    """
+    global ACTIVE
+    path = os.environ.get("PANDOC_ACRO_PROFILE")
+    if not path or ACTIVE is not None:
+        yield ACTIVE
+        return
+
+    tools = [t.strip().lower() for t
+             in os.environ.get("PANDOC_ACRO_PROFILE_TOOLS", "").split(",")
+             if t.strip()]
+    ACTIVE = Profile(path, tools)
+    ACTIVE.start()
+    try:
+        yield ACTIVE
+    finally:
+        profile, ACTIVE = ACTIVE, None
+        profile.stop()
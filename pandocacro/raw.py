@@ -0,0 +1,690 @@
+__doc__ = """The engine working directly on the JSON of the document
+
+The filter only rewrites the keys in :class:`panflute.Str` and
+:class:`panflute.Span` elements and the blocks for the list of acronyms,
+yet loading the document with :func:`panflute.load` builds an object
+for every element and :func:`panflute.dump` converts them all back.
+This module does the same work as :mod:`pandocacro.engine` on the
+decoded JSON dictionaries and lists instead.  Only the metadata other
+than the ``acronyms`` map is loaded into panflute objects along with the
+few elements that are replaced.  The definitions are left as JSON and
+converted one acronym at a time when first used (see
+:class:`PandocAcro`).  The output is identical to the panflute engine.
+
+The engine is selected by setting ``$PANDOC_ACRO_ENGINE`` to ``json``
+when running ``pandoc-acro`` (see :func:`pandocacro.run`).
+"""
+
+import collections
+import hashlib
+import json
+import marshal
+import threading
+
+from typing import Any, Callable, FrozenSet, List, Optional, Set, Tuple
+
+import panflute
+
+from . import automark, engine, glossary, preamble, profiling
+from .keys import Key, parse
+from .list import printacronyms
+from .pandocacro import PandocAcro
+from .translate import expand
+
+Element = dict
+"""An element of the document as decoded from the JSON"""
+
+SIZE: int = 16
+"""The default number of distinct acronym maps to keep"""
+
+LITERAL: FrozenSet[str] = frozenset(("Code", "CodeBlock", "Math", "RawBlock",
+                                     "RawInline"))
+"""The elements holding only text that cannot contain a key"""
+
+INLINES: FrozenSet[str] = frozenset((
+    "Plain", "Para", "Emph", "Strong", "Underline", "Strikeout",
+    "Superscript", "Subscript", "SmallCaps",
+))
+"""The elements holding a list of inlines"""
+
+
+class Site:
+    """A location in the JSON of the document to be replaced
+
+    Attributes
+    ----------
+
+    elem: dict
+        The element to replace.
+    parent: str
+        The type of the enclosing element.
+    container: list
+        The list holding the element.
+    index: int
+        The index of the element within the container.
+    ancestors: tuple of int
+        The :func:`id` of the enclosing elements.
+    key: :class:`keys.Key`, optional
+        The key found at the site.
+
+    """
+
+    __slots__ = ("elem", "parent", "container", "index", "ancestors", "key")
+
+    def __init__(self, elem: Element,
+                 parent: str,
+                 container: list,
+                 index: int,
+                 ancestors: Tuple[int, ...] = (),
+                 key: Optional[Key] = None):
+        self.elem = elem
+        self.parent = parent
+        self.container = container
+        self.index = index
+        self.ancestors = ancestors
+        self.key = key
+
+    def replace(self, elem: panflute.Element) -> None:
+        """Replace the element at the site"""
+        self.container[self.index] = elem.to_json()
+
+
+def convert(elem: Element) -> panflute.Element:
+    """Convert the JSON of an element to a detached panflute element"""
+    return json.loads(json.dumps(elem),
+                      object_hook=panflute.elements.from_json)
+
+
+def document(data: dict, format: str) -> panflute.Doc:
+    """Load the metadata of the JSON document into a panflute document
+
+    The ``acronyms`` map, which can be large, is not loaded.  Its JSON is
+    kept as the ``definitions`` of the document instead (see
+    :func:`glossary.metadata`).
+
+    Parameters
+    ----------
+
+    data: dict
+        The decoded JSON document.
+    format: str
+        The output format.
+
+    Returns
+    -------
+
+    :class:`panflute.Doc`:
+        The document with the metadata and no content.
+
+    """
+    meta = data["meta"]
+    doc = convert({
+        "pandoc-api-version": data["pandoc-api-version"],
+        "meta": {k: v for k, v in meta.items() if k != "acronyms"},
+        "blocks": [],
+    })
+    doc.format = format
+    if "acronyms" in meta:
+        doc.definitions = meta["acronyms"]
+
+    return doc
+
+
+def get(elem: Element,
+        parent: str,
+        doc: panflute.Doc,
+        bare: bool = False) -> Optional[Key]:
+    """Extract the key from the JSON of an element
+
+    This is the equivalent of :func:`keys.get` where the parent of the
+    element is given by its type.
+
+    Parameters
+    ----------
+
+    elem: dict
+        The element under inspection.
+    parent: str
+        The type of the enclosing element.
+    doc: :class:`panflute.Doc`
+        The prepared document.
+    bare: bool, optional
+        Read a ``Str`` by its own text (see :meth:`keys.Key.match`).
+
+    Returns
+    -------
+
+    :class:`keys.Key`, optional:
+        The bound key if the element holds a known acronym.
+
+    """
+    tag = elem["t"]
+    if tag == "Str":
+        text = elem["c"]
+        if "+" not in text:
+            return None
+
+        classes: Tuple[str, ...] = ()
+        quoted = not bare and parent == "Quoted"
+    elif tag == "Span":
+        attr, content = elem["c"]
+        if len(content) != 1:
+            return None
+
+        child = content[0]
+        if child["t"] == "Str":
+            text = child["c"]
+            if "+" not in text:
+                return None
+        else:
+            text = panflute.stringify(convert(child))
+
+        classes = tuple(c for c in attr[1] if c in Key.CLASSES)
+        quoted = False
+    else:
+        return None
+
+    key = parse(text, classes, quoted)
+    return doc.acronyms.bind(key) if key else None
+
+
+def find(elem: Element,
+         parent: str,
+         doc: panflute.Doc) -> Optional[Key]:
+    """Find the key to translate in the JSON of an element
+
+    This is the equivalent of :func:`translate.find`.
+    """
+    if elem["t"] == "Str":
+        return None if parent == "Span" else get(elem, parent, doc,
+                                                 bare=True)
+
+    return get(elem, parent, doc)
+
+
+def scan(doc: panflute.Doc,
+         blocks: List[Element],
+         counted: Optional[List[int]] = None
+         ) -> Tuple[List[Site], List[Site]]:
+    """Tally the acronyms and record the sites in a single walk
+
+    The elements are visited in the same order as :meth:`panflute.walk`
+    which does not always follow the order of the JSON (e.g. the content
+    of a ``Cite`` comes before the citations).
+
+    Parameters
+    ----------
+
+    doc: :class:`panflute.Doc`
+        The prepared document.
+    blocks: list of dict
+        The JSON of the content of the document.
+    counted: list of int, optional
+        If given, the ids of the counted uses are appended to the list
+        instead of adding them to :attr:`PandocAcro.totals`.
+
+    Returns
+    -------
+
+    list of :class:`Site`:
+        The sites of the keys to translate.
+    list of :class:`Site`:
+        The sites of the ``Div`` or ``Header`` to replace with the list
+        of acronyms.
+
+    """
+    sites: List[Site] = []
+    lists: List[Site] = []
+    acronyms = getattr(doc, "acronyms", None)
+    ancestors: List[int] = []
+
+    def children(value, parent: str) -> None:
+        # Visit every element nested in lists
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                if type(item) is dict:
+                    if "t" in item:
+                        visit(item, parent, value, index)
+                elif type(item) is list:
+                    children(item, parent)
+
+    def citation(value: dict, parent: str) -> None:
+        children(value["citationPrefix"], parent)
+        children(value["citationSuffix"], parent)
+
+    def caption(value: list, parent: str) -> None:
+        short, content = value
+        children(content, parent)
+        children(short, parent)
+
+    def visit(elem: Element, parent: str, container: Any,
+              index: Any) -> None:
+        tag = elem["t"]
+        c: Any = elem.get("c")
+        if tag == "Str":
+            if acronyms is None or "+" not in c:
+                return
+        elif tag == "MetaMap":
+            ancestors.append(id(elem))
+            for name, value in c.items():
+                visit(value, tag, c, name)
+
+            ancestors.pop()
+        elif isinstance(c, list) and tag not in LITERAL:
+            ancestors.append(id(elem))
+            if tag == "Cite":
+                children(c[1], tag)
+                for value in c[0]:
+                    citation(value, tag)
+            elif tag == "Table":
+                _, caption_, _, head, bodies, foot = c
+                children(head, tag)
+                for body in bodies:
+                    children(body[3], tag)
+                    children(body[2], tag)
+
+                children(foot, tag)
+                caption(caption_, tag)
+            elif tag == "Figure":
+                children(c[2], tag)
+                caption(c[1], tag)
+            else:
+                children(c, tag)
+
+            ancestors.pop()
+
+        if tag in ("Str", "Span"):
+            if acronyms is None:
+                return
+
+            key = get(elem, parent, doc)
+            if key:
+                acronyms.seen[key.id] = 1
+
+            if key and key.count:
+                if counted is None:
+                    acronyms.totals[key.id] += 1
+                else:
+                    counted.append(key.id)
+
+            # The tally reads a string within quotes differently
+            if tag == "Str" and parent in ("Span", "Quoted"):
+                key = find(elem, parent, doc)
+
+            if key:
+                sites.append(Site(elem, parent, container, index,
+                                  tuple(ancestors), key))
+
+        elif tag == "Div" and c[0][0] == "acronyms" \
+                or tag == "Header" and c[1][0] == "acronyms":
+            lists.append(Site(elem, parent, container, index))
+
+    children(blocks, "Doc")
+    return sites, lists
+
+
+def mark(doc: panflute.Doc, blocks: List[Element]) -> None:
+    """Mark the bare uses of the acronyms in the JSON of the content
+
+    This is :func:`automark.mark` for the JSON of the document.
+    """
+    root = automark.trie(doc.acronyms)
+
+    def make(text: str, classes: List[str]) -> Element:
+        if classes:
+            return {"t": "Span", "c": [["", classes, []],
+                                       [{"t": "Str", "c": text}]]}
+
+        return {"t": "Str", "c": text}
+
+    def inlines(value: List[Element]) -> None:
+        for elem in value:
+            visit(elem)
+
+        automark.rewrite(value, root, lambda e: e["t"], lambda e: e["c"],
+                         make)
+
+    def contents(value: List[Element]) -> None:
+        for elem in value:
+            visit(elem)
+
+    def rows(value: list) -> None:
+        for row in value:
+            for cell in row[1]:
+                contents(cell[4])
+
+    def caption(value: list) -> None:
+        short, content = value
+        if short:
+            inlines(short)
+
+        contents(content)
+
+    def visit(elem: Element) -> None:
+        tag = elem["t"]
+        c: Any = elem.get("c")
+        if tag in INLINES:
+            inlines(c)
+        elif tag in ("BlockQuote", "Note"):
+            contents(c)
+        elif tag in ("Quoted", "Span", "Link", "Image"):
+            inlines(c[1])
+        elif tag == "Div":
+            contents(c[1])
+        elif tag == "Header":
+            inlines(c[2])
+        elif tag == "Cite":
+            for citation in c[0]:
+                inlines(citation["citationPrefix"])
+                inlines(citation["citationSuffix"])
+
+            inlines(c[1])
+        elif tag == "LineBlock":
+            for line in c:
+                inlines(line)
+        elif tag in ("BulletList", "OrderedList"):
+            for item in (c if tag == "BulletList" else c[1]):
+                contents(item)
+        elif tag == "DefinitionList":
+            for term, definitions in c:
+                inlines(term)
+                for definition in definitions:
+                    contents(definition)
+        elif tag == "Table":
+            _, caption_, _, head, bodies, foot = c
+            caption(caption_)
+            rows(head[1])
+            for body in bodies:
+                rows(body[2])
+                rows(body[3])
+
+            rows(foot[1])
+        elif tag == "Figure":
+            caption(c[1])
+            contents(c[2])
+
+    contents(blocks)
+
+
+def resolve(doc: panflute.Doc,
+            sites: List[Site],
+            record: Optional[Callable[[Site, Key], None]] = None) -> None:
+    """Replace the recorded key sites
+
+    This is the equivalent of :func:`engine.resolve` for the keys.  The
+    ``record`` is called with each site and key just before the key is
+    expanded.
+    """
+    dirty: Set[int] = set()
+    with profiling.phase("translate"):
+        for site in sites:
+            key = find(site.elem, site.parent, doc) \
+                if id(site.elem) in dirty else site.key
+            if not key:
+                continue
+
+            if record is not None:
+                record(site, key)
+
+            site.replace(expand(key, doc))
+            dirty.update(site.ancestors)
+
+
+class Meta:
+    """The sites in the metadata of a JSON document
+
+    The ``acronyms`` map is kept as JSON (see :func:`document`) and is
+    scanned with :func:`scan` one acronym at a time while the other
+    entries are walked with :func:`engine.scan`.  The entries are visited
+    in the order of the metadata as in the panflute engine.  The
+    definition of an acronym holding a key is converted before the key
+    is translated in place so the acronyms, which may be shared with
+    other documents (see :class:`Glossaries`), keep the text as given.
+
+    Attributes
+    ----------
+
+    segments: list of (str, list, list)
+        The name of each entry of the metadata with the sites of the
+        keys and the lists of acronyms in it.
+
+    Arguments
+    ---------
+
+    doc: :class:`panflute.Doc`
+        The prepared document from :func:`document`.
+    data: dict
+        The decoded JSON document.
+
+    """
+
+    __slots__ = ("segments",)
+
+    def __init__(self, doc: panflute.Doc, data: dict):
+        meta = data["meta"]
+        names = list(meta) + [k for k in doc.metadata.content.keys()
+                              if k not in meta]
+        self.segments: List[Tuple[str, list, list]] = []
+        for name in names:
+            if name == "acronyms":
+                self.segments.append((name, *self.definitions(doc,
+                                                              meta[name])))
+            elif name in doc.metadata:
+                self.segments.append((name, *engine.scan(doc,
+                                                         doc.metadata[name])))
+
+    @staticmethod
+    def definitions(doc: panflute.Doc,
+                    value: Element) -> Tuple[List[Site], List[Site]]:
+        """Scan the JSON of the ``acronyms`` map"""
+        entries = value["c"] if value.get("t") == "MetaMap" \
+            else {None: value}
+        acronyms = getattr(doc, "acronyms", None)
+        sites: List[Site] = []
+        lists: List[Site] = []
+        for name, entry in entries.items():
+            found, blocks = scan(doc, [entry])
+            if found and acronyms is not None and name in acronyms:
+                # Convert the definition before its keys are translated
+                acronyms[name]
+
+            sites.extend(found)
+            lists.extend(blocks)
+
+        return sites, lists
+
+    def resolve(self, doc: panflute.Doc) -> None:
+        """Replace the key sites in order"""
+        for name, sites, _ in self.segments:
+            if name == "acronyms":
+                resolve(doc, sites)
+            else:
+                engine.resolve(doc, sites, [])
+
+    def lists(self, doc: panflute.Doc) -> None:
+        """Replace the lists of acronyms"""
+        for name, _, lists in self.segments:
+            if name != "acronyms":
+                engine.resolve(doc, [], lists)
+                continue
+
+            with profiling.phase("lists"):
+                for site in lists:
+                    block = printacronyms(convert(site.elem), doc)
+                    if block is not None:
+                        site.replace(block)
+
+    def dump(self, doc: panflute.Doc, data: dict) -> None:
+        """Write back the entries of the metadata that changed
+
+        These are the entries with sites and the ``header-includes``
+        holding the preamble.  The JSON of the ``acronyms`` map is
+        changed in place.
+        """
+        changed = [name for name, sites, lists in self.segments
+                   if name != "acronyms" and (sites or lists)]
+        if "header-includes" in doc.metadata:
+            changed.append("header-includes")
+
+        for name in changed:
+            data["meta"][name] = doc.metadata[name].to_json()
+
+
+def process(data: dict,
+            format: str,
+            prepare: Callable[..., None]) -> dict:
+    """Translate the keys and print the lists of a JSON document
+
+    The sites in the metadata come before the content in the document
+    order (see :class:`Meta`).
+
+    Parameters
+    ----------
+
+    data: dict
+        The decoded JSON document which is modified in place.
+    format: str
+        The output format.
+    prepare: callable
+        The function to prepare the document without the tally (see
+        :func:`pandocacro.prepare`).
+
+    Returns
+    -------
+
+    dict:
+        The processed JSON document.
+
+    """
+    with profiling.phase("prepare"):
+        doc = document(data, format)
+        prepare(doc, tally=False)
+
+    with profiling.phase("scan"):
+        if getattr(doc, "acronyms", None) is not None \
+                and automark.enabled(doc):
+            mark(doc, data["blocks"])
+
+        meta = Meta(doc, data)
+        sites, lists = scan(doc, data["blocks"])
+
+    preamble.finish(doc)
+
+    meta.resolve(doc)
+    resolve(doc, sites)
+    meta.lists(doc)
+    with profiling.phase("lists"):
+        for site in lists:
+            block = printacronyms(convert(site.elem), doc)
+            if block is not None:
+                site.replace(block)
+
+    meta.dump(doc, data)
+    return data
+
+
+class Glossaries:
+    """The acronyms built from the metadata of many documents
+
+    Processing many documents that share the same ``acronyms`` map
+    should only build the :class:`PandocAcro` once.  The acronyms are
+    kept keyed by a hash of the metadata and each document is given a
+    copy with fresh usage counts.  The least recently used are dropped
+    once more than ``size`` distinct maps are seen.  The cache can be
+    shared between threads.
+
+    Attributes
+    ----------
+
+    size: int
+        The number of distinct acronym maps to keep.
+    acronyms: ordered map of str to :class:`PandocAcro`
+        The acronyms keyed by the hash of the metadata.
+
+    """
+
+    def __init__(self, size: int = SIZE):
+        self.size: int = size
+        self.acronyms: collections.OrderedDict = collections.OrderedDict()
+        self.lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def digest(data: dict, directory: Optional[str] = None) -> str:
+        """The hash of the acronyms metadata of a JSON document
+
+        The hash covers the JSON of the ``acronyms`` and ``pandoc-acro``
+        maps and the modification time and size of the glossary files
+        so changing a file builds the acronyms again (see
+        :mod:`pandocacro.glossary`).  The metadata is not loaded into a
+        document.  The same metadata with the keys in another order
+        hashes differently.
+        """
+        meta = data["meta"]
+        options = meta.get("pandoc-acro")
+        state: List[Any] = [meta.get("acronyms"), options]
+        state.extend([str(p), glossary.state(p)] for p in glossary.files(
+            PandocAcro.convert(options), directory
+        ))
+
+        # The marshal format before version 3 does not depend on the
+        # sharing of the objects and is much faster than JSON.
+        return hashlib.sha256(marshal.dumps(state, 2)).hexdigest()
+
+    def get(self, digest: str,
+            doc: panflute.Doc,
+            directory: Optional[str] = None) -> PandocAcro:
+        """Get a copy of the acronyms for the metadata
+
+        Parameters
+        ----------
+
+        digest: str
+            The hash of the ``acronyms`` metadata.
+        doc: :class:`panflute.Doc`
+            The document with the metadata.
+        directory: str, optional
+            The directory for relative glossary files.
+
+        Returns
+        -------
+
+        :class:`PandocAcro`:
+            The acronyms with fresh usage counts.
+
+        """
+        with self.lock:
+            acronyms = self.acronyms.get(digest)
+            if acronyms is None:
+                acronyms = PandocAcro(
+                    glossary.definitions(doc, directory) or {}
+                )
+                self.acronyms[digest] = acronyms
+                while len(self.acronyms) > self.size:
+                    self.acronyms.popitem(last=False)
+            else:
+                self.acronyms.move_to_end(digest)
+
+        return acronyms.copy()
+
+    def process(self, data: dict,
+                format: str,
+                prepare: Callable[..., None],
+                directory: Optional[str] = None) -> dict:
+        """Process a JSON document with the kept acronyms
+
+        This is :func:`process` where ``prepare`` is given the acronyms
+        (see :func:`pandocacro.prepare`).  Relative glossary files and
+        the sidecar of the definitions are found in the ``directory`` if
+        given.
+        """
+        def warm(doc: panflute.Doc, tally: bool = True) -> None:
+            acronyms: Optional[PandocAcro] = None
+            if glossary.metadata(doc) is not None \
+                    or glossary.paths(doc, directory):
+                acronyms = self.get(self.digest(data, directory), doc,
+                                    directory)
+
+            prepare(doc, tally=tally, acronyms=acronyms,
+                    directory=directory)
+
+        return process(data, format, warm)
@@ -0,0 +1,149 @@
+__doc__ = """A long running server for the filter
+
+The server listens on a Unix socket for documents from the
+:mod:`pandocacro.client` and processes them with the JSON engine (see
+:mod:`pandocacro.raw`).  Each connection is handled in its own thread.
+The acronyms built from the metadata are kept warm (see
+:class:`raw.Glossaries`) so a document with the same acronyms reuses
+the definitions and rendering tables with fresh usage counts.  A
+document with changed acronyms hashes differently so the acronyms are
+built again and the least recently used are dropped.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+
+from typing import Optional
+
+from . import client, prepare, raw
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """Process a single document from a client"""
+
+    def handle(self) -> None:
+        header = json.loads(self.rfile.readline())
+        data = self.rfile.read()
+        try:
+            output = self.server.process(  # type: ignore
+                data, header.get("format", "html"), header.get("directory")
+            )
+            error = None
+        except Exception as exc:
+            output = b""
+            error = f"{type(exc).__name__}: {exc}"
+
+        self.wfile.write(json.dumps({"error": error}).encode("utf-8") + b"\n")
+        self.wfile.write(output)
+
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    """The server for processing documents
+
+    Attributes
+    ----------
+
+    glossaries: :class:`raw.Glossaries`
+        The acronyms built from the metadata of the documents.
+
+    Arguments
+    ---------
+
+    address: str, optional
+        The path of the socket instead of :func:`client.path`.
+    size: int, optional
+        The number of distinct acronym maps to keep.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: str = "", size: int = raw.SIZE):
+        self.glossaries: raw.Glossaries = raw.Glossaries(size)
+        super().__init__(address or client.path(), Handler)
+
+    def process(self, data: bytes,
+                format: str,
+                directory: Optional[str] = None) -> bytes:
+        """Process a JSON document
+
+        Parameters
+        ----------
+
+        data: bytes
+            The JSON document.
+        format: str
+            The output format.
+        directory: str, optional
+            The working directory of the client for relative glossary
+            files (see :mod:`pandocacro.glossary`) and the sidecar of
+            the definitions (see :func:`preamble.sidecar`).
+
+        Returns
+        -------
+
+        bytes:
+            The processed JSON document.
+
+        """
+        document = self.glossaries.process(json.loads(data), format,
+                                           prepare, directory)
+        return json.dumps(document, check_circular=False,
+                          separators=(",", ":"),
+                          ensure_ascii=False).encode("utf-8")
+
+
+def serve(address: str = "", size: int = raw.SIZE) -> None:
+    """Run the server until interrupted
+
+    A socket left behind by a server that is no longer running is
+    removed.  The socket is removed when the server stops.
+
+    Raises
+    ------
+
+    RuntimeError:
+        If another server is listening on the socket.
+
+    """
+    address = address or client.path()
+    if os.path.exists(address):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(address)
+            except OSError:
+                os.remove(address)
+            else:
+                raise RuntimeError(f"A server is running on '{address}'")
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    with Server(address, size) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(address)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve the pandoc-acro filter for pandoc-acro-client"
+    )
+    parser.add_argument("--socket", default="",
+                        help=f"The path of the socket [{client.path()}]")
+    parser.add_argument("--size", type=int, default=raw.SIZE,
+                        help="The number of acronym maps to keep")
+    args = parser.parse_args()
+    serve(args.socket, args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
 __doc__ = """Functions to translate keys to proper output"""
 
-from typing import Optional, Tuple
+import itertools
+
+from typing import Dict, Optional, Tuple
 
 import panflute
 
 from . import keys
 from .pandocacro import PandocAcro
 
+MACROS: Dict[Tuple[bool, str, bool, bool], str] = {
+    (capitalize, type_, plural, count):
+        "\\" + ("A" if capitalize else "a") + "c"
+        + {"full": "f", "short": "s", "long": "l"}.get(type_, "")
+        + ("p" if plural else "")
+        + ("*" if not count else "")
+    for capitalize, type_, plural, count in itertools.product(
+        (False, True), ("", *sorted(keys.Key.TYPES)), (False, True),
+        (False, True)
+    )
+}
+"""The ``acro`` macro for the capitalize, type, plural, and count flags"""
+
 
 def translate(elem: panflute.Element,
               doc: panflute.Doc) -> Optional[panflute.Element]:
@@ -32,6 +47,40 @@ def translate(elem: panflute.Element,
         The replacement element with the acronym replacement.
 
 
+    """
+    key = find(elem, doc)
+    if not key:
+        return None
+
+    return expand(key, doc)
+
+
+def find(elem: panflute.Element,
+         doc: panflute.Doc) -> Optional[keys.Key]:
+    """Find the key to translate at an element
+
+    This method decides if an element is a site that :func:`translate`
+    should replace.  A :class:`panflute.Str` inside of a
+    :class:`panflute.Span` is never a site because the
+    :class:`panflute.Span` is evaluated instead.  Any other
+    :class:`panflute.Str` is read as if it were the only content of a
+    :class:`panflute.Span` which means the quotes are not stripped
+    within a :class:`panflute.Quoted`.
+
+    Parameters
+    ----------
+
+    elem: :class:`panflute.Element`
+        The element to inspect.
+    doc: :class:`panflute.Doc`
+        The document under consideration.
+
+    Returns
+    -------
+
+    :class:`keys.Key`, optional:
+        The key to translate if the element is a site.
+
     """
     if isinstance(elem, panflute.Str):
         if isinstance(elem.parent, panflute.Span):
@@ -40,12 +89,29 @@ def translate(elem: panflute.Element,
             # evaluated and not the string.
             return None
 
-        return translate(panflute.Span(elem), doc)
+        return keys.get(elem, doc, bare=True)
 
-    key = keys.get(elem, doc)
-    if not key:
-        return None
+    return keys.get(elem, doc)
+
+
+def expand(key: keys.Key, doc: panflute.Doc) -> panflute.Inline:
+    """Generate the replacement for a key in the output format
+
+    Parameters
+    ----------
+
+    key: :class:`keys.Key`
+        The :class:`keys.Key` to interpret.
+    doc: :class:`panflute.Doc`
+        The document under consideration.
+
+    Returns
+    -------
+
+    :class:`panflute.Inline`:
+        The LaTeX macro or the plain text expansion.
 
+    """
     if doc.format in ("latex", "beamer"):
         return latex(key)
     else:
@@ -71,15 +137,8 @@ def latex(key: keys.Key) -> panflute.RawInline:
         The LaTeX formatted acronym.
 
     """
-    macro = "\\" + ("A" if key.capitalize else "a") + "c" \
-        + {"full": "f",
-           "short": "s",
-           "long": "l"
-           }.get(key.type, "") \
-        + ("p" if key.plural else "") \
-        + ("*" if not key.count else "") \
-        + f"{{{key.value}}}" \
-        + key.post
+    macro = MACROS[key.capitalize, key.type, key.plural, key.count] \
+        + "{" + key.value + "}" + key.post
     return panflute.RawInline(macro, format="latex")
 
 
@@ -91,9 +150,9 @@ def plain(key: keys.Key, acronyms: PandocAcro) -> panflute.Str:
     :class:`Acronyms` mapping.  It explicitly checks the user requested
     formatting ('long', 'short', 'full', etc.) to do the formatting, but
     it falls back on inspecting the number of usages based on the
-    'count' and 'used' fields for the acronym.  Further, it increments
-    the 'used' field in the :class:`Acronyms` unless the key was marked
-    “do not count.”
+    :attr:`PandocAcro.totals` and :attr:`PandocAcro.counts` of the
+    acronym.  Further, it increments the count unless the key was marked
+    “do not count” and marks the acronym for the list if needed.
 
     Parameters
     ----------
@@ -114,65 +173,75 @@ def plain(key: keys.Key, acronyms: PandocAcro) -> panflute.Str:
         When an unknown first or single style is requested.
 
     """
-    long_ = acronyms[key.value]["long"] + (
-        acronyms[key.value].get("long-plural", "s") if key.plural else ""
-    )
-    if key.plural and acronyms[key.value].get("long-plural-form"):
-        long_ = acronyms[key.value].get("long-plural-form")
+    return panflute.Str(use(key, choose(key, acronyms), acronyms)
+                        + key.post)
 
-    short_ = acronyms[key.value]["short"] + (
-        acronyms[key.value].get("short-plural", "s") if key.plural else ""
-    )
-    if key.plural and acronyms[key.value].get("short-plural-form"):
-        short_ = acronyms[key.value].get("short-plural-form")
-
-    def get_style(option: str, default: str) -> Tuple[str, bool]:
-        style = acronyms.options.get(option, default)
-        if style == "long-short":
-            return long_ + " (" + acronyms[key.value]["short"] + ")", True
-        elif style == "short-long":
-            return short_ + " (" + acronyms[key.value]["long"] + ")", True
-        elif style == "long":
-            return long_, False
-        elif style == "short":
-            return short_, True
-        else:
-            raise NotImplementedError(
-                f"{__name__}.plain unknown style '{style}'"
-            )
-
-    single_ = acronyms.options.get("single", False)
-    try:
-        single = int(single_)
-    except TypeError:
-        single = single_ == "true"
 
+def choose(key: keys.Key, acronyms: PandocAcro) -> str:
+    """Decide the form of the acronym to use for a key
+
+    The form requested by the type of the key is used if given.
+    Otherwise, the form depends on the :attr:`PandocAcro.totals` and
+    :attr:`PandocAcro.counts` of the acronym.
+
+    Parameters
+    ----------
+
+    key: :class:`keys.Key`
+        The bound key.
+    acronyms: :class:`PandocAcro`
+        The acronyms of the document.
+
+    Returns
+    -------
+
+    str:
+        The form (see :attr:`options.Configuration.styles`).
+
+    """
+    id = key.id
     if key.type == "full":
-        text, to_list = get_style("first-style", "long-short")
-    elif key.type == "short":
-        text = short_
-        to_list = True
-    elif key.type == "long":
-        text = long_
-        to_list = False
-    elif (single is True and acronyms[key.value]["total"] < 2) or (
-                isinstance(single, int) and
-                acronyms[key.value]["total"] <= single
-            ):
+        return "first"
+    elif key.type != "":
+        return key.type
+    elif acronyms.totals[id] <= acronyms.config.single:
         # We are below the threshold for the usage to "count".
-        text, to_list = get_style("single-style", "long")
-    elif acronyms[key.value]["count"] == 0:
-        text, to_list = get_style("first-style", "long-short")
+        return "single"
+    elif acronyms.counts[id] == 0:
+        return "first"
     else:
-        text = short_
-        to_list = True
+        return "short"
+
+
+def use(key: keys.Key, form: str, acronyms: PandocAcro) -> str:
+    """Record the use of an acronym in the given form
+
+    The count is incremented unless the key was marked “do not count”
+    and the acronym is marked for the list if the form calls for it.
+
+    Parameters
+    ----------
+
+    key: :class:`keys.Key`
+        The bound key.
+    form: str
+        The form from :func:`choose`.
+    acronyms: :class:`PandocAcro`
+        The acronyms of the document.
+
+    Returns
+    -------
 
+    str:
+        The plain text of the form without the trailing punctuation.
+
+    """
+    id = key.id
+    text, to_list = acronyms.form(id, form, key.plural, key.capitalize)
     if key.count:
-        acronyms[key.value]["count"] += 1
+        acronyms.counts[id] += 1
 
     if to_list:
-        acronyms[key.value]["list"] = True
+        acronyms.listed[id] = 1
 
-    head, *tail = (s for s in text)
-    return panflute.Str((head.upper() if key.capitalize else head)
-                        + "".join(tail) + key.post)
+    return text
@@ -0,0 +1,215 @@
+__doc__ = """A usage index shared by the chapters of a book
+
+Building each chapter of a book with its own run of Pandoc, possibly in
+parallel, would expand the first use of an acronym in every chapter.
+Instead, scan all of the chapters in order once to write an index of
+the total uses of each acronym and where it is first used:
+
+.. code-block:: bash
+
+    pandoc-acro index -o book.acro.json --metadata-file acronyms.yaml \\
+        intro.md methods.md results.md
+
+Then name the index and the chapter in the ``pandoc-acro`` map of the
+metadata of each chapter:
+
+.. code-block:: yaml
+
+    ---
+    pandoc-acro:
+      index: book.acro.json
+      chapter: methods
+    ...
+
+The chapter is the name of the source without the suffix unless given
+with ``--name``.  When preparing a chapter (see
+:func:`pandocacro.prepare`), the uses in the other chapters are added to
+the totals and an acronym first used in an earlier chapter starts as
+already used, so the first use and ``single`` decisions are made for the
+whole book.  The index must be written again when the chapters change.
+
+Sources ending in ``.json`` are read as Pandoc's JSON and any other
+source is converted by Pandoc.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import pathlib
+import sys
+
+from typing import Any, Dict, List, Optional
+
+import panflute
+
+from . import automark, glossary, raw
+from .pandocacro import PandocAcro
+
+VERSION: int = 1
+"""The version of the index format"""
+
+
+def source(path: pathlib.Path, metadata: Optional[str] = None) -> dict:
+    """Read a chapter as the decoded JSON of the document
+
+    Parameters
+    ----------
+
+    path: :class:`pathlib.Path`
+        The chapter source.
+    metadata: str, optional
+        A metadata file passed to Pandoc for sources that are converted.
+
+    Returns
+    -------
+
+    dict:
+        The decoded JSON document.
+
+    """
+    if path.suffix == ".json":
+        with path.open("r", encoding="utf-8") as stream:
+            return json.load(stream)
+
+    args = [str(path), "--standalone", "--to", "json"]
+    if metadata:
+        args.extend(["--metadata-file", metadata])
+
+    return json.loads(panflute.run_pandoc(args=args))
+
+
+def uses(data: dict) -> List[str]:
+    """The acronyms of each counted use in the document in order
+
+    The uses in the metadata come first in the order of the definitions
+    followed by those in the content in document order.
+    """
+    doc = raw.document(data, "json")
+    definitions = glossary.definitions(doc)
+    if definitions is None:
+        return []
+
+    doc.acronyms = PandocAcro(definitions)
+    if automark.enabled(doc):
+        raw.mark(doc, data["blocks"])
+
+    raw.Meta(doc, data)
+    names = [name for id, name in enumerate(doc.acronyms.names)
+             for _ in range(doc.acronyms.totals[id])]
+    counted: List[int] = []
+    raw.scan(doc, data["blocks"], counted)
+    return names + [doc.acronyms.names[id] for id in counted]
+
+
+def build(chapters: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Build the index from the uses of each chapter
+
+    Parameters
+    ----------
+
+    chapters: map of str to list of str
+        The uses (see :func:`uses`) of each chapter in the book order.
+
+    Returns
+    -------
+
+    map of str:
+        The ``chapters`` with the counted uses of each acronym and the
+        ``total``, first ``chapter``, and ``position`` of the first use
+        within its chapter of each used acronym.
+
+    """
+    index: Dict[str, Any] = {"version": VERSION, "chapters": [],
+                             "acronyms": {}}
+    for name, names in chapters.items():
+        counts: Dict[str, int] = {}
+        for position, acronym in enumerate(names):
+            counts[acronym] = counts.get(acronym, 0) + 1
+            entry = index["acronyms"].setdefault(
+                acronym, {"total": 0, "chapter": name, "position": position}
+            )
+            entry["total"] += 1
+
+        index["chapters"].append({"name": name, "counts": counts})
+
+    return index
+
+
+def apply(doc: panflute.Doc) -> None:
+    """Start the usage of the prepared document from the index
+
+    The ``index`` and ``chapter`` are read from the ``pandoc-acro`` map
+    of the metadata.  A relative index is found in the ``directory`` of
+    the document if set (see :func:`pandocacro.prepare`) or else the
+    working directory.  Nothing is done if either is missing.  A warning
+    is logged if the index cannot be read or does not have the chapter.
+    """
+    logger = logging.getLogger(__name__)
+    options = doc.get_metadata("pandoc-acro", {})
+    if not isinstance(options, dict) or "index" not in options \
+            or "chapter" not in options:
+        return
+
+    path = pathlib.Path(getattr(doc, "directory", None) or ".") \
+        / str(options["index"])
+    chapter = str(options["chapter"])
+    try:
+        with open(path, "r", encoding="utf-8") as stream:
+            index = json.load(stream)
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Cannot read the usage index '{path}': {exc}")
+        return
+
+    order = [c["name"] for c in index["chapters"]]
+    if chapter not in order:
+        logger.warning(f"Chapter '{chapter}' is not in the index '{path}'")
+        return
+
+    current = order.index(chapter)
+    counts = index["chapters"][current]["counts"]
+    acronyms = doc.acronyms
+    for name, entry in index["acronyms"].items():
+        id = acronyms.ids.get(name)
+        if id is None:
+            continue
+
+        # The uses in this chapter are counted when it is processed
+        acronyms.totals[id] += entry["total"] - counts.get(name, 0)
+        if order.index(entry["chapter"]) < current:
+            acronyms.counts[id] = 1
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the ``index`` subcommand of ``pandoc-acro``"""
+    parser = argparse.ArgumentParser(
+        prog="pandoc-acro index",
+        description="Write the usage index of the chapters of a book"
+    )
+    parser.add_argument("sources", nargs="+",
+                        help="The chapters in the order of the book")
+    parser.add_argument("-o", "--output", required=True,
+                        help="The index file to write")
+    parser.add_argument("--metadata-file", default=None,
+                        help="A metadata file for the converted sources")
+    parser.add_argument("--name", action="append", default=[],
+                        help="The name of each chapter in order "
+                             "[the name of the source]")
+    args = parser.parse_args(argv)
+
+    paths = [pathlib.Path(p) for p in args.sources]
+    names = args.name + [p.stem for p in paths[len(args.name):]]
+    if len(set(names)) != len(names):
+        parser.error("The chapter names must be unique")
+
+    # Converting the sources waits on Pandoc so it is done in threads.
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        documents = list(pool.map(lambda p: source(p, args.metadata_file),
+                                  paths))
+
+    index = build({n: uses(d) for n, d in zip(names, documents)})
+    with open(args.output, "w", encoding="utf-8") as stream:
+        json.dump(index, stream, indent=2)
+
+    print(f"Indexed {len(index['acronyms'])} acronyms in {len(names)}"
+          " chapters", file=sys.stderr)
@@ -0,0 +1,150 @@
+__doc__ = """Check the bare uses of the acronyms are marked as keys"""
+
+import io
+import json
+import pathlib
+
+import panflute
+import pytest
+
+import pandocacro
+
+from pandocacro import PandocAcro, automark, incremental, raw
+
+from test_raw import source
+
+META = """---
+pandoc-acro:
+  automark: true
+acronyms:
+  afaik:
+    short: AFAIK
+    long: as far as I know
+  api:
+    short: API
+    long: application programming interface
+    short-plural-form: APIs
+  ap:
+    short: AP
+    long: application
+...
+"""
+
+TEXT = """
+As far as I know, the API is
+an application programming interface.  The APIs and AFAIK's, `API`,
+and an application.
+
++afaik and [+*api]{.long} again, API and [as far as I know]{.x}.
+
+He said "the API" to me.
+
+1.  An API item
+2.  AFAIK
+
+| API | b |
+|-----|---|
+| an API | c |
+
+: The API table
+"""
+
+MARKED = """
+[+afaik]{.caps}, the +api is
+an +api.  The [+api]{.plural} and +afaik's, `API`,
+and an +ap.
+
++afaik and [+*api]{.long} again, +api and [+afaik]{.x}.
+
+He said "the +api" to me.
+
+1.  An +api item
+2.  +afaik
+
+| +api | b |
+|-----|---|
+| an +api | c |
+
+: The +api table
+"""
+"""The text with the uses marked by hand"""
+
+
+def run(text: str, format: str) -> str:
+    """Run the panflute engine on the text"""
+    doc = panflute.convert_text(text, standalone=True)
+    doc.format = format
+    doc = pandocacro.main(doc)
+    assert doc is not None
+    return json.dumps(doc.to_json()["blocks"])
+
+
+def test_find() -> None:
+    """Check the longest phrases are found with the punctuation"""
+    acronyms = PandocAcro(panflute.convert_text(
+        META, standalone=True
+    ).get_metadata("acronyms"))
+    root = automark.trie(acronyms)
+    assert automark.trie(acronyms.copy()) is root
+    words = ["The", "application", "programming", "interface.", None,
+             "Application", "APIs", "an", "application", "program",
+             "as", "far", "as", "I", "know's", "AFAIK"]
+    assert automark.find(words, root) == [
+        (1, 3, "api", "", ".", False, False),
+        (5, 5, "ap", "", "", False, True),
+        (6, 6, "api", "", "", True, False),
+        (8, 8, "ap", "", "", False, False),
+        (10, 14, "afaik", "", "'s", False, False),
+        (15, 15, "afaik", "", "", False, False),
+    ]
+
+    words = ["(API)", "API)", "(API", "“API”", '"API",', "(as", "far",
+             "as", "I", "know).", "(AFAIK's)", "()", "(", "API."]
+    assert automark.find(words, root) == [
+        (0, 0, "api", "(", ")", False, False),
+        (1, 1, "api", "", ")", False, False),
+        (2, 2, "api", "(", "", False, False),
+        (3, 3, "api", "“", "”", False, False),
+        (4, 4, "api", '"', '",', False, False),
+        (5, 9, "afaik", "(", ").", False, False),
+        (10, 10, "afaik", "(", "'s)", False, False),
+        (13, 13, "api", "", ".", False, False),
+    ]
+
+
+@pytest.mark.parametrize("engine", ["panflute", "json"])
+def test_punctuation(engine: str) -> None:
+    """Check the brackets and quotes around a use are kept outside"""
+    text = META + "\n(API) and (APIs), API) and “API”, (as far as I know).\n"
+    if engine == "json":
+        data = raw.process(json.loads(source(text)), "plain",
+                           pandocacro.prepare)
+        doc = panflute.load(io.StringIO(json.dumps(data)))
+    else:
+        doc = panflute.convert_text(text, standalone=True)
+        doc.format = "plain"
+        doc = pandocacro.main(doc)
+
+    # Pandoc reads the curly quotes as a quoted span
+    assert panflute.stringify(doc.content[0]).strip() == (
+        "(application programming interface (API)) and (APIs), API) and "
+        '"API", (as far as I know (AFAIK)).'
+    )
+
+
+@pytest.mark.parametrize("format", ["latex", "plain"])
+def test_engines(tmp_path: pathlib.Path, format: str) -> None:
+    """Check every engine marks the same uses"""
+    text = META + TEXT
+    expected = run(text, format)
+    assert expected != run(text.replace("automark: true",
+                                        "automark: false"), format)
+    assert expected == run(META + MARKED, format)
+
+    data = source(text)
+    for output in (raw.process(json.loads(data), format,
+                               pandocacro.prepare),
+                   incremental.process(json.loads(data), format,
+                                       pandocacro.prepare, tmp_path)):
+        doc = panflute.load(io.StringIO(json.dumps(output)))
+        assert json.dumps(doc.to_json()["blocks"]) == expected
@@ -0,0 +1,122 @@
+__doc__ = """Check many documents are processed in a pool"""
+
+import json
+import pathlib
+import pickle
+
+import panflute
+import pytest
+
+import pandocacro
+
+from pandocacro import batch, raw
+
+root = pathlib.Path(__file__).parent
+
+
+def write(path: pathlib.Path, text: str) -> str:
+    """Write the JSON of the text with the example metadata"""
+    data = panflute.convert_text(
+        (root / "metadata.yaml").open().read() + "\n" + text,
+        output_format="json", standalone=True
+    )
+    path.write_text(data, encoding="utf-8")
+    return data
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch(tmp_path: pathlib.Path, jobs: int) -> None:
+    """Check each document matches the filter and failures are reported"""
+    expected = {}
+    for i in range(4):
+        data = write(tmp_path / f"doc{i}.json", f"+afaik and +lol {i}")
+        expected[f"doc{i}.acro.json"] = raw.process(
+            json.loads(data), "latex", pandocacro.prepare
+        )
+
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    results = batch.run([str(tmp_path)], "latex", jobs=jobs)
+    assert [pathlib.Path(r["input"]).name for r in results] \
+        == ["broken.json"] + [f"doc{i}.json" for i in range(4)]
+    assert results[0]["error"] is not None
+    assert all(r["error"] is None for r in results[1:])
+    for name, value in expected.items():
+        assert json.loads((tmp_path / name).read_text()) == value
+
+    # The processed documents are not processed again
+    assert len(batch.inputs([str(tmp_path)])) == 5
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_main(tmp_path: pathlib.Path, monkeypatch, capsys) -> None:
+    """Check the subcommand of the entry point"""
+    write(tmp_path / "doc.json", "+afaik")
+    report = tmp_path / "report.json"
+    monkeypatch.setattr("sys.argv", ["pandoc-acro", "batch", "-t",
+                                     "markdown", "--report", str(report),
+                                     str(tmp_path / "doc.json")])
+    pandocacro.main()
+    assert "1 processed, 0 failed" in capsys.readouterr().out
+    assert json.loads(report.read_text())["results"][0]["error"] is None
+    assert (tmp_path / "doc.acro.json").is_file()
+
+
+def test_metadata(tmp_path: pathlib.Path) -> None:
+    """Check only the metadata is read from the documents"""
+    data = json.loads(write(tmp_path / "doc.json", "+afaik"))
+    loaded = batch.metadata(tmp_path / "doc.json")
+    assert loaded["pandoc-api-version"] == data["pandoc-api-version"]
+    assert loaded["meta"] == data["meta"]
+    assert loaded["blocks"] == []
+
+    (tmp_path / "other.json").write_text(json.dumps(
+        {"blocks": data["blocks"], "meta": data["meta"],
+         "pandoc-api-version": data["pandoc-api-version"]}
+    ), encoding="utf-8")
+    assert batch.metadata(tmp_path / "other.json") == data
+
+
+def test_preload(tmp_path: pathlib.Path, monkeypatch) -> None:
+    """Check every glossary is built once and installed in the workers"""
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    write(tmp_path / "doc0.json", "+afaik")
+    write(tmp_path / "doc1.json", "+lol")
+    # More glossaries than the cache holds, relative to the documents
+    size = raw.SIZE + 2
+    for i in range(size):
+        (tmp_path / f"glossary{i}.yaml").write_text(
+            f"x:\n  short: X{i}\n  long: ex {i}\n", encoding="utf-8"
+        )
+        (tmp_path / f"other{i}.json").write_text(panflute.convert_text(
+            f"---\npandoc-acro:\n  glossary: glossary{i}.yaml\n...\n\n+x",
+            output_format="json", standalone=True
+        ), encoding="utf-8")
+
+    monkeypatch.chdir(root)
+    monkeypatch.setattr(batch, "GLOSSARIES", raw.Glossaries())
+    loaded = []
+    document = raw.document
+
+    def count(*args, **kwargs):
+        loaded.append(args)
+        return document(*args, **kwargs)
+
+    monkeypatch.setattr(raw, "document", count)
+    files = batch.inputs([str(tmp_path)])
+    acronyms = batch.preload(files, "latex")
+    assert len(acronyms) == len(loaded) == size + 1
+
+    # The acronyms are passed to spawned workers after being used
+    for value in acronyms.values():
+        value[value.names[0]]
+
+    acronyms = pickle.loads(pickle.dumps(acronyms))
+    monkeypatch.setattr(batch, "GLOSSARIES", raw.Glossaries())
+    batch.install(acronyms)
+    monkeypatch.setattr(pandocacro.PandocAcro, "__init__", None)
+    results = {pathlib.Path(r["input"]).name: r
+               for r in (batch.convert(f, "latex") for f in files)}
+    assert results.pop("broken.json")["error"] is not None
+    assert all(r["error"] is None for r in results.values())
+    output = json.loads((tmp_path / "other3.acro.json").read_text())
+    assert "X3" in json.dumps(output["meta"])
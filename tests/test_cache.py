@@ -0,0 +1,141 @@
+__doc__ = """Check the batched and cached parsing of text fields"""
+
+import os
+import pathlib
+import threading
+
+import panflute
+import pytest
+
+import pandocacro
+
+from pandocacro import cache
+
+TEXT = """---
+acronyms:
+  mwe:
+    short: MWE
+    long: minimum working example
+  mfe:
+    short: MFE
+    long: minimum failing example
+  afaik:
+    short: AFAIK
+    long: as far as I know
+...
+
++mwe +mfe +afaik
+
+::: {#acronyms}
+:::
+"""
+
+
+def generate() -> panflute.Doc:
+    """Generate a document with the long forms as plain strings"""
+    doc = panflute.convert_text(TEXT, standalone=True)
+    doc.format = "markdown"
+    for key, value in doc.metadata["acronyms"].content.items():
+        value["long"] = panflute.MetaString(
+            panflute.stringify(value["long"]) + " *with* ::: colons"
+        )
+
+    return doc
+
+
+def test_batch(monkeypatch, tmp_path: pathlib.Path) -> None:
+    """Check the fields are parsed once per run and then cached"""
+    monkeypatch.setenv("PANDOC_ACRO_CACHE", str(tmp_path))
+    calls = []
+    convert_text = panflute.convert_text
+
+    def count(*args, **kwargs):
+        calls.append(args)
+        return convert_text(*args, **kwargs)
+
+    monkeypatch.setattr(panflute, "convert_text", count)
+    for expected in (1, 0):
+        doc = generate()
+        calls.clear()
+        doc = pandocacro.main(doc)
+        assert doc is not None
+        assert len(calls) == expected
+        items = doc.content[-1].content[-1].content
+        assert [panflute.stringify(i) for i in items] == [
+            "AFAIK: as far as I know with ::: colons",
+            "MFE: minimum failing example with ::: colons",
+            "MWE: minimum working example with ::: colons",
+        ]
+        assert all(isinstance(i.content[0].content[-5], panflute.Emph)
+                   for i in items)
+
+
+def test_version(monkeypatch, tmp_path: pathlib.Path) -> None:
+    """Check the entries are keyed by the Pandoc version"""
+    monkeypatch.delenv("PANDOC_VERSION", raising=False)
+    doc = panflute.convert_text(TEXT, standalone=True)
+    first = cache.Cache(tmp_path, version=cache.version(doc))
+    first.put({"text": [{"t": "Str", "c": "text"}]})
+    assert first.get("text") == [{"t": "Str", "c": "text"}]
+
+    monkeypatch.setenv("PANDOC_VERSION", "0.0")
+    second = cache.Cache(tmp_path, version=cache.version(doc))
+    assert second.get("text") is None
+
+
+def test_evict(tmp_path: pathlib.Path) -> None:
+    """Check the least recently used entries are evicted"""
+    store = cache.Cache(tmp_path, size=0)
+    store.put({"text": []})
+    assert store.get("text") is None
+
+    value = [{"t": "Str", "c": "x" * 100}]
+    store = cache.Cache(tmp_path, size=300)
+    store.put({"a": value, "b": value})
+    for age, text in enumerate(("a", "b")):
+        entry = tmp_path / (store.digest(text) + ".json")
+        os.utime(entry, (1000 + age, 1000 + age))
+
+    # Touch the first so it is the most recently used
+    assert store.get("a") == value
+    store.put({"c": value})
+    assert store.get("a") == value
+    assert store.get("b") is None
+    assert store.get("c") == value
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 300
+
+
+def test_write(tmp_path: pathlib.Path) -> None:
+    """Check threads writing the same file do not share a temporary"""
+    path = tmp_path / "file.txt"
+    errors = []
+
+    def write(i: int) -> None:
+        try:
+            for _ in range(50):
+                cache.write(path, str(i).encode("utf-8") * 10000)
+        except OSError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(set(path.read_text())) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["file.txt"]
+
+    with pytest.raises(OSError):
+        cache.write(tmp_path / "missing" / "file.txt", b"")
+
+    assert [p.name for p in tmp_path.iterdir()] == ["file.txt"]
+
+
+@pytest.mark.parametrize("text", ["a ::: b", ":::", "- item"])
+def test_fences(text: str) -> None:
+    """Check the texts cannot escape their div"""
+    parsed = cache.batch([text, "after"])
+    assert parsed["after"] == [{"t": "Str", "c": "after"}]
@@ -0,0 +1,132 @@
+__doc__ = """Check the single pass engine matches the filter pipeline"""
+
+import json
+import pathlib
+import random
+
+import panflute
+
+import pandocacro
+
+from pandocacro.keys import Key
+
+root = pathlib.Path(__file__).parent
+
+values = ("afaik", "lol", "BR", "unknown")
+blocks = (
+    "::: {#acronyms}\n:::",
+    "::: {#acronyms sort=false}\n:::",
+    "# List of +lol {#acronyms}",
+)
+
+
+def generate() -> str:
+    """Generate a document with random keys, quotes, and lists"""
+    lines = []
+    for _ in range(random.randrange(1, 50)):
+        key = Key()
+        key.value = random.choice(values)
+        key.count = random.choice((True, False))
+        key.type = random.choice(("", "full", "short", "long"))
+        key.capitalize = random.choice((True, False))
+        key.plural = random.choice((True, False))
+        text = random.choice((
+            "{key}",
+            "+{value}.",
+            "+{value}'s",
+            "'+{value}'",
+            '"with +{value} text"',
+            "*+{value}*",
+            "[*+{value}*]{{}}",
+            "[[+{value}]{{.short}}]{{}}",
+            "[+{value} and more]{{}}",
+            "`+{value}`",
+        )).format(key=key, value=key.value)
+        lines.append("-   " + text)
+        if random.random() < 0.1:
+            lines.extend(["", random.choice(blocks), ""])
+
+    meta = (root / "metadata.yaml").open().read()
+    return meta + "\n" + "\n".join(lines) + "\n"
+
+
+def legacy(text: str, format: str) -> str:
+    """Run the original three pass pipeline"""
+    doc = panflute.convert_text(text, standalone=True)
+    doc.format = format
+    doc = panflute.run_filters([pandocacro.translate,
+                                pandocacro.printacronyms],
+                               prepare=pandocacro.prepare, doc=doc)
+    return json.dumps(doc.to_json())
+
+
+def single(text: str, format: str) -> str:
+    """Run the single pass engine"""
+    doc = panflute.convert_text(text, standalone=True)
+    doc.format = format
+    doc = pandocacro.main(doc)
+    assert doc is not None
+    return json.dumps(doc.to_json())
+
+
+def test_example() -> None:
+    """Check the example document is identical"""
+    text = "\n".join(
+        [(root / f).open().read() for f in ("metadata.yaml", "example.md")]
+    )
+    for format in ("latex", "markdown"):
+        assert legacy(text, format) == single(text, format)
+
+
+def test_random() -> None:
+    """Check random documents are identical"""
+    for _ in range(10):
+        text = generate()
+        for format in ("latex", "beamer", "markdown", "html"):
+            assert legacy(text, format) == single(text, format)
+
+
+def test_walk() -> None:
+    """Check the walk visits the handled elements like panflute"""
+    text = "\n".join([
+        (root / "metadata.yaml").open().read().replace(
+            "---\n", "---\ntitle: On +afaik\n", 1
+        ),
+        "Some `+lol` and $+lol$ and [+BR]{.short} with [see +lol, p. 1 +BR]"
+        "[@cite].^[A +afaik note.]",
+        "",
+        "```",
+        "+afaik",
+        "```",
+        "",
+        "+lol",
+        ":   The +BR term.",
+        "",
+        "| +afaik | b |",
+        "|--------|---|",
+        "| 'q +lol' | `c` |",
+        "",
+        ": The +lol table",
+        "",
+        "::: {#acronyms}",
+        ":::",
+    ])
+    doc = panflute.convert_text(text, standalone=True)
+    types = (panflute.Str, panflute.Span, panflute.Div, panflute.Header)
+
+    def visits(walk) -> list:
+        found = []
+
+        def record(elem: panflute.Element, doc: panflute.Doc) -> None:
+            if type(elem) in types:
+                found.append((id(elem), id(elem.parent), elem.location,
+                              elem.index))
+
+        walk(record)
+        return found
+
+    expected = visits(lambda record: doc.walk(record))
+    assert len(expected) > 20
+    assert visits(lambda record: pandocacro.engine.walk(
+        doc, {t: record for t in types}, doc
+    )) == expected
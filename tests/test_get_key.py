@@ -70,5 +70,31 @@ def test_get_key() -> None:
                         f"from {delim}{elem}{delim}")
 
 
+def test_parse_cache() -> None:
+    """Check identical tokens share a single frozen key"""
+    doc = panflute.convert_text(
+        text.format(mark=f"+{key}. [+{key}.]{{.short}} +{key}."),
+        standalone=True
+    )
+    pandocacro.prepare(doc)
+    first, _, span, _, last = doc.content[0].content
+    pandocacro.keys.parse.cache_clear()
+    result = pandocacro.keys.get(first, doc)
+    assert result is not None
+    assert result is pandocacro.keys.get(last, doc)
+    assert result is not pandocacro.keys.get(span, doc)
+    info = pandocacro.keys.parse.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+    with pytest.raises(AttributeError):
+        result.value = "other"
+
+    # Keys made directly are still free to modify
+    free = pandocacro.keys.Key(first)
+    free.value = "other"
+    assert free.value == "other"
+    assert str(free) == str(result).replace(key, "other")
+
+
 if __name__ == "__main__":
     test_get_key()
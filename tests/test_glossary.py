@@ -0,0 +1,186 @@
+__doc__ = """Check the acronyms can be read from glossary files"""
+
+import io
+import json
+import os
+import pathlib
+
+import panflute
+import pytest
+
+import pandocacro
+
+from pandocacro import glossary, raw
+
+root = pathlib.Path(__file__).parent
+
+TEXT = """
++afaik and +lol or +BR
+
+::: {#acronyms}
+:::
+"""
+
+
+@pytest.fixture
+def directory(tmp_path: pathlib.Path, monkeypatch) -> pathlib.Path:
+    """Work in a temporary directory with a private cache"""
+    monkeypatch.setenv("PANDOC_ACRO_CACHE", str(tmp_path / "cache"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run(text: str, format: str) -> panflute.Doc:
+    """Run the filter on the Markdown text"""
+    doc = panflute.convert_text(text, standalone=True)
+    doc.format = format
+    return pandocacro.main(doc)
+
+
+@pytest.mark.parametrize("format", ["latex", "markdown"])
+def test_glossary(directory: pathlib.Path, format: str) -> None:
+    """Check a glossary file gives the same output as the metadata"""
+    metadata = (root / "metadata.yaml").read_text()
+    (directory / "terms.yaml").write_text(metadata)
+    expected = run(metadata + TEXT, format)
+    doc = run("---\npandoc-acro:\n  glossary: terms.yaml\n...\n" + TEXT,
+              format)
+    assert doc.content.to_json() == expected.content.to_json()
+    # Pandoc sorts the metadata but the file order is kept
+    assert sorted(doc.get_metadata("header-includes")[0].splitlines()) \
+        == sorted(expected.get_metadata("header-includes")[0].splitlines())
+
+
+def test_merge(directory: pathlib.Path) -> None:
+    """Check the files are merged in order before the metadata"""
+    (directory / "a.json").write_text(json.dumps({"acronyms": {
+        "afaik": {"short": "A", "long": "first"},
+        "lol": {"short": "lol", "long": "laugh out loud"},
+    }}))
+    (directory / "b.json").write_text(json.dumps({
+        "afaik": {"short": "AFAIK", "long": "second"},
+    }))
+    doc = panflute.convert_text("""---
+pandoc-acro:
+  glossary: [a.json, b.json]
+acronyms:
+  lol:
+    short: LOL
+    long: lots of love
+...
+""", standalone=True)
+    acronyms = glossary.definitions(doc)
+    assert acronyms is not None
+    assert pandocacro.PandocAcro.convert(acronyms["afaik"]) \
+        == {"short": "AFAIK", "long": "second"}
+    assert pandocacro.PandocAcro.convert(acronyms["lol"]) \
+        == {"short": "LOL", "long": "lots of love"}
+
+    (directory / "c.json").write_text(json.dumps({"afaik": "AFAIK"}))
+    with pytest.raises(ValueError):
+        glossary.load(directory / "c.json")
+
+    assert glossary.definitions(panflute.convert_text("", standalone=True)) \
+        is None
+
+
+def test_options(directory: pathlib.Path) -> None:
+    """Check the options are merged key by key before the metadata"""
+    (directory / "a.json").write_text(json.dumps({
+        "options": {"first-style": "short", "single": True},
+        "afaik": {"short": "AFAIK", "long": "as far as I know"},
+    }))
+    (directory / "b.json").write_text(json.dumps({
+        "options": {"single-style": "long"},
+    }))
+    doc = panflute.convert_text("""---
+pandoc-acro:
+  glossary: [a.json, b.json]
+acronyms:
+  options:
+    first-style: long
+...
+""", standalone=True)
+    acronyms = glossary.definitions(doc)
+    assert acronyms is not None
+    assert acronyms["options"] == {"first-style": "long", "single": True,
+                                   "single-style": "long"}
+
+
+@pytest.mark.parametrize("format", ["latex", "markdown"])
+def test_markdown(directory: pathlib.Path, format: str) -> None:
+    """Check the values in a file are Markdown just like the metadata"""
+    (directory / "terms.yaml").write_text(
+        "afaik:\n  short: AFAIK\n  long: \"*as* far as I know\"\n"
+    )
+    expected = run("---\nacronyms:\n  afaik:\n    short: AFAIK\n"
+                   "    long: \"*as* far as I know\"\n...\n" + TEXT, format)
+    doc = run("---\npandoc-acro:\n  glossary: terms.yaml\n...\n" + TEXT,
+              format)
+    assert doc.content.to_json() == expected.content.to_json()
+    assert doc.get_metadata("header-includes") \
+        == expected.get_metadata("header-includes")
+    if format == "latex":
+        assert "long = as far as I know\n" \
+            in doc.get_metadata("header-includes")[0]
+    else:
+        assert any(isinstance(e, panflute.Emph)
+                   for e in doc.content[-1].content[1].content[0].content[0]
+                   .content)
+
+
+def short(acronyms: dict) -> str:
+    """The short form of afaik in the compiled glossary"""
+    return pandocacro.PandocAcro.convert(acronyms["afaik"])["short"]
+
+
+def test_cache(directory: pathlib.Path, monkeypatch) -> None:
+    """Check the compiled glossary is reused while the file is unchanged"""
+    path = directory / "terms.json"
+    path.write_text(json.dumps({"afaik": {"short": "AFAIK",
+                                          "long": "as far as I know"}}))
+    assert short(glossary.load(path)) == "AFAIK"
+    assert len(list((directory / "cache" / "glossary").glob("*.json"))) \
+        == 1
+
+    def parse(path, content):
+        raise AssertionError("The file was parsed again")
+
+    with monkeypatch.context() as m:
+        m.setattr(glossary, "parse", parse)
+        assert short(glossary.load(path)) == "AFAIK"
+        # Touching the file falls back to the hash of the contents
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert short(glossary.load(path)) == "AFAIK"
+
+    path.write_text(json.dumps({"afaik": {"short": "IIRC",
+                                          "long": "if I recall correctly"}}))
+    assert short(glossary.load(path)) == "IIRC"
+
+
+def test_glossaries(directory: pathlib.Path) -> None:
+    """Check the kept acronyms are built again when a file changes"""
+    path = directory / "terms.json"
+    path.write_text(json.dumps({"afaik": {"short": "AFAIK",
+                                          "long": "as far as I know"}}))
+    text = panflute.convert_text(
+        "---\npandoc-acro:\n  glossary: terms.json\n...\n\n+afaik",
+        output_format="json", standalone=True
+    )
+    glossaries = raw.Glossaries()
+
+    def output() -> str:
+        data = glossaries.process(json.loads(text), "markdown",
+                                  pandocacro.prepare, str(directory))
+        return panflute.stringify(panflute.load(io.StringIO(
+            json.dumps(data)
+        )))
+
+    assert "AFAIK" in output()
+    path.write_text(json.dumps({"afaik": {"short": "IIRC",
+                                          "long": "if I recall correctly"}}))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert "IIRC" in output()
+    assert len(glossaries.acronyms) == 2
@@ -1,8 +1,18 @@
 __doc__ = """Check the bare expanded text"""
 
+import io
+import json
 import os
+import re
+
+from typing import List
 
 import panflute
+import pytest
+
+import pandocacro
+
+from pandocacro import PandocAcro, options, preamble, raw
 
 _expected = r"""\usepackage{acro}
 \DeclareAcronym{BR}{
@@ -47,3 +57,167 @@ def test_header_after() -> None:
                                    extra_args=["-F", "pandoc-acro",
                                                "--template", _template])
     assert "\\usepackage{test}\n" + _expected == result
+
+
+def per_line(acronyms: PandocAcro) -> List[panflute.MetaInlines]:
+    """The header items as added before the preamble was a single chunk"""
+    def latex(text: str) -> panflute.MetaInlines:
+        return panflute.MetaInlines(panflute.RawInline(text, format="latex"))
+
+    header = [latex(r"\usepackage{acro}")]
+    if acronyms.options:
+        header.append(latex(options.acsetup(acronyms.options)))
+
+    for key, values in acronyms.items():
+        header.append(latex(fr"\DeclareAcronym{{{key}}}{{"))
+        header.append(latex(f"short = {values['short']},\n"))
+        header.append(latex(",\n".join(f"{k} = {v}" for k, v
+                                       in sorted(values.items())
+                                       if k != "short")))
+        header.append(latex("}"))
+
+    return header
+
+
+@pytest.mark.parametrize("engine", ["panflute", "json"])
+@pytest.mark.parametrize("existing", [
+    "",
+    "header-includes: \\usepackage{test}\n",
+    "header-includes:\n- \\usepackage{test}\n- \\usepackage{other}\n",
+])
+def test_single_chunk(engine: str, existing: str) -> None:
+    """Check the preamble is one chunk rendered as the old items were"""
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    text = "\n".join(open(os.path.join(dirname, p), "r").read()
+                     for p in ("metadata.yaml", "example.md"))
+    text = text.replace("---\nacronyms:\n", "---\n" + existing
+                        + "acronyms:\n  options:\n    first-style: short\n",
+                        1)
+    original = panflute.convert_text(text, standalone=True)
+    before = original.metadata["header-includes"] \
+        if "header-includes" in original.metadata else panflute.MetaList()
+    if not isinstance(before, panflute.MetaList):
+        before = panflute.MetaList(before)
+
+    if engine == "json":
+        data = raw.process(original.to_json(), "latex", pandocacro.prepare)
+        doc = panflute.load(io.StringIO(json.dumps(data)))
+    else:
+        doc = panflute.convert_text(text, standalone=True)
+        doc.format = "latex"
+        doc = pandocacro.main(doc)
+
+    assert doc is not None
+    header = doc.metadata["header-includes"]
+    assert isinstance(header, panflute.MetaList)
+    assert len(header) == len(before) + 1
+    assert [h.to_json() for h in header[:-1]] \
+        == [h.to_json() for h in before]
+    assert isinstance(header[-1], panflute.MetaInlines)
+    assert len(header[-1].content) == 1
+    assert isinstance(header[-1].content[0], panflute.RawInline)
+
+    # The old items through the same template give the same bytes
+    old = panflute.convert_text(text, standalone=True)
+    old.metadata["header-includes"] = list(before) + per_line(
+        PandocAcro(old.get_metadata("acronyms"))
+    )
+    rendered = [panflute.convert_text(d, input_format="panflute",
+                                      output_format="latex",
+                                      extra_args=["--template", _template])
+                for d in (old, doc)]
+    assert rendered[0] == rendered[1]
+    assert r"\acsetup{first-style=short}" in rendered[1]
+
+
+@pytest.mark.parametrize("engine", ["", "json", "incremental"])
+def test_declare_used(tmp_path, monkeypatch, engine: str) -> None:
+    """Check only the used acronyms are declared when requested"""
+    monkeypatch.setenv("PANDOC_ACRO_CACHE", str(tmp_path))
+    if engine == "json":
+        monkeypatch.setenv("PANDOC_ACRO_ENGINE", engine)
+    elif engine:
+        monkeypatch.setenv("PANDOC_ACRO_INCREMENTAL", "1")
+
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    metadata = open(os.path.join(dirname, "metadata.yaml"), "r").read()
+    text = metadata.replace("---\n", "---\npandoc-acro:\n  declare: used\n",
+                            1) + "\nThe +*afaik and +BR.\n"
+    result = panflute.convert_text(text, output_format="latex",
+                                   extra_args=["-F", "pandoc-acro",
+                                               "--template", _template])
+    expected = _expected.split(r"\DeclareAcronym{lol}")[0].rstrip()
+    assert expected == result
+
+
+def test_referenced() -> None:
+    """Check the acronyms referenced by a used acronym are declared"""
+    acronyms = PandocAcro({
+        "a": {"short": "A", "long": r"an \acs{b} thing"},
+        "b": {"short": "B", "long": "a +c thing"},
+        "c": {"short": "C", "long": "c"},
+        "d": {"short": "D", "long": "d"},
+    })
+    acronyms.seen[acronyms.ids["a"]] = 1
+    assert preamble.referenced(acronyms) == ["a", "b", "c"]
+    assert "{d}" not in preamble.text(acronyms, preamble.referenced(acronyms))
+
+
+def test_sidecar(tmp_path, monkeypatch) -> None:
+    """Check the preamble is written once to a shared sidecar file"""
+    monkeypatch.chdir(tmp_path)
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    metadata = open(os.path.join(dirname, "metadata.yaml"), "r").read()
+    text = metadata.replace("---\n", "---\npandoc-acro:\n"
+                                     "  sidecar: build/acro\n", 1)
+    results = [panflute.convert_text(text + body, output_format="latex",
+                                     extra_args=["-F", "pandoc-acro",
+                                                 "--template", _template])
+               for body in ("\n+afaik\n", "\n+lol\n")]
+    assert results[0] == results[1]
+    assert re.fullmatch(r"\\input\{build/acro/acro-[0-9a-f]{16}\.tex\}",
+                        results[0])
+    path = tmp_path / results[0][len("\\input{"):-1]
+    assert path.read_text(encoding="utf-8") == _expected + "\n"
+    assert len(list(path.parent.iterdir())) == 1
+
+
+def test_sidecar_directory(tmp_path) -> None:
+    """Check the sidecar is relative to the directory of the client"""
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    metadata = open(os.path.join(dirname, "metadata.yaml"), "r").read()
+    data = json.loads(panflute.convert_text(
+        metadata.replace("---\n", "---\npandoc-acro:\n  sidecar: acro\n", 1)
+        + "\n+afaik\n", output_format="json", standalone=True
+    ))
+    data = raw.Glossaries().process(data, "latex", pandocacro.prepare,
+                                    str(tmp_path))
+    assert len(list((tmp_path / "acro").glob("acro-*.tex"))) == 1
+    assert "\\\\input{acro/acro-" in json.dumps(data["meta"])
+
+
+def test_sidecar_existing(tmp_path, monkeypatch) -> None:
+    """Check the preamble is only built when the sidecar is missing"""
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    metadata = open(os.path.join(dirname, "metadata.yaml"), "r").read()
+    built = []
+    text = preamble.text
+
+    def count(*args, **kwargs):
+        built.append(args)
+        return text(*args, **kwargs)
+
+    monkeypatch.setattr(preamble, "text", count)
+    glossaries = raw.Glossaries()
+    for declare, body in (("all", "+afaik"), ("all", "+lol"),
+                          ("used", "+afaik"), ("used", "+afaik again"),
+                          ("used", "+lol")):
+        data = json.loads(panflute.convert_text(
+            metadata.replace("---\n", "---\npandoc-acro:\n  sidecar: acro\n"
+                                      f"  declare: {declare}\n", 1)
+            + f"\n{body}\n", output_format="json", standalone=True
+        ))
+        glossaries.process(data, "latex", pandocacro.prepare, str(tmp_path))
+
+    assert len(built) == 3
+    assert len(list((tmp_path / "acro").glob("acro-*.tex"))) == 3
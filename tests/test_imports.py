@@ -0,0 +1,57 @@
+__doc__ = """Check the package loads the submodules and panflute lazily"""
+
+import json
+import subprocess
+import sys
+
+
+def modules(code: str, data: str = "") -> dict:
+    """Run the code in a new interpreter and report what is imported"""
+    report = "; import json, sys; json.dump({" \
+        "'panflute': 'panflute' in sys.modules, " \
+        "'engine': 'pandocacro.raw' in sys.modules}, sys.stderr)"
+    result = subprocess.run([sys.executable, "-c", code + report, "markdown"],
+                            input=data, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, universal_newlines=True,
+                            check=True)
+    return json.loads(result.stderr)
+
+
+def test_import() -> None:
+    """Check importing the package does not import panflute"""
+    assert modules("import pandocacro, pandocacro.client") \
+        == {"panflute": False, "engine": False}
+
+
+def test_passthrough() -> None:
+    """Check a document that cannot change skips the engine"""
+    data = json.dumps({"pandoc-api-version": [1, 22, 2, 1], "meta": {},
+                       "blocks": [{"t": "Para",
+                                   "c": [{"t": "Str", "c": "+afaik"}]}]})
+    assert modules("import pandocacro; pandocacro.run()", data) \
+        == {"panflute": False, "engine": False}
+
+
+def test_exports() -> None:
+    """Check the filters are not replaced by the submodules"""
+    import pandocacro.translate  # noqa: F401
+    import pandocacro.engine  # noqa: F401
+    assert callable(pandocacro.translate)
+    assert callable(pandocacro.printacronyms)
+    assert pandocacro.keys.Key is not None
+
+
+def test_main_passthrough() -> None:
+    """Check the default engine writes back a document without keys"""
+    data = json.dumps({"pandoc-api-version": [1, 22, 2, 1],
+                       "meta": {"acronyms": {"t": "MetaMap", "c": {}}},
+                       "blocks": [{"t": "Para", "c": [
+                           {"t": "Str", "c": "x"},
+                           {"t": "Code", "c": [["", [], []], "a + b"]},
+                       ]}]}, indent=1)
+    code = "import pandocacro; pandocacro.main()"
+    assert modules(code, data) == {"panflute": False, "engine": False}
+    result = subprocess.run([sys.executable, "-c", code, "markdown"],
+                            input=data, stdout=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    assert result.stdout == data
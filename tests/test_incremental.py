@@ -0,0 +1,108 @@
+__doc__ = """Check the cached blocks give the same document as a full run"""
+
+import io
+import json
+import pathlib
+import random
+
+import pytest
+
+import pandocacro
+
+from pandocacro import incremental, raw
+
+from test_engine import generate
+from test_raw import EXTRA, source
+
+root = pathlib.Path(__file__).parent
+
+METADATA = (root / "metadata.yaml").open().read()
+
+
+def check(text: str, format: str, directory: pathlib.Path) -> None:
+    """Check the incremental run matches the JSON engine"""
+    data = source(text)
+    expected = raw.process(json.loads(data), format, pandocacro.prepare)
+    assert incremental.process(json.loads(data), format, pandocacro.prepare,
+                               directory) == expected
+
+
+@pytest.mark.parametrize("format", ["latex", "markdown"])
+def test_edit(tmp_path: pathlib.Path, monkeypatch, format: str) -> None:
+    """Check only the new blocks are scanned after an edit"""
+    text = METADATA + (root / "example.md").open().read() + EXTRA
+    scans = []
+    scan = raw.scan
+
+    def counted(doc, blocks, counted=None):
+        scans.append(blocks)
+        return scan(doc, blocks, counted)
+
+    monkeypatch.setattr(raw, "scan", counted)
+    check(text, format, tmp_path)
+    first = len(scans)
+    assert first > 0
+
+    scans.clear()
+    check(text, format, tmp_path)
+    # Only the full run and the blocks with a list scan again
+    assert 1 <= len(scans) < first
+
+    # A new first use changes the expansion of the later blocks
+    edited = METADATA + "\nThe +afaik and +lol and +BR.\n\n" \
+        + (root / "example.md").open().read() + EXTRA
+    check(edited, format, tmp_path)
+    check(edited, format, tmp_path)
+
+
+def test_chapters(tmp_path: pathlib.Path, monkeypatch) -> None:
+    """Check the documents sharing the acronyms keep their blocks"""
+    chapters = [METADATA + f"\n# Chapter {i}\n\nThe +afaik and +lol {i}.\n"
+                for i in range(3)]
+    for text in chapters:
+        check(text, "markdown", tmp_path)
+
+    scans = []
+    scan = incremental.Block.scan
+
+    def counted(self, doc):
+        scans.append(self)
+        return scan(self, doc)
+
+    monkeypatch.setattr(incremental.Block, "scan", counted)
+    for text in chapters:
+        check(text, "markdown", tmp_path)
+
+    assert not scans
+
+    monkeypatch.setattr(incremental, "SIZE", 2)
+    check(METADATA + "\nNew +afaik.\n", "markdown", tmp_path)
+    assert len(incremental.load(next(tmp_path.iterdir()))) == 2
+
+
+def test_random(tmp_path: pathlib.Path) -> None:
+    """Check random edits of random documents"""
+    for _ in range(5):
+        paragraphs = [line[4:] for line in generate().splitlines()
+                      if line.startswith("-   ")]
+        for _ in range(3):
+            for format in ("latex", "markdown"):
+                check(METADATA + "\n\n".join(paragraphs), format, tmp_path)
+
+            random.shuffle(paragraphs)
+            del paragraphs[:random.randrange(len(paragraphs) // 2 + 1)]
+
+
+def test_run(tmp_path: pathlib.Path, monkeypatch) -> None:
+    """Check the filter uses the cache when requested"""
+    monkeypatch.setenv("PANDOC_ACRO_CACHE", str(tmp_path))
+    monkeypatch.setenv("PANDOC_ACRO_INCREMENTAL", "1")
+    monkeypatch.setattr("sys.argv", ["pandoc-acro", "markdown"])
+    data = source(METADATA + "+afaik and +lol\n\nThe +afaik")
+    expected = raw.process(json.loads(data), "markdown", pandocacro.prepare)
+    for _ in range(2):
+        output = io.StringIO()
+        pandocacro.run(io.StringIO(data), output)
+        assert json.loads(output.getvalue()) == expected
+
+    assert list((tmp_path / "blocks").glob("*.pickle"))
@@ -107,3 +107,22 @@ def test_option_header() -> None:
                 key, value = opt.split("=")
                 assert key in meta
                 assert str(meta[key]) == value
+
+
+def test_configuration() -> None:
+    """Check the options are compiled once into a configuration"""
+    for count in range(10):
+        meta = generate_options()
+        config = options.Configuration(meta, silent=True)
+        assert config.acsetup == options.acsetup(meta, silent=True)
+        assert config.first_style == meta.get("first-style", "long-short")
+        assert config.single_style == meta.get("single-style", "long")
+        assert config.styles["first"] == config.first_style
+        assert config.styles["single"] == config.single_style
+
+    for value, expected in ((True, 1), (False, 0), ("true", 1),
+                            ("false", 0), (3, 3), ("2", 2), ("many", 0)):
+        config = options.Configuration({"single": value}, silent=True)
+        assert config.single == expected
+
+    assert options.Configuration().single == 0
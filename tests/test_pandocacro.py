@@ -1,6 +1,7 @@
 import pathlib
 
 import panflute
+import pytest
 
 import pandocacro
 
@@ -19,13 +20,135 @@ def test_pandocacro() -> None:
     pandocacro.prepare(doc)
     assert hasattr(doc, "acronyms")
 
+    size = len(doc.acronyms)
+    assert doc.acronyms.names == list(doc.acronyms)
+    for counter in (doc.acronyms.counts, doc.acronyms.totals,
+                    doc.acronyms.listed):
+        assert len(counter) == size
+
+    assert not any(doc.acronyms.counts)
+    assert any(doc.acronyms.totals)
+    assert not any(doc.acronyms.listed)
     for acro in doc.acronyms:
-        for key, type_ in (("count", int),
-                           ("list", bool),
-                           ("total", int),
-                           ):
-            assert key in doc.acronyms[acro]
-            assert isinstance(doc.acronyms[acro][key], type_)
+        assert doc.acronyms.names[doc.acronyms.ids[acro]] == acro
+        for key in ("count", "list", "total"):
+            assert key not in doc.acronyms[acro]
+
+        # The definitions are read only
+        with pytest.raises(TypeError):
+            doc.acronyms[acro]["count"] = 0  # type: ignore
 
     pandocacro.finalize(doc)
     assert not hasattr(doc, "acronyms")
+
+
+def test_forms() -> None:
+    """Check the rendering tables are built once for every acronym"""
+    acronyms = pandocacro.PandocAcro({
+        "BR": {"short": "BR", "long": "Betriebsrat",
+               "short-plural-form": "BRs",
+               "long-plural-form": "Betriebsräte"},
+        "lol": {"short": "lol", "long": "laugh out loud",
+                "long-plural": "es"},
+        "options": {"first-style": "short-long", "single-style": "footnote"},
+    })
+    assert acronyms.names == ["BR", "lol"]
+    assert acronyms.forms == [None, None]
+    assert acronyms.form("BR", "first", True, True) \
+        == ("BRs (Betriebsrat)", True)
+    assert acronyms.form("lol", "long", True, True) \
+        == ("Laugh out loudes", False)
+    assert acronyms.form("lol", "short", True) == ("lols", True)
+
+    # Styles that cannot be rendered only fail when used
+    with pytest.raises(NotImplementedError):
+        acronyms.form("lol", "single")
+
+
+@pytest.mark.parametrize("format", ["latex", "plain"])
+def test_lazy(format: str) -> None:
+    """Check only the acronyms used are converted"""
+    definitions = "\n".join(f"  key{i}:\n    short: K{i}\n"
+                            f"    long: key *number* {i}"
+                            for i in range(500))
+    doc = panflute.convert_text(
+        "---\npandoc-acro:\n  declare: used\nacronyms:\n"
+        + definitions + "\n...\n\n+key7 and +key42\n\n::: {#acronyms}\n:::\n",
+        standalone=True
+    )
+    doc.format = format
+    doc = pandocacro.main(doc)
+    assert doc is not None
+    acronyms = doc.acronyms
+    assert sorted(acronyms.acronyms) == ["key42", "key7"]
+    assert sum(table is not None for table in acronyms.forms) \
+        == (0 if format == "latex" else 2)
+    assert acronyms["key7"]["long"] == "key number 7"
+    assert len(acronyms) == 500 and "key499" in acronyms
+    header = doc.get_metadata("header-includes")[0]
+    assert header.count("DeclareAcronym") == 2
+
+
+def test_bind() -> None:
+    """Check the parsed keys are bound to the acronym ids once"""
+    acronyms = pandocacro.PandocAcro({
+        "BR": {"short": "BR", "long": "Betriebsrat"},
+        "lol": {"short": "lol", "long": "laugh out loud"},
+    })
+    key = pandocacro.keys.parse("+lol.")
+    assert key is not None
+    bound = acronyms.bind(key)
+    assert bound is not None
+    assert bound is acronyms.bind(key)
+    assert (bound.id, bound.value, bound.post) == (1, "lol", ".")
+    assert key.id == -1
+
+    unknown = pandocacro.keys.parse("+unknown")
+    assert unknown is not None
+    assert acronyms.bind(unknown) is None
+
+    # The bound keys of every token ever seen are not kept
+    other = acronyms.copy()
+    for i in range(pandocacro.keys.CACHE_SIZE + 1):
+        key = pandocacro.keys.parse(f"+lol{'.' * i}")
+        assert key is not None and other.bind(key) is not None
+
+    assert 0 < len(acronyms.bound) <= pandocacro.keys.CACHE_SIZE
+
+
+def test_copy() -> None:
+    """Check the copies share the converted acronyms"""
+    acronyms = pandocacro.PandocAcro({"lol": {"short": "lol",
+                                              "long": "laugh out loud"}})
+    other = acronyms.copy()
+    assert other["lol"] is acronyms.copy()["lol"]
+    assert other.acronyms is acronyms.acronyms
+
+
+def test_convert() -> None:
+    """Check the JSON of the metadata converts like the panflute objects"""
+    doc = panflute.convert_text(
+        "---\nacronyms:\n  a:\n    short: A\n    long: a *b*\n      c\n"
+        "    plain: a b\n    list: true\n    n: [1, \"x y\"]\n"
+        "    blocks: |\n      one\n\n      two\n...\n", standalone=True
+    )
+    value = doc.metadata["acronyms"]
+    expected = panflute.tools.meta2builtin(value)
+    assert pandocacro.PandocAcro.convert(value.to_json()) == expected
+    assert pandocacro.PandocAcro.convert(value) == expected
+
+
+@pytest.mark.parametrize("declare", ["all", "used"])
+def test_settle(declare: str) -> None:
+    """Check a definition holding a key is converted before translating"""
+    doc = panflute.convert_text(
+        f"---\npandoc-acro:\n  declare: {declare}\nacronyms:\n  api:\n"
+        "    short: API\n    long: application programming interface\n"
+        "  nest:\n    short: NST\n    long: nested +api thing\n...\n\n+api",
+        standalone=True
+    )
+    doc.format = "markdown"
+    doc = pandocacro.main(doc)
+    assert doc is not None
+    assert doc.acronyms["nest"]["long"] == "nested +api thing"
+    assert "application" in panflute.stringify(doc.metadata["acronyms"])
@@ -9,6 +9,8 @@ from typing import List, Tuple
 import panflute
 import yaml
 
+import pandocacro
+
 from pandocacro.keys import Key
 from pandocacro import printacronyms
 
@@ -182,3 +184,33 @@ def test_plain() -> None:
         print("Text: '''=\n" + result + "\n'''")
 
     assert all(usage)
+
+
+def test_plain_inlines(monkeypatch) -> None:
+    r"""Check the plain list reuses the metadata without calling Pandoc"""
+    text = "\n".join([TEXT.replace("long: as far as I know",
+                                   "long: as *far* as I know"),
+                      "",
+                      "+afaik +mwe",
+                      "",
+                      "::: {#acronyms}",
+                      ":::",
+                      ])
+    doc = panflute.convert_text(text, standalone=True)
+    doc.format = "markdown"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Pandoc was called")
+
+    monkeypatch.setattr(panflute, "convert_text", fail)
+    doc = pandocacro.main(doc)
+    assert doc is not None
+
+    acrolist = doc.content[-1]
+    assert acrolist.identifier == "acronym-list"
+    items = acrolist.content[-1].content
+    assert len(items) == 2
+    afaik, mwe = (item.content[0] for item in items)
+    assert panflute.stringify(afaik) == "AFAIK: as far as I know"
+    assert any(isinstance(e, panflute.Emph) for e in afaik.content)
+    assert panflute.stringify(mwe) == "MWE: minimum working example"
@@ -0,0 +1,51 @@
+__doc__ = """Check the profile of a run is written to disk"""
+
+import io
+import json
+import pathlib
+
+import panflute
+
+import pandocacro
+
+root = pathlib.Path(__file__).parent
+
+
+def source() -> str:
+    """The JSON of the example document"""
+    text = "\n".join(
+        [(root / f).open().read() for f in ("metadata.yaml", "example.md")]
+    )
+    return panflute.convert_text(text, output_format="json",
+                                 standalone=True)
+
+
+def test_main(monkeypatch, tmp_path: pathlib.Path) -> None:
+    """Check each run writes a report in the directory"""
+    monkeypatch.setenv("PANDOC_ACRO_PROFILE", str(tmp_path))
+    monkeypatch.setenv("PANDOC_ACRO_PROFILE_TOOLS", "cprofile, tracemalloc")
+    doc = panflute.load(io.StringIO(source()))
+    doc.format = "markdown"
+    pandocacro.main(doc)
+    reports = list(tmp_path.glob("*.json"))
+    assert len(reports) == 1
+    report = json.loads(reports[0].read_text())
+    assert set(report["phases"]) == {"prepare", "scan", "translate",
+                                     "lists"}
+    assert report["tracemalloc"]["peak"] > 0
+    assert pathlib.Path(report["cprofile"]).is_file()
+
+
+def test_run(monkeypatch, tmp_path: pathlib.Path, capsys) -> None:
+    """Check the JSON engine reports to the file only"""
+    path = tmp_path / "profile.json"
+    monkeypatch.setenv("PANDOC_ACRO_PROFILE", str(path))
+    monkeypatch.setattr("sys.argv", ["pandoc-acro", "latex"])
+    output = io.StringIO()
+    pandocacro.run(io.StringIO(source()), output)
+    report = json.loads(path.read_text())
+    assert set(report["phases"]) == {"load", "prepare", "scan", "translate",
+                                     "lists", "dump"}
+    assert "cprofile" not in report
+    assert json.loads(output.getvalue())["blocks"]
+    assert capsys.readouterr().out == ""
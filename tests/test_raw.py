@@ -0,0 +1,149 @@
+__doc__ = """Check the JSON engine matches the panflute engine"""
+
+import io
+import json
+import pathlib
+
+import panflute
+
+import pandocacro
+
+from pandocacro import raw
+
+from test_engine import generate
+
+root = pathlib.Path(__file__).parent
+
+EXTRA = """
+: +afaik in a table caption
+
+| +lol    | +BR      |
+|---------|----------|
+| +afaik  | [+lol]{} |
+
+See [+afaik in a prefix @doe, +lol in a suffix] and 'quoted +BR's'.
+
+![+lol in a figure](image.png)
+
+Term +BR
+:   Definition of +afaik.
+
+"+afaik's" and [+afaik and text]{} with [[+lol]{.long}]{}
+"""
+
+
+def source(text: str) -> str:
+    """The JSON from Pandoc for the text"""
+    return panflute.convert_text(text, input_format="markdown",
+                                 output_format="json", standalone=True)
+
+
+def compare(text: str, format: str) -> None:
+    """Check both engines give the same document for the text
+
+    The documents are compared after decoding because panflute does not
+    keep the order of the fields of a citation.
+    """
+    data = source(text)
+    doc = panflute.load(io.StringIO(data))
+    doc.format = format
+    doc = pandocacro.main(doc)
+    assert doc is not None
+    expected = json.loads(json.dumps(doc.to_json()))
+    assert raw.process(json.loads(data), format,
+                       pandocacro.prepare) == expected
+
+
+def test_example() -> None:
+    """Check the example document is identical"""
+    text = "\n".join(
+        [(root / f).open().read() for f in ("metadata.yaml", "example.md")]
+    )
+    for format in ("latex", "markdown"):
+        compare(text + EXTRA, format)
+
+
+def test_random() -> None:
+    """Check random documents are identical"""
+    for _ in range(5):
+        text = generate()
+        for format in ("latex", "markdown"):
+            compare(text, format)
+
+
+def test_no_acronyms() -> None:
+    """Check a document without acronyms is only given the lists"""
+    text = "Some +afaik text\n\n::: {#acronyms}\n:::\n"
+    for format in ("latex", "markdown"):
+        compare(text, format)
+
+
+def test_run(monkeypatch) -> None:
+    """Check the entry point runs the JSON engine"""
+    text = (root / "metadata.yaml").open().read() + "\n+afaik\n"
+    monkeypatch.setattr("sys.argv", ["pandoc-acro", "markdown"])
+    output = io.StringIO()
+    pandocacro.run(io.StringIO(source(text)), output)
+    doc = panflute.load(io.StringIO(output.getvalue()))
+    assert panflute.stringify(doc.content[0]).strip() \
+        == "as far as I know (AFAIK)"
+
+
+def test_unchanged() -> None:
+    """Check the documents passed through as is"""
+    meta = (root / "metadata.yaml").open().read()
+    cases = {
+        ("Some +afaik text", "markdown"): True,
+        ("Some +afaik text\n\n::: {#acronyms}\n:::\n", "markdown"): True,
+        ("Some +afaik text\n\n::: {#acronyms}\n:::\n", "latex"): False,
+        (meta + "\nSome `+afaik` and $a + b$", "markdown"): True,
+        (meta + "\nSome `+afaik` and $a + b$", "latex"): False,
+        (meta + '\nSome "q\\"+afaik"', "markdown"): False,
+        (meta + "\nSome [+afaik]{.short}", "html"): False,
+        (meta + "\n# List {#acronyms}", "html"): False,
+    }
+    for (text, format), expected in cases.items():
+        assert pandocacro.unchanged(source(text), format) == expected, text
+
+
+def test_glossaries() -> None:
+    """Check the shared acronyms are not changed by an earlier document"""
+    meta = """---
+pandoc-acro:
+  declare: used
+acronyms:
+  api:
+    short: API
+    long: application programming interface
+  nest:
+    short: NST
+    long: nested +api thing
+...
+"""
+    glossaries = raw.Glossaries()
+    outputs = [glossaries.process(json.loads(source(meta + text)),
+                                  "markdown", pandocacro.prepare)
+               for text in ("+api", "[+nest]{.full}")]
+    assert len(glossaries.acronyms) == 1
+    doc = panflute.load(io.StringIO(json.dumps(outputs[-1])))
+    assert panflute.stringify(doc.content[0]).strip() \
+        == "nested +api thing (NST)"
+
+
+def test_metadata() -> None:
+    """Check the definitions stay JSON and only changed entries are set"""
+    meta = (root / "metadata.yaml").open().read().replace(
+        "---\n", "---\nabstract: The +lol first\ntitle: A [title]{.x}\n"
+                 "header-includes:\n- \\usepackage{x}\n", 1
+    )
+    text = meta + "\n+afaik and +lol\n"
+    for format in ("latex", "markdown"):
+        compare(text, format)
+
+    data = json.loads(source(text))
+    doc = raw.document(data, "markdown")
+    assert "acronyms" not in doc.metadata
+    assert doc.definitions is data["meta"]["acronyms"]
+    title = data["meta"]["title"]
+    data = raw.process(data, "markdown", pandocacro.prepare)
+    assert data["meta"]["title"] is title
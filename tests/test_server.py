@@ -0,0 +1,92 @@
+__doc__ = """Check the server matches the filter and reuses the acronyms"""
+
+import io
+import json
+import pathlib
+import sys
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import panflute
+import pytest
+
+import pandocacro
+
+from pandocacro import client, raw, server
+
+root = pathlib.Path(__file__).parent
+
+
+@pytest.fixture
+def address() -> Iterator[str]:
+    """Run a server in the background"""
+    # The path of a Unix socket is limited to about 100 characters.
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(pathlib.Path(directory) / "acro.sock")
+        with server.Server(path, size=1) as instance:
+            thread = threading.Thread(target=instance.serve_forever)
+            thread.start()
+            yield path
+            instance.shutdown()
+            thread.join()
+
+
+def source(meta: str, text: str) -> bytes:
+    """The JSON from Pandoc for the text"""
+    return panflute.convert_text(
+        meta + "\n" + text, output_format="json", standalone=True
+    ).encode("utf-8")
+
+
+def test_process(address: str, monkeypatch) -> None:
+    """Check concurrent requests match the filter and share acronyms"""
+    built = []
+    init = pandocacro.PandocAcro.__init__
+
+    def count(self, *args, **kwargs):
+        built.append(self)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(pandocacro.PandocAcro, "__init__", count)
+    meta = (root / "metadata.yaml").open().read()
+    data = source(meta, (root / "example.md").open().read())
+    expected = raw.process(json.loads(data), "markdown", pandocacro.prepare)
+    built.clear()
+    with ThreadPoolExecutor(4) as pool:
+        outputs = list(pool.map(
+            lambda _: client.request(data, "markdown", address), range(8)
+        ))
+
+    assert all(json.loads(o) == expected for o in outputs)
+    assert len(built) == 1
+
+    # Changing the acronyms builds them again
+    changed = source(meta.replace("as far as I know", "as I recall"),
+                     "+afaik")
+    output = json.loads(client.request(changed, "markdown", address))
+    assert "recall" in json.dumps(output["blocks"])
+    assert len(built) == 2
+
+
+def test_error(address: str) -> None:
+    """Check a failure is reported to the client"""
+    with pytest.raises(RuntimeError):
+        client.request(b"not json", "markdown", address)
+
+
+def test_fallback(monkeypatch, tmp_path: pathlib.Path) -> None:
+    """Check the client runs the filter without a server"""
+    monkeypatch.setenv("PANDOC_ACRO_SOCKET", str(tmp_path / "none.sock"))
+    monkeypatch.setattr(sys, "argv", ["pandoc-acro-client", "markdown"])
+    meta = (root / "metadata.yaml").open().read()
+    stdin = io.TextIOWrapper(io.BytesIO(source(meta, "+afaik")))
+    output = io.BytesIO()
+    monkeypatch.setattr(sys, "stdin", stdin)
+    monkeypatch.setattr(sys, "stdout", io.TextIOWrapper(output))
+    client.main()
+    sys.stdout.flush()
+    doc = json.loads(output.getvalue())
+    assert "as far as I know" in json.dumps(doc["blocks"])
@@ -0,0 +1,108 @@
+__doc__ = """Check chapters built with the usage index match the whole book"""
+
+import io
+import json
+import pathlib
+
+from typing import List
+
+import panflute
+import pytest
+
+import pandocacro
+
+from pandocacro import raw, usage
+
+root = pathlib.Path(__file__).parent
+
+METADATA = (root / "metadata.yaml").open().read().replace(
+    "acronyms:\n", "acronyms:\n  options:\n    single: 1\n", 1
+)
+
+CHAPTERS = {
+    "intro": "The +lol is here.\n\nThe [+BR]{.short} as well.\n",
+    "methods": "The +afaik first.\n\nThe +afaik again and +BR.\n",
+    "results": "The +afaik and [+*lol]{.long} and +BR.\n",
+}
+
+
+def run(text: str, format: str) -> panflute.Doc:
+    """Run the filter on the Markdown text"""
+    doc = panflute.convert_text(text, standalone=True)
+    doc.format = format
+    return pandocacro.main(doc)
+
+
+@pytest.mark.parametrize("format", ["markdown", "plain"])
+def test_index(tmp_path: pathlib.Path, monkeypatch, format: str) -> None:
+    """Check each chapter matches its part of the whole book"""
+    monkeypatch.chdir(tmp_path)
+    metadata = tmp_path / "acronyms.yaml"
+    metadata.write_text(METADATA)
+    sources = []
+    for name, text in CHAPTERS.items():
+        sources.append(str(tmp_path / f"{name}.md"))
+        pathlib.Path(sources[-1]).write_text(text)
+
+    # A chapter given as JSON is read directly
+    (tmp_path / "results.json").write_text(panflute.convert_text(
+        METADATA + CHAPTERS["results"], output_format="json",
+        standalone=True
+    ))
+    sources[-1] = str(tmp_path / "results.json")
+    monkeypatch.setattr("sys.argv", ["pandoc-acro", "index", "-o",
+                                     "book.json", "--metadata-file",
+                                     str(metadata), *sources])
+    pandocacro.main()
+    index = json.loads((tmp_path / "book.json").read_text())
+    assert [c["name"] for c in index["chapters"]] == list(CHAPTERS)
+    assert index["acronyms"]["afaik"] \
+        == {"total": 3, "chapter": "methods", "position": 0}
+    assert index["acronyms"]["lol"]["total"] == 1
+
+    book = run(METADATA + "\n".join(CHAPTERS.values()), format)
+    expected = [panflute.stringify(b) for b in book.content]
+    output: List[str] = []
+    for name, text in CHAPTERS.items():
+        doc = run(METADATA.replace(
+            "---\n", f"---\npandoc-acro:\n  index: book.json\n"
+                     f"  chapter: {name}\n", 1
+        ) + text, format)
+        output.extend(panflute.stringify(b) for b in doc.content)
+
+    assert output == expected
+    assert "laugh out loud" in expected[0] and "(lol)" not in expected[0]
+
+
+def test_missing(tmp_path: pathlib.Path, caplog) -> None:
+    """Check a missing index or chapter only logs a warning"""
+    (tmp_path / "book.json").write_text(json.dumps(
+        usage.build({"intro": ["afaik"]})
+    ))
+    for index, chapter in (("missing.json", "intro"),
+                           (tmp_path / "book.json", "other")):
+        doc = run(METADATA.replace(
+            "---\n", f"---\npandoc-acro:\n  index: {index}\n"
+                     f"  chapter: {chapter}\n", 1
+        ) + "The +afaik.", "markdown")
+        # The single use is not changed by the index
+        assert panflute.stringify(doc.content[0]).strip() \
+            == "The as far as I know."
+
+    assert len(caplog.records) == 2
+
+
+def test_directory(tmp_path: pathlib.Path) -> None:
+    """Check a relative index is found in the directory of the document"""
+    (tmp_path / "book.json").write_text(json.dumps(
+        usage.build({"intro": ["afaik"], "methods": ["afaik"]})
+    ))
+    data = panflute.convert_text(METADATA.replace(
+        "---\n", "---\npandoc-acro:\n  index: book.json\n"
+                 "  chapter: methods\n", 1
+    ) + "The +afaik.", output_format="json", standalone=True)
+    output = raw.Glossaries().process(json.loads(data), "markdown",
+                                      pandocacro.prepare, str(tmp_path))
+    doc = panflute.load(io.StringIO(json.dumps(output)))
+    # The acronym was already used in the earlier chapter
+    assert panflute.stringify(doc.content[0]).strip() == "The AFAIK."